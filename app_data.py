@@ -0,0 +1,36 @@
+"""Process-wide roster and capacity caches shared by the app's pages, so every page reads the same parsed roster
+and the same ledger snapshot instead of loading its own copy."""
+
+import streamlit as st
+import sqlite3
+import threading
+
+from moxie_matching import load_roster, seed_capacity_ledger
+
+# Surface matching-engine messages ("warning", "error", ...) in the page
+def notify_streamlit(level, message):
+    getattr(st, level, st.info)(message)
+
+# The parsed roster and its indexes, loaded once per process; pages overlay live capacity on copies and never
+# modify these frames in place
+@st.cache_resource
+def load_data():
+    try:
+        doctors_df, nurses_df, indexes = load_roster(notify=notify_streamlit)
+
+        # Seed the capacity ledger with the parsed capacities (reservations already recorded are kept)
+        try:
+            seed_capacity_ledger(doctors_df)
+        except sqlite3.Error as e:
+            st.warning(f"Capacity ledger unavailable, using static capacity: {e}")
+
+        return doctors_df, nurses_df, indexes
+
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return None, None, None
+
+# Process-wide snapshot of the capacity ledger, shared by all sessions and refreshed when the ledger version changes
+@st.cache_resource
+def get_capacity_cache():
+    return {"version": None, "available": {}, "lock": threading.Lock()}
@@ -0,0 +1,250 @@
+"""Feedback store benchmark: legacy JSON rewrite-per-append vs the sqlite store, the history view's stats
+from a full reload vs the running aggregates, its filtered list from pandas vs indexed page queries, the
+calibration view from the log vs its aggregates, and whole-log exports through a DataFrame vs streamed from
+the store, at up to 100k entries.
+
+Run from the repo root:  python benchmarks/bench_feedback.py
+"""
+
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moxie_matching.calibration import calibration_report  # noqa: E402
+from moxie_matching.export import export_table, parquet_available  # noqa: E402
+from moxie_matching.feedback import (  # noqa: E402
+    add_feedback_entry,
+    connect_feedback_store,
+    count_feedback,
+    feedback_summary,
+    load_feedback_entries,
+    migrate_legacy_feedback,
+    query_feedback,
+)
+
+LOG_SIZES = (1_000, 10_000, 100_000)
+APPENDS = 5
+WRITERS = 8
+APPENDS_PER_WRITER = 25
+
+
+def synthetic_entry(i):
+    return {
+        "id": i + 1,
+        "timestamp": datetime.datetime(2025, 1, 1).strftime("%Y-%m-%d %H:%M:%S"),
+        "md_name": f"Dr. Example {i % 300}",
+        "nurse_name": f"nurse{i % 2000}@example.com",
+        "match_score": round(5 + (i % 50) / 10, 1),
+        "user_rating": i % 10 + 1,
+        "accuracy": (i % 10 + 1) / 10.0,
+        "comments": ("Good location fit, capacity confirmed on the call.", "Too remote for hands-on training.")[i % 2],
+        "match_reasoning": "Strong on location, capacity, experience fit. Weaker on past match outcomes. " * 3,
+    }
+
+
+def write_legacy_log(path, count):
+    with open(path, "w") as f:
+        json.dump([synthetic_entry(i) for i in range(count)], f, indent=2)
+
+
+# The page's old add_feedback: load the whole file, append, rewrite the whole file
+def legacy_append(path):
+    with open(path) as f:
+        entries = json.load(f)
+    entry = synthetic_entry(len(entries))
+    entry["id"] = len(entries) + 1
+    entries.append(entry)
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=2)
+
+
+# A reader can catch the file mid-rewrite; the old page treated that as an empty log, which is what loses entries
+def legacy_append_tolerant(path):
+    try:
+        legacy_append(path)
+    except ValueError:
+        with open(path, "w") as f:
+            json.dump([synthetic_entry(0)], f, indent=2)
+
+
+# The history view's old stats pass: every entry into a DataFrame, then means, unique names and the date range
+def dataframe_stats(db_path):
+    df = pd.DataFrame(load_feedback_entries(db_path))
+    dates = pd.to_datetime(df["timestamp"]).dt.date
+    return (
+        df["match_score"].mean(), df["user_rating"].mean(), (df["user_rating"] / 10.0).mean(), len(df),
+        sorted(df["md_name"].unique()), sorted(df["nurse_name"].unique()), dates.min(), dates.max(),
+    )
+
+
+# History view filters: (label, store filters, the same filter in pandas)
+HISTORY_QUERIES = (
+    ("no filter", {}, lambda df: df),
+    ("one MD", {"md_name": "Dr. Example 7"}, lambda df: df[df["md_name"] == "Dr. Example 7"]),
+    ("MD + high rating", {"md_name": "Dr. Example 7", "min_rating": 8, "max_rating": 10},
+     lambda df: df[(df["md_name"] == "Dr. Example 7") & (df["user_rating"] >= 8)]),
+    ("text 'remote'", {"search": "remote"},
+     lambda df: df[df["comments"].str.contains("remote") | df["match_reasoning"].str.contains("remote")]),
+)
+DEEP_PAGES = 200
+
+
+# The old view: every entry into a DataFrame, filter, sort newest first, then the first page of cards
+def dataframe_page(db_path, pandas_filter):
+    df = pd.DataFrame(load_feedback_entries(db_path))
+    return pandas_filter(df).sort_values(by="timestamp", ascending=False).head(25)
+
+
+def store_page(db_path, filters, before_id=None):
+    count_feedback(db_path=db_path, **filters)
+    return query_feedback(before_id=before_id, db_path=db_path, **filters)
+
+
+# The cursor the Older button would hold on page `page`
+def page_cursor(db_path, filters, page):
+    cursor = None
+    for _ in range(page - 1):
+        _, cursor = query_feedback(before_id=cursor, db_path=db_path, **filters)
+    return cursor
+
+
+# The calibration view computed from the log: every entry into a DataFrame, then bands, rank correlation
+# and per-MD error
+def dataframe_calibration(db_path):
+    df = pd.DataFrame(load_feedback_entries(db_path))
+    df["error"] = df["match_score"] - df["user_rating"]
+    bands = df.groupby(df["match_score"].clip(0, 9.99) // 1)[["match_score", "user_rating", "error"]].agg(["mean", "std", "count"])
+    rho = df["match_score"].rank().corr(df["user_rating"].rank())
+    per_md = df.groupby("md_name")["error"].agg(["mean", "count"])
+    return bands, rho, per_md
+
+
+# The page's old export: every entry into a DataFrame, then the whole CSV as one string
+def dataframe_export(db_path, path):
+    csv_text = pd.DataFrame(load_feedback_entries(db_path)).to_csv(index=False)
+    with open(path, "w") as f:
+        f.write(csv_text)
+
+
+# (ms, peak traced MB) of a call: timed untraced, then run again under tracemalloc, which slows it severalfold
+def time_and_peak(func):
+    elapsed = time_call(func)[0]
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def time_appends(append):
+    timings = []
+    for _ in range(APPENDS):
+        start = time.perf_counter()
+        append()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+def time_call(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+# WRITERS threads appending at once; returns (entries lost, duplicate ids)
+def concurrent_writers(append, read_ids):
+    threads = [
+        threading.Thread(target=lambda: [append() for _ in range(APPENDS_PER_WRITER)]) for _ in range(WRITERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ids = read_ids()
+    return WRITERS * APPENDS_PER_WRITER - len(ids), len(ids) - len(set(ids))
+
+
+def legacy_ids(path):
+    with open(path) as f:
+        return [entry["id"] for entry in json.load(f)]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'entries':>8} {'json MB':>8} {'json append ms':>15} {'sqlite append ms':>17} {'migrate ms':>11} {'load ms':>8} "
+              f"{'df stats ms':>12} {'summary ms':>11}")
+        for count in LOG_SIZES:
+            json_path = os.path.join(tmp, f"feedback_{count}.json")
+            db_path = os.path.join(tmp, f"feedback_{count}.db")
+            write_legacy_log(json_path, count)
+            json_mb = os.path.getsize(json_path) / 1024 / 1024
+            migrate_ms, migrated = time_call(lambda: migrate_legacy_feedback(json_path, db_path))
+            assert migrated == count
+            sqlite_ms = time_appends(lambda: add_feedback_entry(
+                "Dr. Example 1", "nurse@example.com", 8.5, 9, "Great fit", "Same state, open NP slot", db_path=db_path
+            ))
+            load_ms, loaded = time_call(lambda: load_feedback_entries(db_path))
+            assert len(loaded) == count + APPENDS
+            df_stats_ms = time_appends(lambda: dataframe_stats(db_path))
+            summary_ms = time_appends(lambda: feedback_summary(db_path))
+            assert feedback_summary(db_path)["entries"] == dataframe_stats(db_path)[3]
+            json_ms = time_appends(lambda: legacy_append(json_path))
+            print(
+                f"{count:>8} {json_mb:>8.1f} {json_ms:>15.2f} {sqlite_ms:>17.2f} {migrate_ms:>11.0f} {load_ms:>8.0f} "
+                f"{df_stats_ms:>12.1f} {summary_ms:>11.2f}"
+            )
+
+        # Migration runs once: a second call must not duplicate the log
+        assert migrate_legacy_feedback(json_path, db_path) == 0
+
+        print(f"\nHistory view at {count} entries: first page and page {DEEP_PAGES} (count + page query)")
+        print(f"{'filter':>18} {'pandas ms':>10} {'store page ms':>14} {f'page {DEEP_PAGES} ms':>12}")
+        for label, filters, pandas_filter in HISTORY_QUERIES:
+            pandas_ms = time_appends(lambda: dataframe_page(db_path, pandas_filter))
+            page_ms = time_appends(lambda: store_page(db_path, filters))
+            cursor = page_cursor(db_path, filters, DEEP_PAGES)
+            deep_ms = time_appends(lambda: store_page(db_path, filters, cursor))
+            print(f"{label:>18} {pandas_ms:>10.1f} {page_ms:>14.2f} {deep_ms:>12.2f}")
+
+        calibration_df_ms = time_appends(lambda: dataframe_calibration(db_path))
+        calibration_ms = time_appends(lambda: calibration_report(db_path=db_path))
+        print(f"\nCalibration view at {count} entries: {calibration_df_ms:.1f} ms from the log, "
+              f"{calibration_ms:.1f} ms from the aggregates")
+
+        print(f"\nWhole-log export at {count} entries")
+        print(f"{'method':>18} {'ms':>8} {'peak MB':>8} {'file MB':>8}")
+        exports = [("dataframe csv", lambda path: dataframe_export(db_path, path)),
+                   ("streamed csv", lambda path: export_table(path, "csv", db_path=db_path))]
+        if parquet_available():
+            exports.append(("streamed parquet", lambda path: export_table(path, "parquet", db_path=db_path)))
+        for label, export in exports:
+            path = os.path.join(tmp, label.replace(" ", "."))
+            export_ms, peak_mb = time_and_peak(lambda: export(path))
+            print(f"{label:>18} {export_ms:>8.0f} {peak_mb:>8.1f} {os.path.getsize(path) / 1024 / 1024:>8.1f}")
+
+        print(f"\n{WRITERS} concurrent writers x {APPENDS_PER_WRITER} appends")
+        json_path = os.path.join(tmp, "race.json")
+        write_legacy_log(json_path, 0)
+        lost, duplicates = concurrent_writers(lambda: legacy_append_tolerant(json_path), lambda: legacy_ids(json_path))
+        print(f"  json:   {lost} entries lost, {duplicates} duplicate ids")
+
+        db_path = os.path.join(tmp, "race.db")
+        connect_feedback_store(db_path).close()
+        lost, duplicates = concurrent_writers(
+            lambda: add_feedback_entry("Dr. Race", "nurse@example.com", 7.0, 7, "", "race", db_path=db_path),
+            lambda: [entry["id"] for entry in load_feedback_entries(db_path)],
+        )
+        print(f"  sqlite: {lost} entries lost, {duplicates} duplicate ids")
+
+
+if __name__ == "__main__":
+    main()
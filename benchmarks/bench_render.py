@@ -0,0 +1,104 @@
+"""Render benchmark: match cards built per card (old path) vs one batched template payload.
+
+Run from the repo root:  python benchmarks/bench_render.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from moxie_matching.render import render_match_cards  # noqa: E402
+
+CARD_COUNTS = (3, 50, 500)
+REPEATS = 5
+
+
+def synthetic_matches(count):
+    return [
+        {
+            "name": f"Dr. Example {i}",
+            "email": f"md{i}@example.com",
+            "capacity_status": "Has capacity for 2 more NPs, Has capacity for 3 more RNs",
+            "match_score": round(5 + (i % 50) / 10, 1),
+            "reasoning": "Strong on location, capacity, experience fit. Weaker on past match outcomes.",
+            "score_breakdown": {"state": 1.0, "capacity": 1.0, "experience": 0.8, "services": 0.5, "traits": 0.67},
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_profiles(count):
+    return [{"states": ["Texas ", "California "], "traits": ["Responsive", "Hands-on"]} for _ in range(count)]
+
+
+# The per-card path the app used before: one st.markdown call (one websocket message) per card
+PER_CARD_SCRIPT = """
+import streamlit as st
+matches = {matches!r}
+for match in matches:
+    score = float(match['match_score'])
+    score_class = "high-score" if score >= 8.0 else "medium-score" if score >= 6.0 else "low-score"
+    st.markdown(
+        f'''<div class="match-card">
+        <div style="display: flex; justify-content: space-between; align-items: center;">
+            <h4>{{match['name']}}</h4>
+            <div class="compatibility-score {{score_class}}">{{match['match_score']}}</div>
+        </div>
+        <p><strong>Contact:</strong> {{match['email']}}</p>
+        <div class="match-reason">
+            <p><strong>Why this match works:</strong> {{match['reasoning']}}</p>
+        </div>
+        </div>''',
+        unsafe_allow_html=True
+    )
+"""
+
+BATCHED_SCRIPT = """
+import streamlit as st
+from moxie_matching.render import render_match_cards
+matches = {matches!r}
+profiles = {profiles!r}
+st.markdown(render_match_cards(matches, profiles, "Top Matches"), unsafe_allow_html=True)
+"""
+
+
+def time_app(script):
+    timings = []
+    for _ in range(REPEATS):
+        app = AppTest.from_string(script, default_timeout=120)
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    return min(timings) * 1000, len(app.markdown)
+
+
+def time_build(matches, profiles):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        html = render_match_cards(matches, profiles, "Top Matches")
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, len(html)
+
+
+def main():
+    print(f"{'cards':>6} {'build ms':>9} {'payload KB':>11} {'per-card run ms':>16} {'msgs':>5} {'batched run ms':>15} {'msgs':>5}")
+    for count in CARD_COUNTS:
+        matches, profiles = synthetic_matches(count), synthetic_profiles(count)
+        build_ms, payload = time_build(matches, profiles)
+        per_card_ms, per_card_msgs = time_app(PER_CARD_SCRIPT.format(matches=matches))
+        batched_ms, batched_msgs = time_app(BATCHED_SCRIPT.format(matches=matches, profiles=profiles))
+        print(
+            f"{count:>6} {build_ms:>9.2f} {payload / 1024:>11.1f} {per_card_ms:>16.1f} {per_card_msgs:>5} "
+            f"{batched_ms:>15.1f} {batched_msgs:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
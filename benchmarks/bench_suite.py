@@ -0,0 +1,257 @@
+"""Hot-path benchmark suite: roster loading, candidate filtering for both prompt branches, prompt assembly,
+ranking, response parsing, card rendering and span tracing overhead, at roster scales from 100 to 100k nurses
+and 100 to 5k MDs.
+Results are written as JSON; `compare` diffs two result files and fails on regressions.
+
+Run from the repo root:
+    python benchmarks/bench_suite.py run --out bench_results.json [--scales 100x100,1000x500] [--baseline old.json]
+    python benchmarks/bench_suite.py compare old.json new.json [--threshold 1.25]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from moxie_matching.candidates import find_doctor, find_nurse, select_doctor_candidates, select_nurse_candidates  # noqa: E402
+from moxie_matching.llm import parse_match_response  # noqa: E402
+from moxie_matching.match_sheet import DEFAULT_SHEET_FILTERS, sheet_search_values  # noqa: E402
+from moxie_matching.prompts import create_claude_prompt  # noqa: E402
+from moxie_matching.ranking import rank_candidates  # noqa: E402
+from moxie_matching.render import render_match_cards  # noqa: E402
+from moxie_matching.roster import load_roster  # noqa: E402
+from moxie_matching.synthetic import generate_roster  # noqa: E402
+from moxie_matching.tracing import start_trace, trace_span, use_trace  # noqa: E402
+
+RESULTS_VERSION = 1
+# (nurse tickets, MDs)
+SCALES = ((100, 100), (1_000, 500), (10_000, 1_000), (100_000, 5_000))
+SEARCHES = 20
+LOAD_REPEATS = 3
+FIXED_REPEATS = 200
+# Spans per timed call of the tracing benchmarks
+TRACE_SPANS = 100
+SEED = 7
+# A slower result only counts as a regression past this ratio and this many milliseconds
+REGRESSION_THRESHOLD = 1.25
+NOISE_FLOOR_MS = 0.05
+
+
+def scale_key(nurses, mds):
+    return f"{nurses}x{mds}"
+
+
+def summarize(timings):
+    timings = np.array(timings) * 1000
+    return {
+        "runs": len(timings),
+        "median_ms": float(np.median(timings)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "min_ms": float(timings.min()),
+    }
+
+
+def time_each(func, args_list):
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+# Every SEARCHES-th search value, so each scale searches a spread of the roster
+def sample_values(values, count=SEARCHES):
+    step = max(len(values) // count, 1)
+    return values[::step][:count]
+
+
+# Candidate filtering exactly as each create_claude_prompt branch calls it: "md" lists nurses, "nurse" lists MDs
+def filter_for_md(doctor, nurses_df, indexes):
+    return select_nurse_candidates(doctor, nurses_df, indexes, DEFAULT_SHEET_FILTERS["md"])
+
+
+def filter_for_nurse(nurse, doctors_df, indexes):
+    state_code = nurse.get("State Code")
+    return select_doctor_candidates(
+        doctors_df, indexes, str(nurse["Provider License Type"]) if pd.notna(nurse["Provider License Type"]) else "Unknown",
+        nurse.get("Licensed States List") or ([state_code] if state_code else []), state_code == "CA",
+        DEFAULT_SHEET_FILTERS["nurse"],
+    )
+
+
+def bench_scale(nurses, mds):
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate_roster(data_dir, nurses=nurses, mds=mds, seed=SEED)
+        timings = []
+        for _ in range(LOAD_REPEATS):
+            start = time.perf_counter()
+            doctors_df, nurses_df, indexes = load_roster(data_dir)
+            timings.append(time.perf_counter() - start)
+        results["load_roster"] = summarize(timings)
+
+    md_values = sample_values(sheet_search_values("md", doctors_df, nurses_df))
+    nurse_values = sample_values(sheet_search_values("nurse", doctors_df, nurses_df))
+    doctors = [find_doctor(doctors_df, value, indexes) for value in md_values]
+    nurse_rows = [find_nurse(nurses_df, value, indexes) for value in nurse_values]
+
+    results["filter_md_branch"] = time_each(filter_for_md, [(doctor, nurses_df, indexes) for doctor in doctors])
+    results["filter_nurse_branch"] = time_each(filter_for_nurse, [(nurse, doctors_df, indexes) for nurse in nurse_rows])
+    for search_type, values in (("md", md_values), ("nurse", nurse_values)):
+        args = [(search_type, value, doctors_df, nurses_df, DEFAULT_SHEET_FILTERS[search_type], indexes) for value in values]
+        results[f"prompt_{search_type}"] = time_each(create_claude_prompt, args)
+        results[f"rank_{search_type}"] = time_each(
+            lambda *call: rank_candidates(*call, k=3, indexes=indexes), [call[:5] for call in args]
+        )
+    return results
+
+
+def synthetic_matches(count):
+    return [
+        {
+            "name": f"Dr. Example {i}",
+            "email": f"md{i}@example.com",
+            "capacity_status": "Has capacity for 2 more NPs, Has capacity for 3 more RNs",
+            "match_score": round(5 + (i % 50) / 10, 1),
+            "reasoning": "Strong on location, capacity, experience fit. Weaker on past match outcomes. " * 3,
+            "score_breakdown": {"state": 1.0, "capacity": 1.0, "experience": 0.8, "services": 0.5, "traits": 0.67},
+        }
+        for i in range(count)
+    ]
+
+
+# TRACE_SPANS nested spans under a trace, or under none when tracing is off
+def enter_spans(enabled):
+    with use_trace(start_trace("bench", enabled=enabled)):
+        for _ in range(TRACE_SPANS):
+            with trace_span("outer"):
+                with trace_span("inner"):
+                    pass
+
+
+# Roster-independent stages: parsing an LLM response, building the result cards and span tracing overhead
+def bench_fixed():
+    results = {}
+    for count in (3, 50):
+        matches = synthetic_matches(count)
+        response = json.dumps({"matches": matches})
+        profiles = [{"states": ["Texas ", "California "], "traits": ["Responsive", "Hands-on"]}] * count
+        results[f"parse_response_{count}"] = time_each(parse_match_response, [(response,)] * FIXED_REPEATS)
+        results[f"render_cards_{count}"] = time_each(render_match_cards, [(matches, profiles, "Top Matches")] * FIXED_REPEATS)
+    results[f"trace_spans_{TRACE_SPANS}_off"] = time_each(enter_spans, [(False,)] * FIXED_REPEATS)
+    results[f"trace_spans_{TRACE_SPANS}_on"] = time_each(enter_spans, [(True,)] * FIXED_REPEATS)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_scales(text):
+    if not text:
+        return SCALES
+    return tuple(tuple(int(part) for part in scale.lower().split("x")) for scale in text.split(","))
+
+
+def run_suite(args):
+    report = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "results": {},
+    }
+    for name, stats in bench_fixed().items():
+        report["results"][f"fixed/{name}"] = stats
+    for nurses, mds in parse_scales(args.scales):
+        print(f"Scale {scale_key(nurses, mds)} ...", flush=True)
+        for name, stats in bench_scale(nurses, mds).items():
+            report["results"][f"{scale_key(nurses, mds)}/{name}"] = stats
+
+    print(f"{'benchmark':<34} {'runs':>5} {'median ms':>10} {'p95 ms':>9}")
+    for key, stats in report["results"].items():
+        print(f"{key:<34} {stats['runs']:>5} {stats['median_ms']:>10.3f} {stats['p95_ms']:>9.3f}")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            return compare_reports(json.load(f), report, args.threshold)
+    return 0
+
+
+# Median-to-median ratios for the benchmarks both reports ran; returns 1 if any regressed past the threshold
+def compare_reports(old, new, threshold=REGRESSION_THRESHOLD):
+    print(f"\nComparing {old.get('commit')} ({old.get('created_at')}) -> {new.get('commit')} ({new.get('created_at')})")
+    print(f"{'benchmark':<34} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    regressions = []
+    for key, stats in new["results"].items():
+        if key not in old["results"]:
+            continue
+        old_ms, new_ms = old["results"][key]["median_ms"], stats["median_ms"]
+        ratio = new_ms / old_ms if old_ms > 0 else float("inf")
+        regressed = ratio > threshold and new_ms - old_ms > NOISE_FLOOR_MS
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<34} {old_ms:>10.3f} {new_ms:>10.3f} {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    skipped = len(set(old["results"]) ^ set(new["results"]))
+    if skipped:
+        print(f"{skipped} benchmark(s) in only one report (different scales?) not compared")
+    print(f"{len(regressions)} regression(s) past {threshold:.2f}x")
+    return 1 if regressions else 0
+
+
+def run_compare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    return compare_reports(old, new, args.threshold)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Moxie matching hot-path benchmark suite.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the suite and write a JSON report.")
+    run.add_argument("--out", default="bench_results.json", help="Report path.")
+    run.add_argument("--scales", default=None,
+                     help="Comma-separated NURSESxMDS scales (default: " + ",".join(scale_key(*s) for s in SCALES) + ").")
+    run.add_argument("--baseline", default=None, help="Earlier report to compare against after the run.")
+    run.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio that counts as a regression.")
+    run.set_defaults(func=run_suite)
+
+    compare = subparsers.add_parser("compare", help="Compare two JSON reports.")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio that counts as a regression.")
+    compare.set_defaults(func=run_compare)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,67 @@ import streamlit as st
 import pandas as pd
 import os
 import json
-import anthropic
-import hashlib
+import sqlite3
 import time
-import re
+
+from moxie_matching import (
+    DEFAULT_SHEET_FILTERS,
+    LEDGER_LICENSE_TYPES,
+    MatchJobQueue,
+    NULL_TRACE,
+    SPECULATION_HOLD_SECONDS,
+    SpeculationTracker,
+    TRACE_LOG,
+    TRACING_ENABLED,
+    active_ranking_weights,
+    add_run_feedback,
+    apply_live_capacity,
+    confirm_reservation,
+    extract_md_preferences,
+    extract_personality_traits,
+    get_available_capacity,
+    list_active_reservations,
+    load_match_sheet,
+    lookup_match_sheet,
+    memo_get,
+    memo_put,
+    memo_recent,
+    new_result_memo,
+    normalize_state,
+    parse_state_codes,
+    rank_candidates,
+    rank_match_job,
+    record_match_run,
+    refine_match_job,
+    release_reservation,
+    render_match_cards,
+    render_trace_waterfall,
+    reserve_capacity,
+    resolve_match_doctor,
+    row_text,
+    result_memo_key,
+    roster_fingerprint,
+    start_trace,
+    trace_span,
+    use_trace,
+)
+
+from app_data import get_capacity_cache, load_data
 
 # Page config
 st.set_page_config(page_title="Moxie Nurse-MD Matching", layout="wide")
 
+# Time each full script run; the search panels show it next to their own (fragment) rerun time. The start is
+# also kept in session state until the run ends, so a panel can tell a full rerun from a fragment rerun
+script_start = time.perf_counter()
+st.session_state['full_run_start'] = script_start
+
+# Number of recent results offered in each panel's history strip
+HISTORY_STRIP_SIZE = 6
+
+# Seconds between progress updates while an AI job runs
+JOB_POLL_INTERVAL = 0.3
+
 # Custom CSS (reusing the existing styles)
 st.markdown("""
 <style>
@@ -160,6 +213,80 @@ st.markdown("""
         margin-top: 10px;
         border-left: 3px solid #fc8181;
     }
+    /* Provider detail panel (display_nurse_details) */
+    .nurse-profile .nurse-info {
+        background-color: #f9f9f9;
+        border-radius: 12px;
+        padding: 20px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+        max-width: 600px;
+        margin: 0 auto;
+        font-family: Arial, sans-serif;
+    }
+    .nurse-profile .nurse-detail {
+        margin-bottom: 15px;
+        padding-bottom: 15px;
+        border-bottom: 1px solid #e0e0e0;
+    }
+    .nurse-profile .nurse-detail:last-child {
+        border-bottom: none;
+    }
+    .nurse-profile .nurse-detail h4 {
+        color: #2c3e50;
+        margin-bottom: 10px;
+        font-size: 18px;
+        border-bottom: 2px solid #3498db;
+        padding-bottom: 5px;
+    }
+    .nurse-profile .nurse-detail p {
+        margin: 5px 0;
+        color: #34495e;
+    }
+    .nurse-profile .nurse-detail strong {
+        color: #2980b9;
+        margin-right: 8px;
+    }
+    .nurse-profile .trait-tag.state-tag {
+        display: inline-block;
+        background-color: #f0ad4e;
+        color: white;
+        padding: 4px 8px;
+        border-radius: 4px;
+        font-size: 14px;
+    }
+    .trace-row {
+        display: flex;
+        align-items: center;
+        font-size: 12px;
+        margin-bottom: 2px;
+    }
+    .trace-label {
+        width: 45%;
+        overflow: hidden;
+        white-space: nowrap;
+        text-overflow: ellipsis;
+    }
+    .trace-track {
+        position: relative;
+        width: 55%;
+        height: 12px;
+        background-color: #f0f2f6;
+        border-radius: 2px;
+    }
+    .trace-bar {
+        position: absolute;
+        top: 0;
+        height: 12px;
+        min-width: 2px;
+        background-color: #4e7ddd;
+        border-radius: 2px;
+    }
+    .trace-bar.job-span {
+        background-color: #9b59b6;
+    }
+    .trace-bar.error-span {
+        background-color: #e74c3c;
+    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -182,7 +309,7 @@ if not st.session_state['password_correct']:
         # Hard-code the password check for simplicity
         if password == "MoxieAI2025":
             st.session_state['password_correct'] = True
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Incorrect password. Please try again.")
     
@@ -192,909 +319,8 @@ if not st.session_state['password_correct']:
 # Main application (only runs if password is correct)
 st.markdown("<h1 class='main-header'>Moxie Nurse-MD Matching System</h1>", unsafe_allow_html=True)
 
-# Load data
-@st.cache_data
-def load_data():
-    try:
-        # Load medical directors from CSV if available
-        try:
-            doctors_df = pd.read_csv('Medical_List.csv')
-            # Filter for medical directors
-            doctors_df = doctors_df[doctors_df['Lifecycle Stage'] == 'Medical Director Onboarded']
-        except FileNotFoundError:
-            # Create a sample doctor dataframe if CSV is not available
-            doctor_data = [
-                {"First Name": "John", "Last Name": "Smith", "Email": "john.smith@example.com", 
-                 "Residing State  (Lives In)": "CA", "Create Date": "2023-01-15", "Lifecycle Stage": "Medical Director Onboarded",
-                 "Capacity Status": "Has capacity for 3 more NPs, 2 more RNs"},
-                {"First Name": "Emily", "Last Name": "Johnson", "Email": "emily.j@example.com", 
-                 "Residing State  (Lives In)": "TX", "Create Date": "2023-02-20", "Lifecycle Stage": "Medical Director Onboarded",
-                 "Capacity Status": "At capacity for NPs, has capacity for 2 more RNs"},
-                {"First Name": "Michael", "Last Name": "Brown", "Email": "m.brown@example.com", 
-                 "Residing State  (Lives In)": "FL", "Create Date": "2023-03-10", "Lifecycle Stage": "Medical Director Onboarded",
-                 "Capacity Status": "Has capacity for 1 more NP, at capacity for RNs"},
-                {"First Name": "Sarah", "Last Name": "Garcia", "Email": "s.garcia@example.com", 
-                 "Residing State  (Lives In)": "CA", "Create Date": "2023-04-05", "Lifecycle Stage": "Medical Director Onboarded",
-                 "Capacity Status": "At capacity for both NPs and RNs"},
-                {"First Name": "David", "Last Name": "Martinez", "Email": "d.martinez@example.com", 
-                 "Residing State  (Lives In)": "NY", "Create Date": "2023-05-12", "Lifecycle Stage": "Medical Director Onboarded",
-                 "Capacity Status": "Has capacity for 2 more NPs, 3 more RNs"}
-            ]
-            doctors_df = pd.DataFrame(doctor_data)
-        
-        # Try to load the MD metadata
-        try:
-            md_metadata_df = pd.read_csv('md_metadata.csv')
-        except FileNotFoundError:
-            # If not found, create an empty dataframe with appropriate columns
-            md_metadata_df = pd.DataFrame(columns=['First Name', 'Last Name', 'Email', 'Residing State  (Lives In)', 
-                                                  'MD Preferences', 'Personality Traits'])
-        
-        # Add capacity information if it doesn't exist
-        if 'Capacity Status' not in md_metadata_df.columns:
-            md_metadata_df['Capacity Status'] = "Has capacity for 2 more NPs, Has capacity for 3 more RNs"
-        
-        # Extract capacity information
-        md_metadata_df['NP Capacity'] = md_metadata_df['Capacity Status'].apply(
-            lambda x: extract_capacity_info(x, 'NP') if isinstance(x, str) else 0
-        )
-        
-        md_metadata_df['RN Capacity'] = md_metadata_df['Capacity Status'].apply(
-            lambda x: extract_capacity_info(x, 'RN') if isinstance(x, str) else 0
-        )
-        
-        # Process MD metadata
-        # Handle First Name field - remove "Dr. " prefix if present
-        md_metadata_df['First Name'] = md_metadata_df['First Name'].apply(
-            lambda x: x.replace('Dr. ', '') if isinstance(x, str) and x.startswith('Dr. ') else x
-        )
-        
-        # Process multiple states - convert to individual boolean checks to avoid ambiguity
-        md_metadata_df['Multiple States'] = md_metadata_df['Residing State  (Lives In)'].apply(
-            lambda x: (isinstance(x, str) and (';' in x or ',' in x))
-        )
-        
-        md_metadata_df['States List'] = md_metadata_df['Residing State  (Lives In)'].apply(
-            lambda x: [s.strip() for s in re.split(r'[;,]', str(x))] if isinstance(x, str) else []
-        )
-        
-        # Flag for preferences - convert to individual boolean checks
-        md_metadata_df['Has Preferences'] = md_metadata_df['MD Preferences'].apply(
-            lambda x: (isinstance(x, str) and len(x.strip()) > 0)
-        )
-        
-        # Split personality traits into a list for easier processing
-        md_metadata_df['Traits List'] = md_metadata_df['Personality Traits'].apply(
-            lambda x: [trait.strip() for trait in str(x).split(',')] if isinstance(x, str) else []
-        )
-        
-        # Identify if the row is actually a nurse practitioner - use individual boolean checks
-        md_metadata_df['Is NP'] = md_metadata_df['Last Name'].apply(
-            lambda x: (isinstance(x, str) and 'NP' in x.upper())
-        )
-        
-        # Create a dataframe for just the NPs
-        nurse_providers_df = md_metadata_df[md_metadata_df['Is NP'] == True].copy()
-        
-        # Remove NPs from the MD dataframe
-        md_metadata_df = md_metadata_df[md_metadata_df['Is NP'] == False].copy()
-        
-        # Create nurses dataframe directly from the provided data or from hubspot CSV
-        try:
-            nurses_df = pd.read_csv('hubspot_moxie.csv')
-            # Filter to only relevant columns
-            relevant_cols = [
-                'Ticket Number Counter', 'Bird Eats Bug Email', 'Provider License Type',
-                'Experience Level  ', 'State (MedSpa Premise)', 'Services Provided',
-                'Addt\'l Service Notes'
-            ]
-            # Use columns that are actually in the dataframe
-            available_cols = [col for col in relevant_cols if col in nurses_df.columns]
-            nurses_df = nurses_df[available_cols].dropna(subset=['Bird Eats Bug Email'])
-        except FileNotFoundError:
-            # Create a minimal empty dataframe with required columns
-            st.error("No nurse data file found. Please upload the hubspot_moxie.csv file.")
-            nurses_df = pd.DataFrame(columns=[
-                'Ticket Number Counter', 'Bird Eats Bug Email', 'Provider License Type',
-                'Experience Level  ', 'State (MedSpa Premise)', 'Services Provided',
-                'Addt\'l Service Notes'
-            ])
-        
-        # Merge MD metadata with main doctors dataframe if possible
-        if len(doctors_df) > 0 and len(md_metadata_df) > 0:
-            # Try to match by email first (most reliable)
-            merged_df = pd.merge(
-                doctors_df, 
-                md_metadata_df[['Email', 'MD Preferences', 'Personality Traits', 'Multiple States', 
-                               'States List', 'Has Preferences', 'Traits List', 'NP Capacity', 'RN Capacity']], 
-                on='Email', 
-                how='left'
-            )
-            
-            # For any unmatched rows, try matching by name
-            unmatched = merged_df[merged_df['MD Preferences'].isna()]
-            if not unmatched.empty:
-                # Create a name field for matching
-                doctors_df['Full Name'] = doctors_df['First Name'] + ' ' + doctors_df['Last Name']
-                md_metadata_df['Full Name'] = md_metadata_df['First Name'] + ' ' + md_metadata_df['Last Name']
-                
-                # Try matching again
-                for idx, row in unmatched.iterrows():
-                    full_name = f"{row['First Name']} {row['Last Name']}"
-                    matches = md_metadata_df[md_metadata_df['Full Name'].str.contains(full_name, case=False, na=False)]
-                    
-                    if not matches.empty:
-                        metadata = matches.iloc[0]
-                        merged_df.at[idx, 'MD Preferences'] = metadata['MD Preferences']
-                        merged_df.at[idx, 'Personality Traits'] = metadata['Personality Traits']
-                        merged_df.at[idx, 'Multiple States'] = metadata['Multiple States']
-                        merged_df.at[idx, 'States List'] = metadata['States List']
-                        merged_df.at[idx, 'Has Preferences'] = metadata['Has Preferences']
-                        merged_df.at[idx, 'Traits List'] = metadata['Traits List']
-                        merged_df.at[idx, 'NP Capacity'] = metadata['NP Capacity']
-                        merged_df.at[idx, 'RN Capacity'] = metadata['RN Capacity']
-            
-            doctors_df = merged_df
-            
-            # Fill in missing values
-            doctors_df['MD Preferences'] = doctors_df['MD Preferences'].fillna('')
-            doctors_df['Personality Traits'] = doctors_df['Personality Traits'].fillna('')
-            doctors_df['Multiple States'] = doctors_df['Multiple States'].fillna(False)
-            doctors_df['Has Preferences'] = doctors_df['Has Preferences'].fillna(False)
-            doctors_df['NP Capacity'] = doctors_df['NP Capacity'].fillna(0)
-            doctors_df['RN Capacity'] = doctors_df['RN Capacity'].fillna(0)
-            
-            # Ensure States List is properly filled - handling Series safely
-            doctors_df['States List'] = doctors_df.apply(
-                lambda row: row['States List'] if isinstance(row['States List'], list) else 
-                            [row['Residing State  (Lives In)']] if pd.notna(row['Residing State  (Lives In)']) else [],
-                axis=1
-            )
-            
-            # Ensure Traits List is properly filled - handling Series safely
-            doctors_df['Traits List'] = doctors_df.apply(
-                lambda row: row['Traits List'] if isinstance(row['Traits List'], list) else 
-                            [trait.strip() for trait in str(row['Personality Traits']).split(',')] 
-                            if pd.notna(row['Personality Traits']) else [],
-                axis=1
-            )
-            
-            # Always create Capacity Status from the NP and RN capacity for consistency
-            doctors_df['Capacity Status'] = doctors_df.apply(
-                lambda row: create_capacity_status(row['NP Capacity'], row['RN Capacity']),
-                axis=1
-            )
-            
-        # If we still don't have metadata for doctors, use the metadata dataframe directly
-        elif len(doctors_df) == 0 and len(md_metadata_df) > 0:
-            doctors_df = md_metadata_df.copy()
-            
-            # Add missing columns expected by the application
-            if 'Create Date' not in doctors_df.columns:
-                doctors_df['Create Date'] = '2023-01-01'  # Default date
-            if 'Lifecycle Stage' not in doctors_df.columns:
-                doctors_df['Lifecycle Stage'] = 'Medical Director Onboarded'
-            if 'NP Capacity' not in doctors_df.columns:
-                doctors_df['NP Capacity'] = 2  # Default capacity
-            if 'RN Capacity' not in doctors_df.columns:
-                doctors_df['RN Capacity'] = 3  # Default capacity
-            if 'Capacity Status' not in doctors_df.columns:
-                doctors_df['Capacity Status'] = doctors_df.apply(
-                    lambda row: create_capacity_status(row['NP Capacity'], row['RN Capacity']),
-                    axis=1
-                )
-        
-        return doctors_df, nurses_df
-        
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return None, None
-
-# Helper function to extract capacity information
-def extract_capacity_info(capacity_text, license_type):
-    if not isinstance(capacity_text, str):
-        return 0
-    
-    # Check for "at capacity" phrases
-    if f"at capacity for {license_type}s" in capacity_text.lower():
-        return 0
-    
-    # Look for capacity numbers
-    match = re.search(r'(\d+)\s+more\s+' + license_type + r's', capacity_text, re.IGNORECASE)
-    if match:
-        return int(match.group(1))
-    
-    return 0  # Default to 0 if no capacity info found
-
-# Helper function to create capacity status from NP and RN capacity
-def create_capacity_status(np_capacity, rn_capacity):
-    np_status = f"Has capacity for {np_capacity} more NPs" if np_capacity > 0 else "At capacity for NPs"
-    rn_status = f"Has capacity for {rn_capacity} more RNs" if rn_capacity > 0 else "At capacity for RNs"
-    return f"{np_status}, {rn_status}"
-
-# Extract traits/preferences for display
-def extract_personality_traits(traits_text):
-    if not traits_text or not isinstance(traits_text, str):
-        return []
-    
-    # Split by commas and clean up
-    traits = [trait.strip() for trait in traits_text.split(',')]
-    return traits
-
-def extract_md_preferences(prefs_text):
-    if not prefs_text or not isinstance(prefs_text, str):
-        return []
-    
-    # Split into sentences or by semicolons
-    prefs = []
-    for pref in re.split(r'[.;]', prefs_text):
-        if pref.strip():
-            prefs.append(pref.strip())
-    
-    return prefs
-
-# Function to create a matching prompt
-def create_claude_prompt(search_type, search_value, doctors_df, nurses_df, filters=None):
-    if filters is None:
-        filters = {}
-    
-    if search_type == "md":
-        # Find the doctor in the dataframe
-        doctor_row = doctors_df[
-            doctors_df.apply(
-                lambda row: search_value.lower() in f"{row['First Name']} {row['Last Name']}".lower(), 
-                axis=1
-            )
-        ]
-        
-        if doctor_row.empty:
-            return None, "Doctor not found in database."
-        
-        doctor = doctor_row.iloc[0]
-        
-        # Extract personality traits and preferences for more detailed matching
-        personality_traits = doctor.get('Personality Traits', '')
-        md_preferences = doctor.get('MD Preferences', '')
-        states = doctor.get('States List', [])
-        if not states and 'Residing State  (Lives In)' in doctor:
-            states = [doctor['Residing State  (Lives In)']]
-            
-        # Get capacity information
-        capacity_status = doctor.get('Capacity Status', '')
-        np_capacity = doctor.get('NP Capacity', 0)
-        rn_capacity = doctor.get('RN Capacity', 0)
-        
-        # Create base prompt
-        prompt = f"""
-        You are an Operations Manager at Moxie tasked with matching medical directors with nurses.
-        
-        Doctor Information:
-        - Name: {doctor['First Name']} {doctor['Last Name']}
-        - Email: {doctor['Email']}
-        - State(s): {', '.join(str(s) for s in states if s)}
-        - Onboarded: {doctor.get('Create Date', 'Unknown')}
-        - Capacity Status: {capacity_status}
-        - NP Capacity: {np_capacity}
-        - RN Capacity: {rn_capacity}
-        """
-        
-        # Add personality traits if available
-        if personality_traits:
-            prompt += f"- Personality: {personality_traits}\n"
-        
-        # Add MD preferences if available
-        if md_preferences:
-            prompt += f"- Preferences: {md_preferences}\n"
-            
-        # Add important state constraints
-        prompt += """
-        IMPORTANT STATE RESTRICTIONS:
-        - California: Medical directors in California can only supervise nurses in California.
-        - For other states, prioritize same-state matches but nearby states are acceptable if specified in filters.
-        """
-        
-        # Add capacity note
-        prompt += """
-        CAPACITY REQUIREMENTS:
-        - Check each nurse's license type (RN or NP) against the doctor's capacity
-        - Do NOT match with nurses whose license type exceeds the doctor's capacity
-        """
-        
-        # Add filter requirements to the prompt
-        if filters.get("experience"):
-            prompt += f"\n\nPreference for nurses with experience level: {filters['experience']}"
-            
-        if filters.get("location") == "Same State Only":
-            prompt += "\nLocation requirement: Only include nurses in the same state as the doctor."
-        elif filters.get("location") == "Nearby States Acceptable":
-            prompt += "\nLocation preference: Prioritize nurses in the same state, but nearby states are acceptable if not in California."
-        elif filters.get("location") == "Any Location":
-            prompt += "\nLocation preference: While prioritizing same-state matches, any location is acceptable EXCEPT for California doctors who must be matched with California nurses only."
-            
-        if filters.get("license_type") and filters.get("license_type") != "Any":
-            prompt += f"\n\nOnly looking for nurses with license type: {filters['license_type']}"
-            
-        if filters.get("requirements") and filters.get("requirements").strip():
-            prompt += f"\n\nAdditional requirements to consider:\n{filters['requirements']}"
-        
-        prompt += """
-        
-        Using the doctor information above, analyze the following nurse candidates and identify the top 3 best matches based on:
-        1. State licensing requirements (STRICT requirement for California)
-        2. Capacity availability for the nurse's license type (STRICT requirement)
-        3. Experience level compatibility (experienced doctors can mentor newer nurses)
-        4. Service offering alignment
-        5. Personality compatibility
-        6. Adherence to doctor's preferences
-        7. Any specific notes or requirements mentioned
-        
-        For each match, provide:
-        1. The nurse's name
-        2. Contact information
-        3. License type (important for capacity verification)
-        4. A detailed explanation of why they're a good match, making specific connections between:
-           - How this nurse's license type fits within the doctor's capacity
-           - How they meet state licensing requirements
-           - The doctor's personality traits and the nurse's background/experience
-           - How the doctor's preferences align with the nurse's profile
-           - Shared geographical advantages of their locations
-           - Why their experience levels complement each other
-        5. A match score out of 10
-        
-        Be specific and detailed in your reasoning, drawing direct connections between the doctor's profile and the nurse's background.
-        
-        Available Nurses:
-        """
-        
-        # Apply filters to nurses
-        filtered_nurses = nurses_df.copy()
-        
-        # STRICT FILTER: Apply California restriction
-        if "CA" in [s.upper() for s in states if s]:
-            filtered_nurses = filtered_nurses[
-                filtered_nurses['State (MedSpa Premise)'].str.upper() == "CA"
-            ]
-        
-        # STRICT FILTER: Apply capacity check
-        # First, check NP capacity
-        if np_capacity <= 0:
-            filtered_nurses = filtered_nurses[
-                filtered_nurses['Provider License Type'].str.upper() != "NP"
-            ]
-        
-        # Then check RN capacity
-        if rn_capacity <= 0:
-            filtered_nurses = filtered_nurses[
-                filtered_nurses['Provider License Type'].str.upper() != "RN"
-            ]
-        
-        # Apply experience filter if specified
-        if filters.get("experience") and filters.get("experience") != "Any":
-            filtered_nurses = filtered_nurses[
-                filtered_nurses['Experience Level  '].str.contains(filters.get("experience"), na=False)
-            ]
-        
-        # Apply license type filter
-        if filters.get("license_type") and filters.get("license_type") != "Any":
-            filtered_nurses = filtered_nurses[
-                filtered_nurses['Provider License Type'].str.contains(filters.get("license_type"), na=False)
-            ]
-        
-        # Handle location filtering
-        if filters.get("location") == "Same State Only":
-            # Get all nurses in any of the doctor's states
-            same_state_nurses = filtered_nurses[filtered_nurses['State (MedSpa Premise)'].isin(states)]
-            selected_nurses = same_state_nurses
-        else:
-            # Priority to same state nurses
-            same_state_nurses = filtered_nurses[filtered_nurses['State (MedSpa Premise)'].isin(states)]
-            
-            # For California doctors, only match with California nurses
-            if "CA" in [s.upper() for s in states if s]:
-                selected_nurses = same_state_nurses
-            else:
-                # For non-CA doctors, can match with nurses from other states
-                other_nurses = filtered_nurses[~filtered_nurses['State (MedSpa Premise)'].isin(states)]
-                # Combine same state and other nurses, prioritizing same state
-                selected_nurses = pd.concat([same_state_nurses, other_nurses])
-        
-        # Check MD preferences for any exclusions
-        if md_preferences:
-            # Check for maxed out capacity on certain license types
-            if "maxed" in md_preferences.lower() and "np" in md_preferences.lower():
-                # Filter out NPs if MD is maxed out
-                selected_nurses = selected_nurses[
-                    ~selected_nurses['Provider License Type'].str.contains('NP', na=False, case=False)
-                ]
-            
-            # Check for experience requirements
-            if "experience" in md_preferences.lower() or "6mo experience" in md_preferences.lower():
-                # Filter out new graduates
-                selected_nurses = selected_nurses[
-                    ~selected_nurses['Experience Level  '].str.contains('New Graduate', na=False, case=False)
-                ]
-        
-        # Apply keyword filter from additional requirements if specified
-        if filters.get("requirements") and filters.get("requirements").strip():
-            keywords = filters.get("requirements").lower().split()
-            keyword_matches = []
-            
-            for _, nurse in selected_nurses.iterrows():
-                # Combine all text fields for keyword search
-                all_text = ' '.join([
-                    str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else '',
-                    str(nurse['Experience Level  ']) if pd.notna(nurse['Experience Level  ']) else '',
-                    str(nurse['Services Provided']) if pd.notna(nurse['Services Provided']) else '',
-                    str(nurse['Addt\'l Service Notes']) if pd.notna(nurse['Addt\'l Service Notes']) else ''
-                ]).lower()
-                
-                # Count how many keywords match
-                match_count = sum(1 for keyword in keywords if keyword in all_text)
-                keyword_matches.append((match_count, nurse))
-            
-            # Sort by number of keyword matches (highest first)
-            keyword_matches.sort(reverse=True, key=lambda x: x[0])
-            
-            # Take top 20 matches if available
-            top_matches = [match[1] for match in keyword_matches[:20]]
-            if top_matches:
-                selected_nurses = pd.DataFrame(top_matches)
-        
-        # If no nurses match the filters, provide clear feedback
-        if selected_nurses.empty:
-            if "CA" in [s.upper() for s in states if s]:
-                return None, "No California nurses found that match this doctor's capacity and requirements. Please check back later or adjust filters."
-            else:
-                return None, "No nurses found that match this doctor's capacity and requirements. Please check back later or adjust filters."
-        
-        # Limit to top 20 for prompt length
-        selected_nurses = selected_nurses.head(20)
-        
-        # Add nurse information to the prompt
-        for _, nurse in selected_nurses.iterrows():
-            # Safe extraction of fields
-            nurse_name = str(nurse['Ticket Number Counter']) if pd.notna(nurse['Ticket Number Counter']) else "Unknown"
-            nurse_email = str(nurse['Bird Eats Bug Email']) if pd.notna(nurse['Bird Eats Bug Email']) else "No email"
-            nurse_license = str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else "Unknown"
-            nurse_experience = str(nurse['Experience Level  ']) if pd.notna(nurse['Experience Level  ']) else "Unknown"
-            nurse_state = str(nurse['State (MedSpa Premise)']) if pd.notna(nurse['State (MedSpa Premise)']) else "Unknown"
-            nurse_services = str(nurse['Services Provided']) if pd.notna(nurse['Services Provided']) else "None specified"
-            nurse_notes = str(nurse['Addt\'l Service Notes']) if pd.notna(nurse['Addt\'l Service Notes']) else "None"
-            
-            # Add to prompt
-            prompt += f"""
-            Nurse:
-            - Name: {nurse_name}
-            - Email: {nurse_email}
-            - License Type: {nurse_license}
-            - Experience: {nurse_experience}
-            - State: {nurse_state}
-            - Services: {nurse_services}
-            - Notes: {nurse_notes}
-            
-            """
-        
-        # Add response format instructions
-        prompt += """
-        Format your response as JSON with the following structure:
-        {
-            "matches": [
-                {
-                    "name": "Nurse Name",
-                    "email": "nurse@email.com",
-                    "license_type": "RN or NP",
-                    "match_score": 8.5,
-                    "reasoning": "Detailed explanation of why this is a good match that specifically mentions capacity, state requirements, and compatibility factors"
-                },
-                ...
-            ]
-        }
-        
-        Only include the JSON in your response, nothing else.
-        """
-        
-        return prompt, None
-    
-    elif search_type == "nurse":
-        # Find the nurse
-        nurse_row = nurses_df[
-            nurses_df.apply(
-                lambda row: pd.notna(row['Ticket Number Counter']) and search_value.lower() in str(row['Ticket Number Counter']).lower() or
-                           pd.notna(row['Bird Eats Bug Email']) and search_value.lower() in str(row['Bird Eats Bug Email']).lower(),
-                axis=1
-            )
-        ]
-        
-        if nurse_row.empty:
-            return None, "Nurse not found in database."
-        
-        nurse = nurse_row.iloc[0]
-        
-        # Safe extraction of fields
-        nurse_name = str(nurse['Ticket Number Counter']) if pd.notna(nurse['Ticket Number Counter']) else "Unknown"
-        nurse_email = str(nurse['Bird Eats Bug Email']) if pd.notna(nurse['Bird Eats Bug Email']) else "No email"
-        nurse_license = str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else "Unknown"
-        nurse_experience = str(nurse['Experience Level  ']) if pd.notna(nurse['Experience Level  ']) else "Unknown"
-        nurse_state = str(nurse['State (MedSpa Premise)']) if pd.notna(nurse['State (MedSpa Premise)']) else "Unknown"
-        nurse_services = str(nurse['Services Provided']) if pd.notna(nurse['Services Provided']) else "None specified"
-        nurse_notes = str(nurse['Addt\'l Service Notes']) if pd.notna(nurse['Addt\'l Service Notes']) else "None"
-        
-        # Create base prompt
-        prompt = f"""
-        You are an Operations Manager at Moxie tasked with matching nurses with the right medical directors.
-        
-        Nurse Information:
-        - Name: {nurse_name}
-        - Email: {nurse_email}
-        - License Type: {nurse_license}
-        - Experience Level: {nurse_experience}
-        - State: {nurse_state}
-        - Services: {nurse_services}
-        - Additional Notes: {nurse_notes}
-        
-        IMPORTANT STATE RESTRICTIONS:
-        - California: Nurses from California can ONLY be matched with medical directors in California due to strict state licensing requirements.
-        - For other states, prioritize same-state matches but nearby states are acceptable if specified in filters.
-        """
-        
-        # Add capacity note
-        prompt += """
-        CAPACITY REQUIREMENTS:
-        - Medical directors have limits on how many nurses they can supervise
-        - Check each MD's capacity for the specific license type (RN or NP)
-        - Do NOT match the nurse with any MD who is at capacity for their license type
-        """
-        
-        # Add filter requirements to the prompt
-        if filters.get("md_age") and filters.get("md_age") != "Any":
-            prompt += f"\n\nPreference for medical directors who are: {filters['md_age']}"
-            
-        if filters.get("interaction_style") and filters.get("interaction_style") != "Any":
-            prompt += f"\n\nPreference for medical directors with interaction style: {filters['interaction_style']}"
-            
-        if filters.get("location") == "Same State Only":
-            prompt += "\nLocation requirement: Only include medical directors in the same state as the nurse."
-        elif filters.get("location") == "Nearby States Acceptable":
-            prompt += "\nLocation preference: Prioritize medical directors in the same state, but nearby states are acceptable if not in California."
-        elif filters.get("location") == "Any Location":
-            prompt += "\nLocation preference: While prioritizing same-state matches, any location is acceptable EXCEPT for California nurses who must be matched with California medical directors only."
-            
-        if filters.get("service_requirements") and filters.get("service_requirements").strip():
-            prompt += f"\n\nAdditional service requirements to consider:\n{filters['service_requirements']}"
-        
-        prompt += """
-        
-        Using the nurse information above, analyze the following medical directors and identify the top 3 best matches based on:
-        1. State licensing requirements (STRICT requirement for California)
-        2. Capacity availability for this nurse's license type (STRICT requirement)
-        3. Experience level compatibility (experienced doctors can mentor newer nurses)
-        4. Personality compatibility
-        5. Doctor's preferences and requirements
-        6. Any specific notes or requirements mentioned
-        
-        For each match, provide:
-        1. The doctor's name
-        2. Contact information
-        3. Capacity status
-        4. A detailed explanation of why they're a good match, making specific connections between:
-           - How this specific doctor has capacity for this nurse's license type
-           - How they meet state licensing requirements 
-           - How the doctor's personality traits and working style benefit this nurse
-           - Specific geographic advantages of their locations
-           - How their experience levels complement each other
-        5. A match score out of 10
-        
-        Be specific and detailed in your reasoning, drawing direct connections between their profiles.
-        
-        Available Medical Directors:
-        """
-        
-        # Filter doctors based on criteria
-        filtered_doctors = doctors_df.copy()
-        
-        # STRICT FILTER: Apply California restriction
-        if nurse_state.upper() == "CA":
-            filtered_doctors = filtered_doctors[
-                filtered_doctors.apply(
-                    lambda row: "CA" in row.get('States List', []) if isinstance(row.get('States List'), list)
-                    else row.get('Residing State  (Lives In)', '').upper() == "CA",
-                    axis=1
-                )
-            ]
-        
-        # STRICT FILTER: Apply capacity check based on license type
-        if nurse_license.upper() == "NP":
-            filtered_doctors = filtered_doctors[
-                filtered_doctors.apply(
-                    lambda row: row.get('NP Capacity', 0) > 0 if 'NP Capacity' in row else 
-                    ("at capacity for np" not in str(row.get('Capacity Status', '')).lower() and 
-                     "capacity for" in str(row.get('Capacity Status', '')).lower() and
-                     "np" in str(row.get('Capacity Status', '')).lower()),
-                    axis=1
-                )
-            ]
-        elif nurse_license.upper() == "RN":
-            filtered_doctors = filtered_doctors[
-                filtered_doctors.apply(
-                    lambda row: row.get('RN Capacity', 0) > 0 if 'RN Capacity' in row else
-                    ("at capacity for rn" not in str(row.get('Capacity Status', '')).lower() and
-                     "capacity for" in str(row.get('Capacity Status', '')).lower() and
-                     "rn" in str(row.get('Capacity Status', '')).lower()),
-                    axis=1
-                )
-            ]
-        
-        # Apply MD age filter if specified
-        if filters.get("md_age") and filters.get("md_age") != "Any":
-            age_keywords = filters.get("md_age").lower()
-            if "younger" in age_keywords:
-                filtered_doctors = filtered_doctors[
-                    filtered_doctors['Personality Traits'].str.contains('young|younger', case=False, na=False)
-                ]
-            elif "older" in age_keywords or "experienced" in age_keywords:
-                filtered_doctors = filtered_doctors[
-                    filtered_doctors['Personality Traits'].str.contains('older|middle|experienced', case=False, na=False)
-                ]
-        
-        # Apply interaction style filter
-        if filters.get("interaction_style") and filters.get("interaction_style") != "Any":
-            style = filters.get("interaction_style").lower()
-            if "hands-on" in style:
-                filtered_doctors = filtered_doctors[
-                    filtered_doctors['Personality Traits'].str.contains('hands-on|training|collaborative', case=False, na=False)
-                ]
-            elif "autonomous" in style:
-                filtered_doctors = filtered_doctors[
-                    filtered_doctors['Personality Traits'].str.contains('autonomous|hands-off|independent', case=False, na=False)
-                ]
-        
-        # Apply location filter - use States List if available
-        if filters.get("location") == "Same State Only" and nurse_state != "Unknown":
-            filtered_doctors = filtered_doctors[
-                filtered_doctors.apply(
-                    lambda row: nurse_state in row.get('States List', []) if isinstance(row.get('States List'), list) 
-                    else nurse_state == row.get('Residing State  (Lives In)', ''), 
-                    axis=1
-                )
-            ]
-        
-        # Apply keyword filter from service requirements if specified
-        if filters.get("service_requirements") and filters.get("service_requirements").strip():
-            keywords = filters.get("service_requirements").lower().split()
-            keyword_matches = []
-            
-            for _, doctor in filtered_doctors.iterrows():
-                # Combine all text fields for keyword search
-                all_text = ' '.join([
-                    str(doctor['First Name'] + ' ' + doctor['Last Name']),
-                    str(doctor['Personality Traits']) if pd.notna(doctor['Personality Traits']) else '',
-                    str(doctor['MD Preferences']) if pd.notna(doctor['MD Preferences']) else ''
-                ]).lower()
-                
-                match_count = sum(1 for keyword in keywords if keyword in all_text)
-                keyword_matches.append((match_count, doctor))
-            
-            # Sort by number of keyword matches (highest first)
-            keyword_matches.sort(reverse=True, key=lambda x: x[0])
-            
-            # Take top 20 matches if available
-            top_matches = [match[1] for match in keyword_matches[:20]]
-            if top_matches:
-                filtered_doctors = pd.DataFrame(top_matches)
-        
-        # If filters resulted in no doctors, provide clear feedback
-        if filtered_doctors.empty:
-            if nurse_state.upper() == "CA":
-                return None, "No California medical directors found with capacity for this nurse's license type. Please check back later or adjust requirements."
-            else:
-                return None, "No medical directors found with available capacity for this nurse's license type. Please check back later or adjust requirements."
-        
-        # Select doctors to include, prioritizing state matches
-        if nurse_state != "Unknown":
-            # Find doctors in the same state (using States List if available)
-            same_state_doctors = filtered_doctors[
-                filtered_doctors.apply(
-                    lambda row: nurse_state in row.get('States List', []) if isinstance(row.get('States List'), list)
-                    else nurse_state == row.get('Residing State  (Lives In)', ''),
-                    axis=1
-                )
-            ]
-            
-            # Find other doctors (only if not a CA nurse)
-            if nurse_state.upper() != "CA" and filters.get("location") != "Same State Only":
-                other_doctors = filtered_doctors[
-                    ~filtered_doctors.apply(
-                        lambda row: nurse_state in row.get('States List', []) if isinstance(row.get('States List'), list)
-                        else nurse_state == row.get('Residing State  (Lives In)', ''),
-                        axis=1
-                    )
-                ]
-                
-                # Prioritize same state doctors
-                selected_doctors = pd.concat([same_state_doctors.head(10), other_doctors.head(10)])
-            else:
-                selected_doctors = same_state_doctors.head(20)
-        else:
-            selected_doctors = filtered_doctors.head(20)
-        
-        # Add doctor information to the prompt
-        for _, doctor in selected_doctors.iterrows():
-            # Get the states (handling multiple states)
-            states = doctor.get('States List', []) if isinstance(doctor.get('States List'), list) else [doctor.get('Residing State  (Lives In)', '')]
-            states_str = ', '.join(str(s) for s in states if s)
-            
-            # Get capacity information based on nurse's license type
-            capacity_status = doctor.get('Capacity Status', '')
-            if nurse_license.upper() == "NP":
-                capacity_info = f"NP Capacity: {doctor.get('NP Capacity', 'Unknown')}"
-            else:  # RN or other
-                capacity_info = f"RN Capacity: {doctor.get('RN Capacity', 'Unknown')}"
-            
-            # Get personality traits and preferences
-            traits = doctor.get('Personality Traits', '')
-            preferences = doctor.get('MD Preferences', '')
-            
-            doctor_info = f"""
-            Doctor:
-            - Name: {doctor['First Name']} {doctor['Last Name']}
-            - Email: {doctor['Email']}
-            - State(s): {states_str}
-            - {capacity_info}
-            - Capacity Status: {capacity_status}
-            """
-            
-            if traits:
-                doctor_info += f"- Personality: {traits}\n"
-            
-            if preferences:
-                doctor_info += f"- Preferences: {preferences}\n"
-            
-            prompt += doctor_info + "\n"
-        
-        # Add response format instructions
-        prompt += """
-        Format your response as JSON with the following structure:
-        {
-            "matches": [
-                {
-                    "name": "Dr. Name",
-                    "email": "doctor@email.com",
-                    "capacity_status": "Has capacity for X more of this license type",
-                    "match_score": 8.5, 
-                    "reasoning": "Detailed explanation of why this is a good match that specifically references capacity, state requirements, and personality fit"
-                },
-                ...
-            ]
-        }
-        
-        Only include the JSON in your response, nothing else.
-        """
-        
-        return prompt, None
-    
-    elif search_type == "manual":
-        # Manual entry form with additional filter context
-        prompt = f"""
-        You are an Operations Manager at Moxie tasked with matching nurses with medical directors.
-        
-        IMPORTANT STATE RESTRICTIONS:
-        - California: Nurses from California can ONLY be matched with medical directors in California due to strict state licensing requirements.
-        - For other states, prioritize same-state matches but nearby states are acceptable.
-        
-        CAPACITY REQUIREMENTS:
-        - Medical directors have limits on how many nurses they can supervise
-        - You must check each MD's capacity for the specific license type (RN or NP)
-        - Do NOT match a nurse with any MD who is at capacity for their license type
-        
-        A user has submitted the following information:
-        {search_value}
-        
-        """
-        
-        # Add filter requirements
-        if filters.get("person_type"):
-            prompt += f"This person is identified as a {filters.get('person_type')}.\n\n"
-            
-        if filters.get("matching_priorities") and filters.get("matching_priorities").strip():
-            prompt += f"Matching priorities to consider:\n{filters.get('matching_priorities')}\n\n"
-        
-        prompt += """
-        Based on this information, identify if this is a doctor or a nurse, and suggest potential matches from our database.
-        
-        For each match, provide:
-        1. The name of the matched professional
-        2. Contact information if available
-        3. Capacity status (if matching with a doctor)
-        4. A detailed explanation of why they're a good match, specifically:
-           - How they meet state licensing requirements (especially for California)
-           - Available capacity for the nurse's license type (if applicable)
-           - How their personalities would complement each other
-           - How their experience levels align
-           - Any shared specialties or interests
-        5. A match score out of 10
-        
-        Be specific in your reasoning, with concrete examples of why these individuals would work well together.
-        
-        Format your response as JSON with the following structure:
-        {
-            "person_type": "doctor" or "nurse",
-            "matches": [
-                {
-                    "name": "Name",
-                    "email": "email@example.com",
-                    "capacity_status": "Has capacity for X more of this license type" (include only if matching with a doctor),
-                    "match_score": 8.5,
-                    "reasoning": "Detailed explanation of why this is a good match with specific references to state requirements, capacity, and compatibility factors"
-                },
-                ...
-            ]
-        }
-        
-        Only include the JSON in your response, nothing else.
-        """
-        
-        return prompt, None
-    
-    else:  # For backward compatibility or future expansion
-        return None, "Invalid search type specified."
-
-# Create a hash from the prompt for caching
-def get_prompt_hash(prompt):
-    return hashlib.md5(prompt.encode()).hexdigest()
-
-# Cache the Claude API responses
-#@st.cache_data(ttl=3600)  # Cache for 1 hour
-def cached_claude_api(prompt_hash, prompt, api_key):
-    return query_claude(prompt, api_key)
-
-# Function to call Claude API with fallback to Haiku model
-def query_claude(prompt, api_key, max_retries=2):
-    # First try with the primary model (Sonnet)
-    primary_model = "claude-3-5-sonnet-20240620"
-    fallback_model = "claude-3-haiku-20240307"
-    
-    for attempt in range(max_retries):
-        try:
-            # Choose model based on the attempt number
-            current_model = primary_model if attempt == 0 else fallback_model
-            
-            # Initialize the client
-            client = anthropic.Anthropic(api_key=api_key)
-            
-            # Make the API request
-            message = client.messages.create(
-                model=current_model,
-                max_tokens=4000,
-                temperature=0.2,
-                system="You are a medical staffing expert at Moxie. You help match nurses with medical directors based on their location, experience, services offered, personality traits, and other relevant factors. You always prioritize state licensing requirements (especially for California) and capacity limitations. You always respond in JSON format as specified in the prompts.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return message.content[0].text
-            
-        except Exception as e:
-            error_str = str(e)
-            
-            # If this was the primary model and we got an overloaded error
-            if attempt == 0 and "overloaded_error" in error_str:
-                st.warning(f"Primary AI model is busy. Trying with a faster model...")
-                time.sleep(1)  # Brief pause before retrying
-                continue
-                
-            # If this was the fallback model or another error
-            elif attempt == max_retries - 1:
-                st.error(f"API error: {error_str}")
-                return json.dumps({"error": f"API error: {error_str}"})
-                
-            # If this was the primary model but not an overloaded error
-            else:
-                st.error(f"API error: {error_str}")
-                return json.dumps({"error": f"API error: {error_str}"})
-
 # Display nurse information in a nice way
 def display_nurse_details(nurse):
-    nurse_name = str(nurse['Ticket Number Counter']) if pd.notna(nurse['Ticket Number Counter']) else "Unknown"
     nurse_license = str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else "Unknown"
     nurse_experience = str(nurse['Experience Level  ']) if pd.notna(nurse['Experience Level  ']) else "Unknown"
     nurse_state = str(nurse['State (MedSpa Premise)']) if pd.notna(nurse['State (MedSpa Premise)']) else "Unknown"
@@ -1113,55 +339,14 @@ def display_nurse_details(nurse):
     
     # Add California restriction warning if applicable
     ca_restriction = ""
-    if nurse_state.upper() == "CA":
+    if normalize_state(nurse_state) == "CA":
         ca_restriction = """
         <div class="state-restrictions">
             <strong>California Restriction:</strong> This nurse can only be matched with medical directors in California due to state licensing requirements.
         </div>
         """
     st.markdown(f"""
-<style>
-.nurse-info {{
-    background-color: #f9f9f9;
-    border-radius: 12px;
-    padding: 20px;
-    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-    max-width: 600px;
-    margin: 0 auto;
-    font-family: Arial, sans-serif;
-}}
-.nurse-detail {{
-    margin-bottom: 15px;
-    padding-bottom: 15px;
-    border-bottom: 1px solid #e0e0e0;
-}}
-.nurse-detail:last-child {{
-    border-bottom: none;
-}}
-.nurse-detail h4 {{
-    color: #2c3e50;
-    margin-bottom: 10px;
-    font-size: 18px;
-    border-bottom: 2px solid #3498db;
-    padding-bottom: 5px;
-}}
-.nurse-detail p {{
-    margin: 5px 0;
-    color: #34495e;
-}}
-.nurse-detail strong {{
-    color: #2980b9;
-    margin-right: 8px;
-}}
-.trait-tag.state-tag {{
-    display: inline-block;
-    background-color: #f0ad4e;
-    color: white;
-    padding: 4px 8px;
-    border-radius: 4px;
-    font-size: 14px;
-}}
-</style>
+<div class="nurse-profile">
 <div class="nurse-info">
     <div class="nurse-detail">
         <h4>License & Experience</h4>
@@ -1174,13 +359,560 @@ def display_nurse_details(nurse):
         {ca_restriction or ''}
     </div>
 </div>
+</div>
 """, unsafe_allow_html=True)
+
+# Per-rerun timing readout for a search panel
+def display_rerun_timing(panel_start):
+    panel_ms = (time.perf_counter() - panel_start) * 1000
+    last_full_ms = st.session_state.get('last_full_rerun_ms')
+    readout = f"Panel rerun: {panel_ms:.0f} ms"
+    if last_full_ms is not None:
+        readout += f" · last full-page rerun: {last_full_ms:.0f} ms"
+    st.caption(readout)
+
+# Display match cards (instant ranking or AI results) in a single markdown payload
+def display_match_cards(matches, title, profiles=None):
+    st.markdown(render_match_cards(matches, profiles, title), unsafe_allow_html=True)
+
+# Location and traits for each MD named in model results (O(1) map lookups), plus the names that did not resolve
+def md_profiles_for_matches(matches):
+    profiles = []
+    misses = []
+    for match in matches:
+        md = resolve_match_doctor(match, doctors_df, roster_indexes)
+        if md is None:
+            profiles.append(None)
+            misses.append(str(match.get('name') or match.get('email') or 'Unnamed match'))
+            continue
+        
+        states = md.get('States List', [])
+        if not states and 'Residing State  (Lives In)' in md:
+            states = [md.get('Residing State  (Lives In)', '')]
+        traits = row_text(md, 'Personality Traits', roster_indexes.get("doctor_text"))
+        profiles.append({"states": states, "traits": extract_personality_traits(traits)})
+    return profiles, misses
+
+# Tell the user which AI results could not be tied back to a roster MD instead of silently dropping their details
+def report_enrichment_misses(misses):
+    if misses:
+        st.warning(
+            "Location and traits unavailable for: " + ", ".join(misses)
+            + ". The AI returned a name/email that does not match the MD roster."
+        )
+
+# Session-scoped LRU of recent results, so revisiting a selection and filters does not recompute or re-query the AI
+def get_result_memo():
+    if 'result_memo' not in st.session_state:
+        st.session_state['result_memo'] = new_result_memo()
+    return st.session_state['result_memo']
+
+# Build a displayable result; profiles/misses carry MD enrichment for AI results, run_id the recorded match run
+def make_search_result(search_type, search_value, title, matches, source, profiles=None, misses=None, generated_at=None,
+                       run_id=None):
+    short_value = str(search_value).strip()
+    if len(short_value) > 28:
+        short_value = short_value[:27] + "…"
+    return {
+        "search_type": search_type,
+        "title": title,
+        "matches": matches,
+        "profiles": profiles,
+        "misses": misses or [],
+        "source": source,
+        "generated_at": generated_at,
+        "label": f"{short_value} · {'AI' if source == 'llm' else 'ranked'}",
+        "run_id": run_id,
+    }
+
+# Persist a result as a match run so ratings can reference it; when the store is unavailable the result
+# is still shown, just without rating
+def record_run(search_type, search_value, match_filters, source, matches, **provenance):
+    try:
+        with trace_span("record_run"):
+            return record_match_run(search_type, search_value, match_filters, source, matches, **provenance)
+    except sqlite3.Error as e:
+        st.caption(f"Match run not recorded ({e}); rating is unavailable for this result.")
+        return None
+
+# Save one card's rating (form callback, so it is stored before the rerun) and keep the result on screen
+def save_match_rating(result, match_rank, form_key):
+    try:
+        feedback_id, error = add_run_feedback(
+            result["run_id"], match_rank, st.session_state[f"{form_key}_rating"], st.session_state[f"{form_key}_comments"]
+        )
+    except sqlite3.Error as e:
+        feedback_id, error = None, f"Rating not saved: {e}"
+    message = error or f"Rating saved (feedback #{feedback_id})."
+    st.session_state.setdefault('rated_results', {})[result["search_type"]] = {"result": result, "message": message, "saved": not error}
+
+# A rating form under each card: rating and an optional comment, written as feedback keyed to the run
+def display_rating_forms(result):
+    if not result.get("run_id") or not result["matches"]:
+        return
+    with st.expander("Rate these matches"):
+        for match_rank, match in enumerate(result["matches"]):
+            form_key = f"rate_{result['run_id']}_{match_rank}"
+            with st.form(form_key, clear_on_submit=True, border=False):
+                name_col, rating_col, comments_col, submit_col = st.columns([3, 3, 4, 1])
+                with name_col:
+                    st.markdown(f"**{match.get('name', 'Match')}** · {match.get('match_score', '')}/10")
+                with rating_col:
+                    st.slider("Your rating", 1, 10, 5, key=f"{form_key}_rating", label_visibility="collapsed")
+                with comments_col:
+                    st.text_input("Comments", key=f"{form_key}_comments", placeholder="Comments (optional)",
+                                  label_visibility="collapsed")
+                with submit_col:
+                    st.form_submit_button("Rate", on_click=save_match_rating, args=(result, match_rank, form_key))
+
+# After a rating is saved, show the rated result again with the outcome; returns whether it did
+def redisplay_rated_result(panel_key):
+    rated = st.session_state.get('rated_results', {}).pop(panel_key, None)
+    if not rated:
+        return False
+    display_search_result(rated["result"])
+    (st.success if rated["saved"] else st.error)(rated["message"])
+    return True
+
+def display_search_result(result, from_history=False):
+    with trace_span("render", matches=len(result["matches"])):
+        display_match_cards(result["matches"], result["title"], result.get("profiles"))
+    report_enrichment_misses(result.get("misses", []))
+    if from_history:
+        st.caption("Shown from this session's recent results.")
+    elif result.get("generated_at"):
+        st.caption(f"Precomputed matches from the match sheet generated {result['generated_at']}.")
+    display_rating_forms(result)
+
+# Recent results as a strip of buttons; returns the result the user picked, if any
+def display_history_strip(panel_key):
+    recent = memo_recent(get_result_memo(), limit=HISTORY_STRIP_SIZE)
+    if not recent:
+        return None
+    
+    st.markdown("<h4 class='subheader'>Recent results</h4>", unsafe_allow_html=True)
+    chosen = None
+    for position, ((_, result), column) in enumerate(zip(recent, st.columns(len(recent)))):
+        with column:
+            if st.button(result["label"], key=f"{panel_key}_history_{position}", help=result["title"]):
+                chosen = result
+    return chosen
+
+# A trace for one match request when tracing is on. On a full-page rerun it starts with the script, so the
+# load_data call of the same rerun is part of the waterfall; a fragment rerun starts at the request
+def start_request_trace(search_type, search_value):
+    if not trace_requests:
+        return NULL_TRACE
+    start = st.session_state.get('full_run_start')
+    trace = start_trace("match_request", enabled=True, start=start, search_type=search_type, search_value=str(search_value)[:80])
+    if start is not None:
+        trace.record("load_data", *load_data_span)
+    return trace
+
+# Write a finished request's trace to the log and keep it for the debug panel
+def finish_request_trace(trace):
+    if not trace.enabled or trace.finished:
+        return
+    try:
+        record = trace.finish()
+    except OSError as e:
+        st.caption(f"Trace not written to {TRACE_LOG} ({e}).")
+        record = trace.to_dict()
+    st.session_state['last_trace'] = record
+    # The sidebar is outside the panel fragments, so after a fragment rerun it shows this trace only later
+    if 'full_run_start' not in st.session_state:
+        st.caption(
+            f"Trace {record['trace_id']}: {record['duration_ms']:.0f} ms. "
+            "The sidebar waterfall shows it after the next full-page rerun."
+        )
+
+# Debug panel: the stage waterfall of this session's last traced request
+def display_trace_panel():
+    trace = st.session_state.get('last_trace')
+    with st.expander("Last request trace", expanded=True):
+        if not trace:
+            st.caption("No traced request yet. Run a search to see where its time goes.")
+            return
+        st.caption(
+            f"Trace {trace['trace_id']} · {trace['attrs'].get('search_type')} search · {trace['duration_ms']:.0f} ms · "
+            f"{len(trace['spans'])} spans"
+        )
+        st.markdown(render_trace_waterfall(trace), unsafe_allow_html=True)
+
+# Run one search as a traced request; an AI pass still running when the page reruns finishes the trace later
+def run_search(search_type, search_value, match_filters, title):
+    trace = start_request_trace(search_type, search_value)
+    with use_trace(trace):
+        serve_search(search_type, search_value, match_filters, title, trace)
+    finish_request_trace(trace)
+
+# Serve one search: memoized result, nightly sheet or live ranking first, then the optional AI refinement
+def serve_search(search_type, search_value, match_filters, title, trace):
+    memo = get_result_memo()
+    memo_key = result_memo_key(search_type, search_value, match_filters, roster_version)
+    result = memo_get(memo, memo_key)
+    # A prefetch started for exactly this search (same person, default filters) is picked up instead of repeated
+    speculation = take_speculation(search_type, memo_key)
+    speculative_jobs = []
+    if speculation is None and prefetch_matches and search_type in DEFAULT_SHEET_FILTERS:
+        get_speculation_tracker().record_miss()
+    
+    if result is None:
+        # Serve the nightly match sheet when it covers this search, otherwise rank live
+        with trace_span("sheet_lookup"):
+            precomputed = lookup_match_sheet(
+                match_sheet, search_type, search_value, match_filters, doctors_df, nurses_df, roster_indexes
+            )
+        if precomputed:
+            result = make_search_result(
+                search_type, search_value, title, precomputed["matches"], precomputed["source"],
+                generated_at=precomputed["generated_at"],
+                run_id=record_run(search_type, search_value, match_filters, f"sheet-{precomputed['source']}", precomputed["matches"])
+            )
+        else:
+            rank_job = speculation_job(speculation, "rank_job_id")
+            # A prefetched ranking still waiting behind AI jobs is quicker to redo than to wait for
+            if rank_job is not None and rank_job.status == "queued":
+                discard_job(rank_job)
+                rank_job = None
+            if rank_job is not None:
+                trace.link(rank_job.trace)
+                with trace_span("prefetched_rank_wait"):
+                    rank_job.wait()
+            if rank_job is not None and rank_job.status == "done":
+                speculative_jobs.append(rank_job)
+                ranked_matches, error = rank_job.result["matches"], rank_job.result["error"]
+                rank_ms = rank_job.work_seconds() * 1000
+            else:
+                rank_start = time.perf_counter()
+                with trace_span("rank"):
+                    ranked_matches, error = rank_candidates(
+                        search_type, search_value, doctors_df, nurses_df, filters=match_filters, indexes=roster_indexes
+                    )
+                rank_ms = (time.perf_counter() - rank_start) * 1000
+            if error:
+                discard_job(speculation_job(speculation, "refine_job_id"))
+                st.error(error)
+                return
+            result = make_search_result(
+                search_type, search_value, title, ranked_matches, "ranker",
+                run_id=record_run(search_type, search_value, match_filters, "ranker", ranked_matches, latency_ms=rank_ms)
+            )
+        memo_put(memo, memo_key, result)
+    
+    # Show the deterministic ranking (or a remembered result) immediately; the AI result replaces it when available
+    result_placeholder = st.empty()
+    with result_placeholder.container():
+        display_search_result(result)
+    
+    refine_job = speculation_job(speculation, "refine_job_id")
+    if refine_job is not None and (result["source"] == "llm" or not claude_api_key or not refine_with_ai or refine_job.cancelled):
+        discard_job(refine_job)
+        refine_job = None
+    if refine_job is not None:
+        # Skip the rest of the prefetch's settle-down hold; the user has asked for this result
+        refine_job.release()
+        speculative_jobs.append(refine_job)
+    if speculative_jobs:
+        get_speculation_tracker().record_hit(speculative_jobs)
+    
+    if result["source"] == "llm":
+        return
+    if not claude_api_key:
+        st.info("AI refinement is not configured (set the ANTHROPIC_API_KEY environment variable). Showing the instant ranking.")
+        return
+    if not refine_with_ai:
+        return
+    
+    # Hand the AI pass to the background queue; a later selection change cancels it instead of blocking the panel
+    pending_jobs = get_pending_jobs()
+    pending = pending_jobs.get(search_type)
+    if pending and pending["memo_key"] != memo_key:
+        get_job_queue().cancel(pending["job_id"])
+        pending = None
+    if pending is None and refine_job is not None:
+        pending = {
+            "job_id": refine_job.id, "search_value": search_value, "memo_key": memo_key, "title": title,
+            "filters": match_filters,
+        }
+        pending_jobs[search_type] = pending
+    if pending is None:
+        job, busy_error = get_job_queue().submit(
+            memo_key, refine_match_job, search_type, search_value, doctors_df, nurses_df, roster_indexes,
+            match_filters, claude_api_key, trace=trace
+        )
+        if job is None:
+            st.warning(f"{busy_error} Showing the instant ranking.")
+            return
+        pending = {
+            "job_id": job.id, "search_value": search_value, "memo_key": memo_key, "title": title, "filters": match_filters,
+        }
+        pending_jobs[search_type] = pending
+    # This request now owns the AI pass; if the page reruns before it finishes, the resumed panel ends the trace
+    pending["trace"] = trace
+    await_refinement(search_type, pending, result_placeholder)
+
+# Process-wide queue for AI refinement jobs, shared by all sessions
+@st.cache_resource
+def get_job_queue():
+    return MatchJobQueue()
+
+# This session's in-flight AI job per panel
+def get_pending_jobs():
+    if 'pending_jobs' not in st.session_state:
+        st.session_state['pending_jobs'] = {}
+    return st.session_state['pending_jobs']
+
+# Cancel a panel's AI job once the user has moved on to someone else
+def cancel_stale_job(panel_key, search_value):
+    pending = get_pending_jobs().get(panel_key)
+    if pending and pending["search_value"] != search_value:
+        get_job_queue().cancel(pending["job_id"])
+        del get_pending_jobs()[panel_key]
+
+# Process-wide prefetch statistics and the budget for abandoned speculative AI calls
+@st.cache_resource
+def get_speculation_tracker():
+    return SpeculationTracker()
+
+# This session's prefetch per panel: the selection, its default-filter memo key and the background job ids
+def get_speculations():
+    if 'speculations' not in st.session_state:
+        st.session_state['speculations'] = {}
+    return st.session_state['speculations']
+
+def speculation_job(speculation, job_field):
+    if not speculation or speculation[job_field] is None:
+        return None
+    return get_job_queue().get(speculation[job_field])
+
+def discard_job(job):
+    if job is not None:
+        get_job_queue().cancel(job.id)
+
+def abandon_speculation(speculation):
+    jobs = [job for job in (speculation_job(speculation, field) for field in ("rank_job_id", "refine_job_id")) if job]
+    if not jobs:
+        return
+    for job in jobs:
+        discard_job(job)
+    get_speculation_tracker().record_abandoned(jobs)
+
+# Hand the panel's prefetch to a search when it matches; a prefetch for anything else is abandoned
+def take_speculation(panel_key, memo_key):
+    speculations = get_speculations()
+    speculation = speculations.get(panel_key)
+    if speculation is None or not (speculation["rank_job_id"] or speculation["refine_job_id"]):
+        return None
+    # Keep the selection so it is not prefetched again after the search, but without its jobs
+    speculations[panel_key] = dict(speculation, rank_job_id=None, refine_job_id=None)
+    if speculation["memo_key"] != memo_key:
+        abandon_speculation(speculation)
+        return None
+    return speculation
+
+# Opt-in: when the selection changes, start its default-filter ranking and AI pass before the button is pressed
+def speculate_search(panel_key, search_value):
+    speculations = get_speculations()
+    current = speculations.get(panel_key)
+    if current and current["search_value"] == search_value and prefetch_matches:
+        return
+    if current:
+        abandon_speculation(speculations.pop(panel_key))
+    if not prefetch_matches or not search_value:
+        return
+    
+    # Leave at least half of the queue for searches users actually asked for
+    queue = get_job_queue()
+    if queue.in_flight() >= queue.max_in_flight // 2:
+        return
+    
+    filters = DEFAULT_SHEET_FILTERS[panel_key]
+    memo_key = result_memo_key(panel_key, search_value, filters, roster_version)
+    known = get_result_memo().get(memo_key) or lookup_match_sheet(
+        match_sheet, panel_key, search_value, filters, doctors_df, nurses_df, roster_indexes
+    )
+    speculation = {"search_value": search_value, "memo_key": memo_key, "rank_job_id": None, "refine_job_id": None}
+    # The prefetch jobs' spans join the trace of the search that picks them up
+    prefetch_trace = start_trace("prefetch", enabled=trace_requests, search_type=panel_key)
+    if known is None:
+        job, _ = queue.submit(
+            ("rank",) + memo_key, rank_match_job, panel_key, search_value, doctors_df, nurses_df, roster_indexes, filters,
+            trace=prefetch_trace
+        )
+        speculation["rank_job_id"] = job.id if job else None
+    if claude_api_key and refine_with_ai and (known is None or known["source"] != "llm") and get_speculation_tracker().allow_llm():
+        job, _ = queue.submit(
+            memo_key, refine_match_job, panel_key, search_value, doctors_df, nurses_df, roster_indexes, filters,
+            claude_api_key, hold=SPECULATION_HOLD_SECONDS, trace=prefetch_trace
+        )
+        speculation["refine_job_id"] = job.id if job else None
+    if speculation["rank_job_id"] or speculation["refine_job_id"]:
+        speculations[panel_key] = speculation
+        get_speculation_tracker().record_started()
+
+# Re-attach to a panel's AI job after an unrelated rerun, showing the instant ranking while it finishes
+def resume_pending_search(panel_key):
+    pending = get_pending_jobs().get(panel_key)
+    if not pending:
+        return False
+    trace = pending.get("trace", NULL_TRACE)
+    with use_trace(trace):
+        result = memo_get(get_result_memo(), pending["memo_key"])
+        result_placeholder = st.empty()
+        if result is not None:
+            with result_placeholder.container():
+                display_search_result(result)
+        await_refinement(panel_key, pending, result_placeholder)
+    finish_request_trace(trace)
+    return True
+
+# Poll the AI job, showing its progress; every poll writes to the page, so any interaction interrupts the wait
+def await_refinement(panel_key, pending, result_placeholder):
+    job = get_job_queue().get(pending["job_id"])
+    if job is None:
+        get_pending_jobs().pop(panel_key, None)
+        return
+    
+    if not job.done() and st.button("Cancel AI refinement", key=f"{panel_key}_cancel_job"):
+        get_job_queue().cancel(job.id)
+        get_pending_jobs().pop(panel_key, None)
+        st.caption("AI refinement cancelled. Showing the instant ranking.")
+        return
+    
+    pending.get("trace", NULL_TRACE).link(job.trace)
+    progress_area = st.empty()
+    with trace_span("await_ai"):
+        while not job.done():
+            progress_area.caption(f"Refining the ranking with AI: {job.progress} ({job.elapsed():.0f}s)")
+            job.wait(JOB_POLL_INTERVAL)
+    progress_area.empty()
+    get_pending_jobs().pop(panel_key, None)
+    
+    if job.status == "cancelled":
+        return
+    if job.status == "failed":
+        st.warning(f"AI refinement failed ({job.error}). Showing the instant ranking.")
+        return
+    if "error" in job.result:
+        st.error(job.result["error"])
+        return
+    
+    response = job.result["response"]
+    try:
+        with trace_span("parse_response", chars=len(response)):
+            matches = json.loads(response)
+    except json.JSONDecodeError:
+        st.error("Error parsing response. Please try again.")
+        st.text(response)
+        return
+    if "error" in matches:
+        st.warning("AI refinement is unavailable. Showing the instant ranking.")
+        return
+    
+    search_type = pending["memo_key"][0]
+    title = pending["title"]
+    llm_matches = matches.get("matches", [])
+    profiles = None
+    misses = []
+    if search_type == "nurse":
+        # Attach each MD's location and traits
+        profiles, misses = md_profiles_for_matches(llm_matches)
+        profiles = [profile or {} for profile in profiles]
+    elif search_type == "manual":
+        person_type = matches.get("person_type", "professional")
+        title = f"Top Matches for this {person_type.capitalize()}"
+        # If matching with a doctor, show their location and traits when we have any
+        if person_type.lower() == "nurse":
+            profiles, misses = md_profiles_for_matches(llm_matches)
+            profiles = [profile if profile and (profile["states"] or profile["traits"]) else None for profile in profiles]
+    
+    run_id = record_run(
+        search_type, pending["search_value"], pending.get("filters"), "llm", llm_matches,
+        prompt_hash=job.result.get("prompt_hash"), usage=job.result.get("usage")
+    )
+    result = make_search_result(
+        search_type, pending["search_value"], title, llm_matches, "llm", profiles=profiles, misses=misses, run_id=run_id
+    )
+    memo_put(get_result_memo(), pending["memo_key"], result)
+    result_placeholder.empty()
+    with result_placeholder.container():
+        display_search_result(result)
+
+# Version of the roster exports and ranking weights; the nightly match sheet is only used for the same version
+@st.cache_data(ttl=300)
+def get_roster_version():
+    return roster_fingerprint()
+
+# Nightly match sheet for the current roster version (None when the job has not run for this fingerprint)
+@st.cache_data(ttl=300)
+def get_match_sheet(version):
+    return load_match_sheet(version)
+
 # Main application content
-doctors_df, nurses_df = load_data()
+load_data_start = time.perf_counter()
+doctors_df, nurses_df, roster_indexes = load_data()
+load_data_span = (load_data_start, time.perf_counter())
 
 if doctors_df is None or nurses_df is None:
     st.error("Failed to load data. Please check the data files.")
 else:
+    # Overlay live capacity from the ledger so MDs who are already full drop out of the filters
+    live_capacity = None
+    try:
+        live_capacity = get_available_capacity(get_capacity_cache())
+        doctors_df = apply_live_capacity(doctors_df, live_capacity)
+    except sqlite3.Error as e:
+        st.warning(f"Capacity ledger unavailable, using static capacity: {e}")
+    sheet_version = get_roster_version()
+    match_sheet = get_match_sheet(sheet_version)
+    # Memoized results also depend on live capacity, so they are keyed by the ledger version as well
+    roster_version = (sheet_version, get_capacity_cache()["version"])
+    
+    # Capacity ledger: record reservations and confirmed matches so capacity stays current
+    with st.sidebar.expander("Capacity Ledger"):
+        md_emails = {
+            f"{row['First Name']} {row['Last Name']}": row['Email']
+            for _, row in doctors_df[['First Name', 'Last Name', 'Email']].iterrows()
+        }
+        with st.form("reserve_capacity_form", clear_on_submit=True):
+            ledger_md = st.selectbox("Medical Director:", sorted(md_emails))
+            ledger_license = st.radio("License Type:", list(LEDGER_LICENSE_TYPES), horizontal=True)
+            ledger_nurse = st.text_input("Nurse (email or ticket):")
+            reserve_submitted = st.form_submit_button("Reserve Slot")
+        
+        if reserve_submitted and ledger_md:
+            try:
+                reservation_id, ledger_error = reserve_capacity(md_emails[ledger_md], ledger_license, ledger_nurse or None)
+                if ledger_error:
+                    st.error(ledger_error)
+                else:
+                    st.success(f"Reserved slot #{reservation_id} with {ledger_md}.")
+                    st.rerun()
+            except sqlite3.Error as e:
+                st.error(f"Could not reserve capacity: {e}")
+        
+        try:
+            active_reservations = list_active_reservations()
+        except sqlite3.Error as e:
+            active_reservations = []
+            st.error(f"Could not read reservations: {e}")
+        
+        for reservation in active_reservations:
+            st.markdown(
+                f"**#{reservation['id']}** {reservation['md_email']} · {reservation['license_type']} · "
+                f"{reservation['nurse'] or 'Unassigned'} · _{reservation['status']}_"
+            )
+            confirm_col, release_col = st.columns(2)
+            with confirm_col:
+                if reservation['status'] == 'reserved' and st.button("Confirm", key=f"confirm_{reservation['id']}"):
+                    confirm_reservation(reservation['id'])
+                    st.rerun()
+            with release_col:
+                if st.button("Release", key=f"release_{reservation['id']}"):
+                    release_reservation(reservation['id'])
+                    st.rerun()
+    
     # Display stats
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -1193,6 +925,34 @@ else:
     # Get Claude API key from environment variable
     claude_api_key = os.getenv("ANTHROPIC_API_KEY", "")
     
+    # The instant ranking is always shown; the AI pass refines it when enabled and configured
+    refine_with_ai = st.sidebar.toggle("Refine rankings with AI", value=True)
+    prefetch_matches = st.sidebar.toggle(
+        "Prefetch matches on selection", value=False,
+        help="Start the default-filter search as soon as an MD or nurse is picked, so results are ready when you press the button."
+    )
+    if prefetch_matches:
+        prefetch_stats = get_speculation_tracker().summary()
+        hit_rate = "n/a" if prefetch_stats["hit_rate"] is None else f"{prefetch_stats['hit_rate']:.0%}"
+        prefetch_readout = (
+            f"Prefetch hit rate: {hit_rate} ({prefetch_stats['hits']}/{prefetch_stats['hits'] + prefetch_stats['misses']})"
+            f" · {prefetch_stats['seconds_saved']:.1f}s saved · {prefetch_stats['wasted_llm_calls']} unused AI calls"
+        )
+        if prefetch_stats["llm_paused"]:
+            prefetch_readout += " · AI prefetch paused (unused-call budget reached)"
+        st.sidebar.caption(prefetch_readout)
+    job_stats = get_job_queue().stats()
+    if job_stats["running"] or job_stats["queued"]:
+        st.sidebar.caption(f"AI jobs: {job_stats['running']} running · {job_stats['queued']} queued")
+    # Debug: trace each match request (stage spans in the JSON trace log) and show the last one as a waterfall
+    trace_requests = st.sidebar.toggle(
+        "Trace match requests", value=TRACING_ENABLED,
+        help=f"Times load_data, filtering, prompt building, the AI call, parsing and rendering per request; traces go to {TRACE_LOG}."
+    )
+    trace_panel = st.sidebar.empty()
+    weights_version = active_ranking_weights()[0]
+    st.sidebar.caption(f"Ranking weights: learned v{weights_version}" if weights_version else "Ranking weights: defaults")
+    
     # Search options
     st.markdown("<h2 class='subheader'>Find MD Matches for Nurses</h2>", unsafe_allow_html=True)
     
@@ -1209,19 +969,20 @@ else:
         "Manual Entry": "manual"
     }[search_type]
     
-    if search_type_key == "md":
+    # Each search panel is a fragment: picking a person or submitting a form reruns only that panel
+    @st.fragment
+    def md_search_panel():
+        panel_start = time.perf_counter()
+        
         # Get a list of all doctors for the dropdown
-        doctor_names = [f"{row['First Name']} {row['Last Name']}" for _, row in doctors_df.iterrows()]
-        selected_doctor = st.selectbox("Select Medical Director:", [""] + sorted(doctor_names))
+        doctor_full_names = doctors_df['First Name'].astype(str) + " " + doctors_df['Last Name'].astype(str)
+        selected_doctor = st.selectbox("Select Medical Director:", [""] + sorted(doctor_full_names))
+        cancel_stale_job("md", selected_doctor)
+        speculate_search("md", selected_doctor)
         
         # If a doctor is selected, show their details
         if selected_doctor:
-            doctor_row = doctors_df[
-                doctors_df.apply(
-                    lambda row: selected_doctor.lower() in f"{row['First Name']} {row['Last Name']}".lower(), 
-                    axis=1
-                )
-            ]
+            doctor_row = doctors_df[doctor_full_names.str.lower().str.contains(selected_doctor.lower(), regex=False)]
             
             if not doctor_row.empty:
                 doctor = doctor_row.iloc[0]
@@ -1231,15 +992,17 @@ else:
                 if not doctor_states and 'Residing State  (Lives In)' in doctor:
                     doctor_states = [doctor.get('Residing State  (Lives In)', '')]
                     
-                traits = extract_personality_traits(doctor.get('Personality Traits', ''))
-                preferences = extract_md_preferences(doctor.get('MD Preferences', ''))
+                # Long text lives in the side store; fetch it for just this doctor
+                doctor_text = roster_indexes["doctor_text"].row(doctor.name)
+                traits = extract_personality_traits(doctor_text.get('Personality Traits', ''))
+                preferences = extract_md_preferences(doctor_text.get('MD Preferences', ''))
                 
                 # Create HTML tags for display
                 states_html = ""
                 for state in doctor_states:
                     if state and pd.notna(state):
                         state_class = "trait-tag state-tag"
-                        if state.upper() == "CA":
+                        if normalize_state(state) == "CA":
                             state_class += " warning-tag"
                         states_html += f'<span class="{state_class}">{state}</span> '
                 
@@ -1262,7 +1025,7 @@ else:
                 capacity_html += f'<span class="trait-tag capacity-tag">NP Capacity: {np_capacity}</span> '
                 capacity_html += f'<span class="trait-tag capacity-tag">RN Capacity: {rn_capacity}</span> '
                 
-                if "CA" in [s.upper() for s in doctor_states if s]:
+                if "CA" in parse_state_codes(doctor_states):
                     ca_restriction = """
                     <div class="state-restrictions">
                         <strong>California Restriction:</strong> This medical director can only supervise nurses in California due to state licensing requirements.
@@ -1295,10 +1058,10 @@ else:
                 """, unsafe_allow_html=True)
                 
         
-        # Add specific filtering criteria
+        # Add specific filtering criteria; the form holds widget changes until the search is submitted
         st.markdown("<h3 class='subheader'>Nurse Preference Filters</h3>", unsafe_allow_html=True)
         
-        with st.container():
+        with st.form("md_search_form"):
             st.markdown('<div class="filter-section">', unsafe_allow_html=True)
             col1, col2, col3 = st.columns(3)
             
@@ -1315,7 +1078,7 @@ else:
                     if not doctor_states and 'Residing State  (Lives In)' in doctor_row.iloc[0]:
                         doctor_states = [doctor_row.iloc[0].get('Residing State  (Lives In)', '')]
                     
-                    if "CA" in [s.upper() for s in doctor_states if s]:
+                    if "CA" in parse_state_codes(doctor_states):
                         st.info("California medical directors can only supervise California nurses.")
                         location_preference = "Same State Only"
                     else:
@@ -1324,71 +1087,38 @@ else:
                     location_preference = st.radio("Location Priority:", ["Same State Only", "Nearby States Acceptable", "Any Location"])
             
             st.markdown('</div>', unsafe_allow_html=True)
-        
-        additional_requirements = st.text_area("Additional Requirements (service types, availability, etc.):", height=100)
-        
-        if selected_doctor and st.button("Find Matching Nurses"):
-            if not claude_api_key:
-                st.error("API key is not configured. Please set the ANTHROPIC_API_KEY environment variable.")
-            else:
-                with st.spinner("Finding the best nurse matches..."):
-                    # Update prompt creation to include the filters
-                    prompt, error = create_claude_prompt(
-                        search_type_key, 
-                        selected_doctor, 
-                        doctors_df, 
-                        nurses_df,
-                        filters={
-                            "experience": exp_filter if exp_filter != "Any" else None,
-                            "license_type": license_filter if license_filter != "Any" else None,
-                            "location": location_preference,
-                            "requirements": additional_requirements
-                        }
-                    )
-                    
-                    if error:
-                        st.error(error)
-                    else:
-                        # Create a hash for caching
-                        prompt_hash = get_prompt_hash(prompt)
-                        
-                        # Call Claude API with caching
-                        response = cached_claude_api(prompt_hash, prompt, claude_api_key)
-                        
-                        try:
-                            matches = json.loads(response)
-                            
-                            # Display matches
-                            st.markdown(f"<h3>Top Nurse Matches for {selected_doctor}</h3>", unsafe_allow_html=True)
-                            
-                            for match in matches.get("matches", []):
-                                # Determine score color class
-                                score = float(match['match_score'])
-                                score_class = "high-score" if score >= 8.0 else "medium-score" if score >= 6.0 else "low-score"
-                                
-                                license_html = ""
-                                if 'license_type' in match:
-                                    license_html = f"<p><strong>License:</strong> {match['license_type']}</p>"
-                                
-                                st.markdown(
-                                    f"""<div class="match-card">
-                                    <div style="display: flex; justify-content: space-between; align-items: center;">
-                                        <h4>{match['name']}</h4>
-                                        <div class="compatibility-score {score_class}">{match['match_score']}</div>
-                                    </div>
-                                    <p><strong>Contact:</strong> {match['email']}</p>
-                                    {license_html}
-                                    <div class="match-reason">
-                                        <p><strong>Why this match works:</strong> {match['reasoning']}</p>
-                                    </div>
-                                    </div>""",
-                                    unsafe_allow_html=True
-                                )
-                        except json.JSONDecodeError:
-                            st.error("Error parsing response. Please try again.")
-                            st.text(response)
+            
+            additional_requirements = st.text_area("Additional Requirements (service types, availability, etc.):", height=100)
+            search_submitted = st.form_submit_button("Find Matching Nurses")
+        
+        if search_submitted and not selected_doctor:
+            st.warning("Select a medical director first.")
+        
+        # Results go above the history strip so a result picked from the strip shows in the same place
+        results_area = st.container()
+        with results_area:
+            if selected_doctor and search_submitted:
+                match_filters = {
+                    "experience": exp_filter if exp_filter != "Any" else None,
+                    "license_type": license_filter if license_filter != "Any" else None,
+                    "location": location_preference,
+                    "requirements": additional_requirements
+                }
+                run_search(search_type_key, selected_doctor, match_filters, f"Top Nurse Matches for {selected_doctor}")
+        
+        history_result = display_history_strip("md")
+        with results_area:
+            if history_result and not search_submitted:
+                display_search_result(history_result, from_history=True)
+            elif not search_submitted and not resume_pending_search("md"):
+                redisplay_rated_result("md")
     
-    elif search_type_key == "nurse":
+        display_rerun_timing(panel_start)
+    
+    @st.fragment
+    def nurse_search_panel():
+        panel_start = time.perf_counter()
+        
         # Try to read column names in a case-insensitive way
         def get_column_case_insensitive(df, column_name):
             """Get the actual case of a column name regardless of case."""
@@ -1406,20 +1136,14 @@ else:
 
         # Try different columns to find identifiers
         if nurse_email_col:  # First, collect emails since they're likely to be more reliable
-            for _, row in nurses_df.iterrows():
-                if pd.notna(row[nurse_email_col]):
-                    email = str(row[nurse_email_col]).strip()
-                    if email and '@' in email:  # Simple validation to ensure it's an email
-                        nurse_identifiers.append(email)
+            emails = nurses_df[nurse_email_col].dropna().astype(str).str.strip()
+            # Simple validation to ensure it's an email
+            nurse_identifiers = emails[emails.str.contains('@', regex=False)].tolist()
 
         # If we also have names, prefer those but keep emails as fallback
         if nurse_name_col:
-            name_based_identifiers = []
-            for _, row in nurses_df.iterrows():
-                if pd.notna(row[nurse_name_col]):
-                    name = str(row[nurse_name_col]).strip()
-                    if name:  # Only add non-empty names
-                        name_based_identifiers.append(name)
+            names = nurses_df[nurse_name_col].dropna().astype(str).str.strip()
+            name_based_identifiers = names[names != ''].tolist()
             
             # If we have names, use those instead of emails
             if name_based_identifiers:
@@ -1435,6 +1159,8 @@ else:
             st.info(f"Found {len(nurse_identifiers)} nurses in the data.")
             # Sort and add a blank option at the beginning
             selected_nurse = st.selectbox("Select Nurse:", [""] + sorted(nurse_identifiers))
+            cancel_stale_job("nurse", selected_nurse)
+            speculate_search("nurse", selected_nurse)
 
         # Find the selected nurse in the dataframe - checking both name and email columns
         if selected_nurse and selected_nurse != "No nurses available":
@@ -1443,10 +1169,7 @@ else:
             # Try to find by name first
             if nurse_name_col:
                 name_matches = nurses_df[
-                    nurses_df.apply(
-                        lambda row: pd.notna(row[nurse_name_col]) and selected_nurse.lower() in str(row[nurse_name_col]).lower(),
-                        axis=1
-                    )
+                    nurses_df[nurse_name_col].astype('string').str.lower().str.contains(selected_nurse.lower(), regex=False).fillna(False)
                 ]
                 if not name_matches.empty:
                     nurse_row = name_matches
@@ -1454,10 +1177,7 @@ else:
             # If not found by name, try email
             if (nurse_row is None or nurse_row.empty) and nurse_email_col:
                 email_matches = nurses_df[
-                    nurses_df.apply(
-                        lambda row: pd.notna(row[nurse_email_col]) and selected_nurse.lower() in str(row[nurse_email_col]).lower(),
-                        axis=1
-                    )
+                    nurses_df[nurse_email_col].astype('string').str.lower().str.contains(selected_nurse.lower(), regex=False).fillna(False)
                 ]
                 if not email_matches.empty:
                     nurse_row = email_matches
@@ -1466,10 +1186,10 @@ else:
                 nurse = nurse_row.iloc[0]
                 display_nurse_details(nurse)
         
-        # Add specific filtering criteria
+        # Add specific filtering criteria; the form holds widget changes until the search is submitted
         st.markdown("<h3 class='subheader'>MD Preference Filters</h3>", unsafe_allow_html=True)
         
-        with st.container():
+        with st.form("nurse_search_form"):
             st.markdown('<div class="filter-section">', unsafe_allow_html=True)
             col1, col2 = st.columns(2)
             
@@ -1487,7 +1207,7 @@ else:
             
             # Determine location options based on nurse state
             if selected_nurse and nurse_row is not None and not nurse_row.empty:
-                nurse_state = str(nurse_row.iloc[0]['State (MedSpa Premise)']).upper() if pd.notna(nurse_row.iloc[0]['State (MedSpa Premise)']) else "Unknown"
+                nurse_state = normalize_state(nurse_row.iloc[0]['State (MedSpa Premise)']) or "Unknown"
                 
                 if nurse_state == "CA":
                     st.info("California nurses can only be matched with California medical directors due to state requirements.")
@@ -1498,113 +1218,39 @@ else:
                 location_preference = st.radio("Location Priority:", ["Same State Only", "Nearby States Acceptable", "Any Location"])
             
             st.markdown('</div>', unsafe_allow_html=True)
-        
-        service_requirements = st.text_area("Specific Requirements or Preferences:", height=100, 
-                                       placeholder="E.g., Looking for a mentor in fillers, prefer someone with teaching experience, etc.")
-        
-        if selected_nurse and selected_nurse != "No nurses available" and st.button("Find Matching Medical Directors"):
-            if not claude_api_key:
-                st.error("API key is not configured. Please set the ANTHROPIC_API_KEY environment variable.")
-            else:
-                with st.spinner("Finding the best medical director matches..."):
-                    prompt, error = create_claude_prompt(
-                        search_type_key, 
-                        selected_nurse, 
-                        doctors_df, 
-                        nurses_df,
-                        filters={
-                            "md_age": md_age if md_age != "Any" else None,
-                            "interaction_style": interaction_style if interaction_style != "Any" else None,
-                            "location": location_preference,
-                            "service_requirements": service_requirements
-                        }
-                    )
-                    
-                    if error:
-                        st.error(error)
-                    else:
-                        # Create a hash for caching
-                        prompt_hash = get_prompt_hash(prompt)
-                        
-                        # Call Claude API with caching
-                        response = cached_claude_api(prompt_hash, prompt, claude_api_key)
-                        
-                        try:
-                            matches = json.loads(response)
-                            
-                            # Display matches
-                            st.markdown(f"<h3>Top Medical Director Matches for {selected_nurse}</h3>", unsafe_allow_html=True)
-                            
-                            for match in matches.get("matches", []):
-                                # Determine score color class
-                                score = float(match['match_score'])
-                                score_class = "high-score" if score >= 8.0 else "medium-score" if score >= 6.0 else "low-score"
-                                
-                                # Find the MD in the dataframe to get their traits and state
-                                md_name = match['name']
-                                md_row = doctors_df[
-                                    doctors_df.apply(
-                                        lambda row: md_name.lower() in f"{row['First Name']} {row['Last Name']}".lower(), 
-                                        axis=1
-                                    )
-                                ]
-                                
-                                # Get MD traits and location if available
-                                traits_html = ""
-                                states_html = ""
-                                
-                                if not md_row.empty:
-                                    md = md_row.iloc[0]
-                                    traits = extract_personality_traits(md.get('Personality Traits', ''))
-                                    
-                                    # Get states
-                                    states = md.get('States List', [])
-                                    if not states and 'Residing State  (Lives In)' in md:
-                                        states = [md.get('Residing State  (Lives In)', '')]
-                                    
-                                    # Create state tags
-                                    for state in states:
-                                        if state and pd.notna(state):
-                                            state_class = "trait-tag state-tag"
-                                            if state.upper() == "CA":
-                                                state_class += " warning-tag"
-                                            states_html += f'<span class="{state_class}">{state}</span> '
-                                    
-                                    # Create trait tags
-                                    for trait in traits:
-                                        if trait.strip():
-                                            traits_html += f'<span class="trait-tag">{trait.strip()}</span> '
-                                
-                                # Build the match card with traits and fixed location included
-                                st.markdown(
-                                    f"""<div class="match-card">
-                                    <div style="display: flex; justify-content: space-between; align-items: center;">
-                                        <h4>{match['name']}</h4>
-                                        <div class="compatibility-score {score_class}">{match['match_score']}</div>
-                                    </div>
-                                    <p><strong>Contact:</strong> {match['email']}</p>
-                                    <p><strong>Capacity:</strong> {match.get('capacity_status', 'Available')}</p>
-                                    <div class="nurse-info">
-                                        <div class="nurse-detail">
-                                            <h4>Location</h4>
-                                            {states_html if states_html else "Location not specified"}
-                                        </div>
-                                        <div class="nurse-detail">
-                                            <h4>Personality Traits</h4>
-                                            {traits_html if traits_html else "No traits specified"}
-                                        </div>
-                                    </div>
-                                    <div class="match-reason">
-                                        <p><strong>Why this match works:</strong> {match['reasoning']}</p>
-                                    </div>
-                                    </div>""",
-                                    unsafe_allow_html=True
-                                )
-                        except json.JSONDecodeError:
-                            st.error("Error parsing response. Please try again.")
-                            st.text(response)
+            
+            service_requirements = st.text_area("Specific Requirements or Preferences:", height=100, 
+                                           placeholder="E.g., Looking for a mentor in fillers, prefer someone with teaching experience, etc.")
+            search_submitted = st.form_submit_button("Find Matching Medical Directors")
+        
+        if search_submitted and not selected_nurse:
+            st.warning("Select a nurse first.")
+        
+        # Results go above the history strip so a result picked from the strip shows in the same place
+        results_area = st.container()
+        with results_area:
+            if selected_nurse and selected_nurse != "No nurses available" and search_submitted:
+                match_filters = {
+                    "md_age": md_age if md_age != "Any" else None,
+                    "interaction_style": interaction_style if interaction_style != "Any" else None,
+                    "location": location_preference,
+                    "service_requirements": service_requirements
+                }
+                run_search(search_type_key, selected_nurse, match_filters, f"Top Medical Director Matches for {selected_nurse}")
+        
+        history_result = display_history_strip("nurse")
+        with results_area:
+            if history_result and not search_submitted:
+                display_search_result(history_result, from_history=True)
+            elif not search_submitted and not resume_pending_search("nurse"):
+                redisplay_rated_result("nurse")
     
-    else:  # Manual entry
+        display_rerun_timing(panel_start)
+    
+    @st.fragment
+    def manual_search_panel():
+        panel_start = time.perf_counter()
+        
         st.markdown("""
         <div class="explanation">
             Enter information about the nurse you want to match. Include details like:
@@ -1618,131 +1264,46 @@ else:
         </div>
         """, unsafe_allow_html=True)
         
-        # Add more specific options for manual entry
-        col1, col2 = st.columns(2)
-        with col1:
-            person_type = st.radio("This person is a:", ["Nurse", "Unknown"])
-        
-        user_input = st.text_area("Enter professional information:", height=150, 
-                                placeholder="e.g., Jane Smith is an RN in California with 3 years of experience in Botox and fillers. She's looking for a mentor who can provide hands-on training.")
-        
-        matching_priorities = st.text_area(
-            "Specific matching priorities:", 
-            height=100,
-            placeholder="E.g., Must be in same state, looking for experienced MD with teaching experience, prefers collaborative style, etc."
-        )
-        
-        if user_input and st.button("Find Matches"):
-            if not claude_api_key:
-                st.error("API key is not configured. Please set the ANTHROPIC_API_KEY environment variable.")
-            else:
-                with st.spinner("Finding the best matches..."):
-                    prompt, error = create_claude_prompt(
-                        "manual", 
-                        user_input, 
-                        doctors_df, 
-                        nurses_df,
-                        filters={
-                            "person_type": person_type if person_type != "Unknown" else None,
-                            "matching_priorities": matching_priorities
-                        }
-                    )
-                    
-                    if error:
-                        st.error(error)
-                    else:
-                        # Create a hash for caching
-                        prompt_hash = get_prompt_hash(prompt)
-                        
-                        # Call Claude API with caching
-                        response = cached_claude_api(prompt_hash, prompt, claude_api_key)
-                        
-                        try:
-                            matches = json.loads(response)
-                            
-                            # Display person type
-                            person_type = matches.get("person_type", "professional")
-                            st.markdown(f"<h3>Top Matches for this {person_type.capitalize()}</h3>", unsafe_allow_html=True)
-                            
-                            for match in matches.get("matches", []):
-                                # Determine score color class
-                                score = float(match['match_score'])
-                                score_class = "high-score" if score >= 8.0 else "medium-score" if score >= 6.0 else "low-score"
-                                
-                                # If matching with a doctor, try to find their traits and location
-                                traits_html = ""
-                                states_html = ""
-                                
-                                if person_type.lower() == "nurse":
-                                    # Find the MD in the dataframe
-                                    md_name = match['name']
-                                    md_row = doctors_df[
-                                        doctors_df.apply(
-                                            lambda row: md_name.lower() in f"{row['First Name']} {row['Last Name']}".lower(), 
-                                            axis=1
-                                        )
-                                    ]
-                                    
-                                    if not md_row.empty:
-                                        md = md_row.iloc[0]
-                                        traits = extract_personality_traits(md.get('Personality Traits', ''))
-                                        
-                                        # Get states
-                                        states = md.get('States List', [])
-                                        if not states and 'Residing State  (Lives In)' in md:
-                                            states = [md.get('Residing State  (Lives In)', '')]
-                                        
-                                        # Create state tags
-                                        for state in states:
-                                            if state and pd.notna(state):
-                                                state_class = "trait-tag state-tag"
-                                                if state.upper() == "CA":
-                                                    state_class += " warning-tag"
-                                                states_html += f'<span class="{state_class}">{state}</span> '
-                                        
-                                        # Create trait tags
-                                        for trait in traits:
-                                            if trait.strip():
-                                                traits_html += f'<span class="trait-tag">{trait.strip()}</span> '
-                                
-                                capacity_html = ""
-                                if person_type.lower() == "nurse" and 'capacity_status' in match:
-                                    capacity_html = f"<p><strong>Capacity:</strong> {match['capacity_status']}</p>"
-                                
-                                # Add location and traits sections if available
-                                trait_location_html = ""
-                                if traits_html or states_html:
-                                    trait_location_html = f"""
-                                    <div class="nurse-info">
-                                        <div class="nurse-detail">
-                                            <h4>Location</h4>
-                                            {states_html if states_html else "Location not specified"}
-                                        </div>
-                                        <div class="nurse-detail">
-                                            <h4>Personality Traits</h4>
-                                            {traits_html if traits_html else "No traits specified"}
-                                        </div>
-                                    </div>
-                                    """
-                                
-                                st.markdown(
-                                    f"""<div class="match-card">
-                                    <div style="display: flex; justify-content: space-between; align-items: center;">
-                                        <h4>{match['name']}</h4>
-                                        <div class="compatibility-score {score_class}">{match['match_score']}</div>
-                                    </div>
-                                    <p><strong>Contact:</strong> {match['email']}</p>
-                                    {capacity_html}
-                                    {trait_location_html}
-                                    <div class="match-reason">
-                                        <p><strong>Why this match works:</strong> {match['reasoning']}</p>
-                                    </div>
-                                    </div>""",
-                                    unsafe_allow_html=True
-                                )
-                        except json.JSONDecodeError:
-                            st.error("Error parsing response. Please try again.")
-                            st.text(response)
+        # Add more specific options for manual entry; the form holds typing until the search is submitted
+        with st.form("manual_search_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                person_type = st.radio("This person is a:", ["Nurse", "Unknown"])
+            
+            user_input = st.text_area("Enter professional information:", height=150, 
+                                    placeholder="e.g., Jane Smith is an RN in California with 3 years of experience in Botox and fillers. She's looking for a mentor who can provide hands-on training.")
+            
+            matching_priorities = st.text_area(
+                "Specific matching priorities:", 
+                height=100,
+                placeholder="E.g., Must be in same state, looking for experienced MD with teaching experience, prefers collaborative style, etc."
+            )
+            search_submitted = st.form_submit_button("Find Matches")
+        cancel_stale_job("manual", user_input)
+        
+        if search_submitted and not user_input:
+            st.warning("Enter professional information first.")
+        
+        # Results go above the history strip so a result picked from the strip shows in the same place
+        results_area = st.container()
+        with results_area:
+            if user_input and search_submitted:
+                match_filters = {
+                    "person_type": person_type if person_type != "Unknown" else None,
+                    "matching_priorities": matching_priorities
+                }
+                run_search("manual", user_input, match_filters, "Top Medical Director Matches")
+        
+        history_result = display_history_strip("manual")
+        with results_area:
+            if history_result and not search_submitted:
+                display_search_result(history_result, from_history=True)
+            elif not search_submitted and not resume_pending_search("manual"):
+                redisplay_rated_result("manual")
+    
+        display_rerun_timing(panel_start)
+    
+    {"md": md_search_panel, "nurse": nurse_search_panel, "manual": manual_search_panel}[search_type_key]()
     
     # Explanation of how it works
     with st.expander("How the Moxie Matching System Works"):
@@ -1776,3 +1337,12 @@ else:
         - Clear flagging of state restrictions for California providers
         - Transparent capacity information for each medical director
         """)
+
+    # Filled last so it shows the request this rerun just served
+    if trace_requests:
+        with trace_panel.container():
+            display_trace_panel()
+
+# Record how long the full script took so the fragment readouts can show the saving
+st.session_state['last_full_rerun_ms'] = (time.perf_counter() - script_start) * 1000
+st.session_state.pop('full_run_start', None)
@@ -0,0 +1,130 @@
+"""Moxie nurse-MD matching engine.
+
+Importable without Streamlit so the app, command-line jobs and benchmarks can
+share the same loading, indexing, filtering, ranking, prompt and LLM code.
+"""
+
+from .capacity import (
+    CAPACITY_DB,
+    LEDGER_LICENSE_TYPES,
+    apply_live_capacity,
+    confirm_reservation,
+    get_available_capacity,
+    list_active_reservations,
+    release_reservation,
+    reserve_capacity,
+    seed_capacity_ledger,
+)
+from .calibration import calibration_report
+from .candidates import (
+    find_doctor,
+    find_nurse,
+    resolve_match_doctor,
+    select_doctor_candidates,
+    select_nurse_candidates,
+)
+from .data import build_roster_indexes, extract_md_preferences, extract_personality_traits
+from .export import export_table, iter_export_chunks
+from .extract import extract_manual_profile
+from .feedback import (
+    FEEDBACK_DB,
+    add_feedback_entry,
+    count_feedback,
+    feedback_group_stats,
+    feedback_summary,
+    feedback_version,
+    load_feedback_entries,
+    migrate_legacy_feedback,
+    query_feedback,
+)
+from .jobs import MatchJobQueue, rank_match_job, refine_match_job
+from .llm import parse_match_response, query_claude
+from .match_sheet import DEFAULT_SHEET_FILTERS, load_match_sheet, lookup_match_sheet, precompute_match_sheet, roster_fingerprint
+from .memo import memo_get, memo_put, memo_recent, new_result_memo, result_memo_key
+from .prefetch import SPECULATION_HOLD_SECONDS, SpeculationTracker
+from .prompts import create_claude_prompt, get_prompt_hash
+from .ranking import DEFAULT_RANKING_WEIGHTS, active_ranking_weights, load_ranking_weights, rank_candidates
+from .render import render_feedback_cards, render_match_cards, render_trace_waterfall
+from .roster import load_roster
+from .runs import add_run_feedback, get_match_run, record_match_run
+from .states import normalize_state, parse_state_codes
+from .synthetic import generate_roster
+from .text_store import TextTable, row_text, text_column
+from .tracing import NULL_TRACE, TRACE_LOG, TRACING_ENABLED, start_trace, trace_span, use_trace
+from .training import train_ranking_weights
+
+__all__ = [
+    "CAPACITY_DB",
+    "DEFAULT_RANKING_WEIGHTS",
+    "DEFAULT_SHEET_FILTERS",
+    "FEEDBACK_DB",
+    "LEDGER_LICENSE_TYPES",
+    "MatchJobQueue",
+    "NULL_TRACE",
+    "SPECULATION_HOLD_SECONDS",
+    "SpeculationTracker",
+    "TRACE_LOG",
+    "TRACING_ENABLED",
+    "TextTable",
+    "active_ranking_weights",
+    "add_feedback_entry",
+    "add_run_feedback",
+    "apply_live_capacity",
+    "build_roster_indexes",
+    "calibration_report",
+    "confirm_reservation",
+    "count_feedback",
+    "create_claude_prompt",
+    "export_table",
+    "extract_manual_profile",
+    "extract_md_preferences",
+    "extract_personality_traits",
+    "feedback_group_stats",
+    "feedback_summary",
+    "feedback_version",
+    "find_doctor",
+    "find_nurse",
+    "generate_roster",
+    "get_available_capacity",
+    "get_match_run",
+    "get_prompt_hash",
+    "iter_export_chunks",
+    "list_active_reservations",
+    "load_feedback_entries",
+    "load_match_sheet",
+    "load_ranking_weights",
+    "load_roster",
+    "lookup_match_sheet",
+    "memo_get",
+    "memo_put",
+    "memo_recent",
+    "migrate_legacy_feedback",
+    "new_result_memo",
+    "normalize_state",
+    "parse_match_response",
+    "parse_state_codes",
+    "precompute_match_sheet",
+    "query_claude",
+    "query_feedback",
+    "rank_candidates",
+    "rank_match_job",
+    "record_match_run",
+    "refine_match_job",
+    "release_reservation",
+    "render_feedback_cards",
+    "render_match_cards",
+    "render_trace_waterfall",
+    "reserve_capacity",
+    "resolve_match_doctor",
+    "result_memo_key",
+    "roster_fingerprint",
+    "row_text",
+    "seed_capacity_ledger",
+    "select_doctor_candidates",
+    "select_nurse_candidates",
+    "start_trace",
+    "text_column",
+    "trace_span",
+    "train_ranking_weights",
+    "use_trace",
+]
@@ -0,0 +1,89 @@
+"""Server-side filtering, sorting and pagination of the rosters for the roster browser."""
+
+import math
+import re
+
+import numpy as np
+
+from .ranking import SERVICE_BITS
+
+
+BROWSE_PAGE_SIZE = 25
+
+# Columns shipped to the browser for each side, with their display names
+NURSE_BROWSE_COLUMNS = {
+    "Bird Eats Bug Email": "Email",
+    "Provider License Type": "License",
+    "Experience Level  ": "Experience",
+    "State (MedSpa Premise)": "State",
+    "Services Provided": "Services",
+}
+DOCTOR_BROWSE_COLUMNS = {
+    "First Name": "First Name",
+    "Last Name": "Last Name",
+    "Email": "Email",
+    "Residing State  (Lives In)": "State",
+    "NP Capacity": "NP Capacity",
+    "RN Capacity": "RN Capacity",
+    "Capacity Status": "Capacity Status",
+}
+
+def browse_columns(side):
+    return NURSE_BROWSE_COLUMNS if side == "nurse" else DOCTOR_BROWSE_COLUMNS
+
+# Distinct values for the filter widgets
+def browse_filter_options(side, df, indexes):
+    state_index = indexes["nurses_by_state" if side == "nurse" else "doctors_by_state"]
+    options = {"states": sorted(state_index)}
+    if side == "nurse":
+        licenses = set()
+        for license_key in df['License Key'].dropna():
+            licenses.update(part.strip() for part in str(license_key).split(';') if part.strip())
+        options["licenses"] = sorted(licenses)
+        options["experience"] = sorted(df['Experience Level  '].dropna().astype(str).str.strip().unique())
+        options["services"] = list(SERVICE_BITS)
+    return options
+
+# Row labels matching the filters; a state filter starts from the inverted index so only that state's rows are scanned
+def filter_roster(side, df, indexes, state=None, license_type=None, experience=None, service=None, capacity=None):
+    if state:
+        labels = indexes["nurses_by_state" if side == "nurse" else "doctors_by_state"].get(state)
+        if labels is None:
+            return df.index[:0]
+        subset = df.loc[labels]
+    else:
+        subset = df
+
+    keep = np.ones(len(subset), dtype=bool)
+    if side == "nurse":
+        if license_type:
+            keep &= subset['License Key'].astype(str).str.contains(rf"\b{re.escape(license_type)}\b").to_numpy()
+        if experience:
+            keep &= (subset['Experience Level  '].astype(str).str.strip() == experience).to_numpy()
+        if service:
+            keep &= (subset['Services Mask'].to_numpy() & SERVICE_BITS[service]) != 0
+    elif capacity:
+        # "NP" / "RN": open slots for that license; "Any": open slots for either
+        np_open = subset['NP Capacity'].fillna(0).to_numpy() > 0
+        rn_open = subset['RN Capacity'].fillna(0).to_numpy() > 0
+        keep &= {"NP": np_open, "RN": rn_open}.get(capacity, np_open | rn_open)
+    return subset.index[keep]
+
+# Order row labels by one column; text sorts case-insensitively and blanks always go last
+def sort_roster(df, labels, sort_by=None, descending=False):
+    if not sort_by or len(labels) == 0:
+        return labels
+    values = df.loc[labels, sort_by]
+    key = (lambda column: column.where(column.isna(), column.astype(str)).str.strip().str.lower()) if values.dtype == object else None
+    ordered = values.sort_values(ascending=not descending, kind="mergesort", na_position="last", key=key)
+    return ordered.index
+
+def page_count(total_rows, page_size=BROWSE_PAGE_SIZE):
+    return max(math.ceil(total_rows / page_size), 1)
+
+# Just the rows (and display columns) of one page
+def roster_page(side, df, labels, page, page_size=BROWSE_PAGE_SIZE):
+    page = min(max(page, 1), page_count(len(labels), page_size))
+    start = (page - 1) * page_size
+    columns = browse_columns(side)
+    return df.loc[labels[start:start + page_size], list(columns)].rename(columns=columns)
@@ -0,0 +1,171 @@
+"""Score calibration: the shown match score against the rating ops gave, per score source, score band, MD and
+state, computed from the store's calibration aggregates rather than the log."""
+
+import numpy as np
+import pandas as pd
+
+from .candidates import resolve_match_doctor
+from .feedback import connect_feedback_store
+
+
+CALIBRATION_SOURCES = ("llm", "ranker", "manual")
+CALIBRATION_BAND_WIDTH = 1.0
+# A band is flagged when its mean error is at least this many points and more than twice its standard error
+CALIBRATION_TOLERANCE = 1.0
+MIN_BAND_ENTRIES = 10
+
+# Score (tenths 0-100) and rating (0-10) axes of the histograms
+SCORE_VALUES = np.arange(101) / 10.0
+RATING_VALUES = np.arange(11, dtype=float)
+ERROR_GRID = SCORE_VALUES[:, None] - RATING_VALUES[None, :]
+
+# Both aggregates in one snapshot: {source: 101 x 11 score-by-rating counts} and the per-MD error rows
+def load_calibration_aggregates(db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        conn.execute("BEGIN")
+        histogram_rows = conn.execute("SELECT source, score_tenths, rating, entries FROM feedback_calibration").fetchall()
+        error_rows = conn.execute(
+            "SELECT md_name, source, entries, error_sum, error_sumsq, abs_error_sum FROM feedback_errors"
+        ).fetchall()
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    histograms = {source: np.zeros((len(SCORE_VALUES), len(RATING_VALUES)), dtype=np.int64) for source in CALIBRATION_SOURCES}
+    for source in histograms:
+        rows = np.array([row[1:] for row in histogram_rows if row[0] == source], dtype=np.int64).reshape(-1, 3)
+        ratings = np.clip(rows[:, 1], 0, len(RATING_VALUES) - 1)
+        np.add.at(histograms[source], (rows[:, 0], ratings), rows[:, 2])
+    errors = pd.DataFrame(error_rows, columns=["md_name", "source", "entries", "error_sum", "error_sumsq", "abs_error_sum"])
+    return histograms, errors
+
+# Bias (mean score minus rating), MAE and RMSE from summed errors; works on scalars and Series alike
+def error_stats(entries, error_sum, error_sumsq, abs_error_sum):
+    entries = np.maximum(entries, 1)
+    return error_sum / entries, abs_error_sum / entries, np.sqrt(np.maximum(error_sumsq / entries, 0.0))
+
+# Reliability curve: the histogram binned into score bands of `band_width` points (10.0 joins the top band),
+# with each band's mean score, mean rating and error; a band whose scores run clearly above or below the
+# ratings is flagged "over" / "under"
+def reliability_curve(histogram, band_width=CALIBRATION_BAND_WIDTH):
+    band_tenths = max(int(round(band_width * 10)), 1)
+    band_count = max(-(-100 // band_tenths), 1)
+    bands = np.minimum(np.arange(len(SCORE_VALUES)) // band_tenths, band_count - 1)
+
+    score_entries = histogram.sum(axis=1)
+    entries = np.bincount(bands, weights=score_entries, minlength=band_count)
+    score_sum = np.bincount(bands, weights=score_entries * SCORE_VALUES, minlength=band_count)
+    rating_sum = np.bincount(bands, weights=histogram @ RATING_VALUES, minlength=band_count)
+    error_sumsq = np.bincount(bands, weights=(histogram * ERROR_GRID ** 2).sum(axis=1), minlength=band_count)
+
+    seen = entries > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_score = score_sum / entries
+        mean_rating = rating_sum / entries
+        mean_error = mean_score - mean_rating
+        stderr = np.sqrt(np.maximum(error_sumsq / entries - mean_error ** 2, 0.0) / entries)
+    flagged = (
+        (entries >= MIN_BAND_ENTRIES) & (np.abs(mean_error) >= CALIBRATION_TOLERANCE) & (np.abs(mean_error) > 2 * stderr)
+    )
+    low = np.arange(band_count) * band_tenths / 10.0
+    curve = pd.DataFrame({
+        "score_low": low,
+        "score_high": np.minimum(low + band_tenths / 10.0, 10.0),
+        "entries": entries.astype(int),
+        "mean_score": mean_score,
+        "mean_rating": mean_rating,
+        "mean_error": mean_error,
+        "stderr": stderr,
+        "flag": np.where(flagged, np.where(mean_error > 0, "over", "under"), ""),
+    })
+    return curve[seen].reset_index(drop=True)
+
+# Weighted Pearson correlation of two axes over a joint count table
+def weighted_correlation(histogram, score_axis, rating_axis):
+    total = histogram.sum()
+    if total < 2:
+        return None
+    score_centered = score_axis - (histogram.sum(axis=1) @ score_axis) / total
+    rating_centered = rating_axis - (histogram.sum(axis=0) @ rating_axis) / total
+    covariance = score_centered @ histogram @ rating_centered
+    variance = (histogram.sum(axis=1) @ score_centered ** 2) * (histogram.sum(axis=0) @ rating_centered ** 2)
+    return float(covariance / np.sqrt(variance)) if variance > 0 else None
+
+# Midrank of every value of a marginal count vector, so ties share the average of their ranks
+def midranks(counts):
+    return np.cumsum(counts) - (counts - 1) / 2.0
+
+# Spearman's rank correlation with ties, exact from the histogram: Pearson on the midranks
+def spearman_from_histogram(histogram):
+    return weighted_correlation(histogram, midranks(histogram.sum(axis=1)), midranks(histogram.sum(axis=0)))
+
+# Per-MD error (all sources together); rows sorted with the most over-scored MDs first
+def md_calibration(errors):
+    if errors.empty:
+        return pd.DataFrame(columns=["md_name", "entries", "bias", "mae", "rmse"])
+    totals = errors.groupby("md_name", as_index=False)[["entries", "error_sum", "error_sumsq", "abs_error_sum"]].sum()
+    totals["bias"], totals["mae"], totals["rmse"] = error_stats(
+        totals["entries"], totals["error_sum"], totals["error_sumsq"], totals["abs_error_sum"]
+    )
+    return totals[["md_name", "entries", "bias", "mae", "rmse"]].sort_values("bias", ascending=False, ignore_index=True)
+
+# Per-state error: each MD's errors counted toward every state they practice in. MDs no longer in the
+# roster are left out
+def state_calibration(errors, doctors_df, indexes):
+    columns = ["state", "entries", "mds", "bias", "mae", "rmse"]
+    if errors.empty:
+        return pd.DataFrame(columns=columns)
+    totals = errors.groupby("md_name", as_index=False)[["entries", "error_sum", "error_sumsq", "abs_error_sum"]].sum()
+    states = []
+    for md_name in totals["md_name"]:
+        doctor = resolve_match_doctor({"name": md_name}, doctors_df, indexes)
+        states.append(list(doctor["State Codes"]) if doctor is not None and "State Codes" in doctor.index else [])
+    totals["state"] = states
+    totals = totals.explode("state").dropna(subset=["state"])
+    if totals.empty:
+        return pd.DataFrame(columns=columns)
+    by_state = totals.groupby("state", as_index=False).agg(
+        entries=("entries", "sum"), mds=("md_name", "nunique"), error_sum=("error_sum", "sum"),
+        error_sumsq=("error_sumsq", "sum"), abs_error_sum=("abs_error_sum", "sum"),
+    )
+    by_state["bias"], by_state["mae"], by_state["rmse"] = error_stats(
+        by_state["entries"], by_state["error_sum"], by_state["error_sumsq"], by_state["abs_error_sum"]
+    )
+    return by_state[columns].sort_values("entries", ascending=False, ignore_index=True)
+
+# Score bands where the deterministic ranker's score already agrees with the ratings: enough ratings, a
+# mean error inside the tolerance, and no flag. A refinement call for a match scored there adds little
+def trusted_ranker_bands(curve):
+    trusted = curve[
+        (curve["entries"] >= MIN_BAND_ENTRIES) & (curve["mean_error"].abs() < CALIBRATION_TOLERANCE) & (curve["flag"] == "")
+    ]
+    return list(zip(trusted["score_low"], trusted["score_high"]))
+
+# The calibration view: per source the overall error, correlations and reliability curve; per-MD error; and
+# per-state error when a roster is given
+def calibration_report(db_path=None, band_width=CALIBRATION_BAND_WIDTH, doctors_df=None, indexes=None):
+    histograms, errors = load_calibration_aggregates(db_path)
+    sources = {}
+    for source, histogram in histograms.items():
+        entries = int(histogram.sum())
+        if not entries:
+            continue
+        bias, mae, rmse = error_stats(
+            entries, float((histogram * ERROR_GRID).sum()), float((histogram * ERROR_GRID ** 2).sum()),
+            float((histogram * np.abs(ERROR_GRID)).sum()),
+        )
+        sources[source] = {
+            "entries": entries,
+            "bias": float(bias),
+            "mae": float(mae),
+            "rmse": float(rmse),
+            "spearman": spearman_from_histogram(histogram),
+            "pearson": weighted_correlation(histogram, SCORE_VALUES, RATING_VALUES),
+            "curve": reliability_curve(histogram, band_width),
+        }
+    return {
+        "sources": sources,
+        "md": md_calibration(errors),
+        "state": state_calibration(errors, doctors_df, indexes) if doctors_df is not None else None,
+        "trusted_ranker_bands": trusted_ranker_bands(sources["ranker"]["curve"]) if "ranker" in sources else [],
+    }
@@ -0,0 +1,248 @@
+"""Eligible candidate selection: CA restriction, capacity, filters and proximity."""
+
+import numpy as np
+import pandas as pd
+
+from .capacity import LEDGER_LICENSE_TYPES
+from .history import resolve_doctor_label
+from .states import LOCATION_MAX_HOPS, enumerate_state_tiers, parse_state_codes
+from .text_store import row_text, text_contains
+
+
+# Border-crossing distance (Series keyed by row label) for every indexed candidate within max_hops of the source states
+def candidate_distances(state_index, source_codes, max_hops=None):
+    tiers = [
+        pd.Series(float(distance), index=state_index[code])
+        for distance, code in enumerate_state_tiers(source_codes, max_hops)
+        if code in state_index
+    ]
+    if not tiers:
+        return pd.Series(dtype=float)
+    distances = pd.concat(tiers)
+    # Tiers are in ascending distance order, so the first entry per label is its minimum distance
+    return distances[~distances.index.duplicated(keep='first')]
+
+# Select candidates by location using the state index, closest states first
+def order_by_proximity(candidates_df, state_index, source_codes, location):
+    if candidates_df.empty or not source_codes:
+        return candidates_df
+
+    max_hops = LOCATION_MAX_HOPS.get(location)
+    distances = candidate_distances(state_index, source_codes, max_hops).reindex(candidates_df.index).to_numpy()
+
+    # With no distance limit, unreachable or unknown-state candidates are kept at the end
+    if max_hops is None:
+        distances = np.where(np.isnan(distances), np.inf, distances)
+    else:
+        in_range = ~np.isnan(distances)
+        candidates_df = candidates_df[in_range]
+        distances = distances[in_range]
+
+    # Stable sort keeps the incoming order (e.g. keyword relevance) within each distance tier
+    return candidates_df.iloc[np.argsort(distances, kind='stable')]
+
+# Candidates ordered by how many keywords their text contains (stable, so ties keep their order), first `limit` kept
+def keyword_shortlist(candidates_df, keywords, limit, text_table=None):
+    if candidates_df.empty:
+        return candidates_df
+    counts = np.zeros(len(candidates_df), dtype=int)
+    for keyword in keywords:
+        counts += text_contains(candidates_df, 'Ranking Text', keyword, text_table)
+    order = np.argsort(-counts, kind='stable')
+    return candidates_df.iloc[order if limit is None else order[:limit]]
+
+# Select eligible doctors for a nurse: CA restriction, capacity, filters and location, closest states first
+def select_doctor_candidates(doctors_df, indexes, nurse_license, nurse_state_codes, is_ca_nurse, filters, limit=20):
+    # Filter doctors based on criteria, starting with MDs who historically sign most often
+    filtered_doctors = doctors_df
+    if 'Acceptance Rate' in filtered_doctors.columns:
+        filtered_doctors = filtered_doctors.sort_values('Acceptance Rate', ascending=False, kind='stable')
+
+    # STRICT FILTER: Apply California restriction
+    if is_ca_nurse:
+        filtered_doctors = filtered_doctors[
+            filtered_doctors.index.isin(indexes["doctors_by_state"].get("CA", pd.Index([])))
+        ]
+
+    # STRICT FILTER: Apply capacity check based on license type
+    capacity_column = f'{nurse_license.upper()} Capacity'
+    if nurse_license.upper() in LEDGER_LICENSE_TYPES and capacity_column in filtered_doctors.columns:
+        filtered_doctors = filtered_doctors[filtered_doctors[capacity_column].fillna(0) > 0]
+    elif nurse_license.upper() == "NP":
+        filtered_doctors = filtered_doctors[
+            filtered_doctors.apply(
+                lambda row: row.get('NP Capacity', 0) > 0 if 'NP Capacity' in row else 
+                ("at capacity for np" not in str(row.get('Capacity Status', '')).lower() and 
+                 "capacity for" in str(row.get('Capacity Status', '')).lower() and
+                 "np" in str(row.get('Capacity Status', '')).lower()),
+                axis=1
+            )
+        ]
+    elif nurse_license.upper() == "RN":
+        filtered_doctors = filtered_doctors[
+            filtered_doctors.apply(
+                lambda row: row.get('RN Capacity', 0) > 0 if 'RN Capacity' in row else
+                ("at capacity for rn" not in str(row.get('Capacity Status', '')).lower() and
+                 "capacity for" in str(row.get('Capacity Status', '')).lower() and
+                 "rn" in str(row.get('Capacity Status', '')).lower()),
+                axis=1
+            )
+        ]
+
+    # Apply MD age filter if specified
+    if filters.get("md_age") and filters.get("md_age") != "Any":
+        age_keywords = filters.get("md_age").lower()
+        if "younger" in age_keywords:
+            filtered_doctors = filtered_doctors[filtered_doctors['Trait Younger']]
+        elif "older" in age_keywords or "experienced" in age_keywords:
+            filtered_doctors = filtered_doctors[filtered_doctors['Trait Older']]
+
+    # Apply interaction style filter
+    if filters.get("interaction_style") and filters.get("interaction_style") != "Any":
+        style = filters.get("interaction_style").lower()
+        if "hands-on" in style:
+            filtered_doctors = filtered_doctors[filtered_doctors['Trait Hands-on']]
+        elif "autonomous" in style:
+            filtered_doctors = filtered_doctors[filtered_doctors['Trait Autonomous']]
+
+    # Handle location filtering through the state index, closest states first
+    # (California nurses can only be matched with California medical directors)
+    location = "Same State Only" if is_ca_nurse else filters.get("location")
+    filtered_doctors = order_by_proximity(filtered_doctors, indexes["doctors_by_state"], nurse_state_codes, location)
+
+    # Apply keyword filter from service requirements if specified
+    if filters.get("service_requirements") and filters.get("service_requirements").strip():
+        keywords = filters.get("service_requirements").lower().split()
+        # Searched in the lowercased name, traits and preferences held by the text store
+        filtered_doctors = keyword_shortlist(filtered_doctors, keywords, limit, indexes.get("doctor_text"))
+
+    # Keep the keyword shortlist ordered with the closest states first
+    if filters.get("service_requirements") and filters.get("service_requirements").strip():
+        filtered_doctors = order_by_proximity(filtered_doctors, indexes["doctors_by_state"], nurse_state_codes, location)
+
+    # If filters resulted in no doctors, provide clear feedback
+    if filtered_doctors.empty:
+        if is_ca_nurse:
+            return filtered_doctors, "No California medical directors found with capacity for this nurse's license type. Please check back later or adjust requirements."
+        else:
+            return filtered_doctors, "No medical directors found with available capacity for this nurse's license type. Please check back later or adjust requirements."
+
+    # Candidates are already ordered with same-state doctors first
+    return (filtered_doctors if limit is None else filtered_doctors.head(limit)), None
+
+# Find the first doctor whose full name contains the search value (case-insensitive)
+def find_doctor(doctors_df, search_value, indexes=None):
+    # Names picked from the dropdown hit the exact-name index without scanning the table
+    if indexes is not None:
+        label = indexes.get("doctors_by_full_name", {}).get(str(search_value).strip().lower())
+        if label is not None and label in doctors_df.index:
+            return doctors_df.loc[label]
+    full_names = (doctors_df['First Name'].astype(str) + ' ' + doctors_df['Last Name'].astype(str)).str.lower()
+    matches = doctors_df[full_names.str.contains(str(search_value).lower(), regex=False)]
+    return None if matches.empty else matches.iloc[0]
+
+# Resolve the MD a model result refers to via the email map, then the normalized-name map; None on a miss
+def resolve_match_doctor(match, doctors_df, indexes):
+    label = indexes.get("doctors_by_email", {}).get(str(match.get('email') or '').strip().lower())
+    if label is None and "doctors_by_name" in indexes:
+        label = resolve_doctor_label(match.get('name'), indexes["doctors_by_name"])
+    if label is None or label not in doctors_df.index:
+        return None
+    return doctors_df.loc[label]
+
+# Find the first nurse whose ticket number or email contains the search value (case-insensitive)
+def find_nurse(nurses_df, search_value, indexes=None):
+    # Identifiers picked from the dropdown hit the exact-identifier index without scanning the table
+    if indexes is not None:
+        label = indexes.get("nurses_by_identifier", {}).get(str(search_value).strip().lower())
+        if label is not None and label in nurses_df.index:
+            return nurses_df.loc[label]
+    needle = str(search_value).lower()
+    found = pd.Series(False, index=nurses_df.index)
+    for column in ('Ticket Number Counter', 'Bird Eats Bug Email'):
+        if column in nurses_df.columns:
+            values = nurses_df[column]
+            found |= values.notna() & values.astype(str).str.lower().str.contains(needle, regex=False)
+    matches = nurses_df[found]
+    return None if matches.empty else matches.iloc[0]
+
+# Select eligible nurses for a doctor: CA restriction, capacity, filters, MD preferences and location, closest states first
+def select_nurse_candidates(doctor, nurses_df, indexes, filters, limit=20):
+    md_preferences = row_text(doctor, 'MD Preferences', indexes.get("doctor_text"))
+    states = doctor.get('States List', [])
+    if not states and 'Residing State  (Lives In)' in doctor:
+        states = [doctor['Residing State  (Lives In)']]
+    state_codes = parse_state_codes(states)
+    is_ca_doctor = "CA" in state_codes
+    np_capacity = doctor.get('NP Capacity', 0)
+    rn_capacity = doctor.get('RN Capacity', 0)
+
+    # Apply filters to nurses
+    filtered_nurses = nurses_df
+    license_keys = 'License Key' if 'License Key' in nurses_df.columns else None
+
+    # STRICT FILTER: Apply California restriction
+    if is_ca_doctor:
+        filtered_nurses = filtered_nurses[filtered_nurses['State Code'] == "CA"]
+
+    # STRICT FILTER: Apply capacity check
+    # First, check NP capacity
+    if np_capacity <= 0:
+        filtered_nurses = filtered_nurses[
+            (filtered_nurses[license_keys] if license_keys else filtered_nurses['Provider License Type'].str.upper()) != "NP"
+        ]
+
+    # Then check RN capacity
+    if rn_capacity <= 0:
+        filtered_nurses = filtered_nurses[
+            (filtered_nurses[license_keys] if license_keys else filtered_nurses['Provider License Type'].str.upper()) != "RN"
+        ]
+
+    # Apply experience filter if specified
+    if filters.get("experience") and filters.get("experience") != "Any":
+        filtered_nurses = filtered_nurses[
+            filtered_nurses['Experience Level  '].str.contains(filters.get("experience"), na=False)
+        ]
+
+    # Apply license type filter
+    if filters.get("license_type") and filters.get("license_type") != "Any":
+        filtered_nurses = filtered_nurses[
+            filtered_nurses['Provider License Type'].str.contains(filters.get("license_type"), na=False)
+        ]
+
+    # Handle location filtering through the state index, closest states first
+    # (California doctors can only be matched with California nurses)
+    location = "Same State Only" if is_ca_doctor else filters.get("location")
+    selected_nurses = order_by_proximity(filtered_nurses, indexes["nurses_by_state"], state_codes, location)
+
+    # Check MD preferences for any exclusions
+    if md_preferences:
+        # Check for maxed out capacity on certain license types
+        if "maxed" in md_preferences.lower() and "np" in md_preferences.lower():
+            # Filter out NPs if MD is maxed out
+            selected_nurses = selected_nurses[
+                ~selected_nurses['Provider License Type'].str.contains('NP', na=False, case=False)
+            ]
+
+        # Check for experience requirements
+        if "experience" in md_preferences.lower() or "6mo experience" in md_preferences.lower():
+            # Filter out new graduates
+            selected_nurses = selected_nurses[
+                ~selected_nurses['Experience Level  '].str.contains('New Graduate', na=False, case=False)
+            ]
+
+    # Apply keyword filter from additional requirements if specified
+    if filters.get("requirements") and filters.get("requirements").strip():
+        keywords = filters.get("requirements").lower().split()
+        # Searched in the lowercased license, experience, services and notes held by the text store
+        selected_nurses = keyword_shortlist(selected_nurses, keywords, limit, indexes.get("nurse_text"))
+
+    # If no nurses match the filters, provide clear feedback
+    if selected_nurses.empty:
+        if is_ca_doctor:
+            return selected_nurses, "No California nurses found that match this doctor's capacity and requirements. Please check back later or adjust filters."
+        else:
+            return selected_nurses, "No nurses found that match this doctor's capacity and requirements. Please check back later or adjust filters."
+
+    # Limit for prompt length
+    return (selected_nurses if limit is None else selected_nurses.head(limit)), None
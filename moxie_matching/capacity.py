@@ -0,0 +1,231 @@
+"""SQLite capacity ledger: atomic reserve, confirm and release of MD slots."""
+
+import datetime
+import os
+import sqlite3
+
+from .data import create_capacity_status
+
+
+# Capacity ledger: a small sqlite store (WAL mode) that tracks reservations against each MD's capacity
+CAPACITY_DB = os.getenv("MOXIE_CAPACITY_DB", "capacity_ledger.db")
+
+LEDGER_LICENSE_TYPES = ("NP", "RN")
+
+# Schema steps in order; a ledger records how many it has applied in PRAGMA user_version, so each runs once
+# per database. Ledgers from before the version was kept start at 0 and re-run the (idempotent) steps
+def create_capacity_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS capacity (
+            md_email TEXT NOT NULL,
+            license_type TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (md_email, license_type)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            md_email TEXT NOT NULL,
+            license_type TEXT NOT NULL,
+            nurse TEXT,
+            status TEXT NOT NULL CHECK (status IN ('reserved', 'confirmed', 'released')),
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_reservations_active ON reservations (md_email, license_type, status)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO ledger_meta (key, value) VALUES ('version', 0)")
+
+CAPACITY_SCHEMA_STEPS = (
+    create_capacity_tables,
+)
+CAPACITY_SCHEMA_VERSION = len(CAPACITY_SCHEMA_STEPS)
+
+# Open a ledger connection; every call gets its own connection so Streamlit sessions never share one.
+# Only a ledger behind CAPACITY_SCHEMA_VERSION pays for schema work
+def connect_capacity_ledger(db_path=None):
+    conn = sqlite3.connect(db_path or CAPACITY_DB, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < CAPACITY_SCHEMA_VERSION:
+        try:
+            upgrade_capacity_ledger(conn)
+        except BaseException:
+            conn.close()
+            raise
+    return conn
+
+# Apply the pending schema steps in one transaction, under the write lock so concurrent first connections
+# do it once
+def upgrade_capacity_ledger(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for step in CAPACITY_SCHEMA_STEPS[version:]:
+            step(conn)
+        conn.execute(f"PRAGMA user_version = {CAPACITY_SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+# Every committed write bumps the ledger version so cached snapshots know they are stale
+def bump_ledger_version(conn):
+    conn.execute("UPDATE ledger_meta SET value = value + 1 WHERE key = 'version'")
+
+def get_ledger_version(conn):
+    return conn.execute("SELECT value FROM ledger_meta WHERE key = 'version'").fetchone()[0]
+
+# Seed (or refresh) each MD's total NP/RN capacity from the parsed Capacity Status
+def seed_capacity_ledger(doctors_df, db_path=None):
+    rows = []
+    for email, np_capacity, rn_capacity in zip(doctors_df['Email'], doctors_df['NP Capacity'], doctors_df['RN Capacity']):
+        if isinstance(email, str) and email.strip():
+            rows.append((email.strip().lower(), "NP", int(np_capacity)))
+            rows.append((email.strip().lower(), "RN", int(rn_capacity)))
+
+    conn = connect_capacity_ledger(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO capacity (md_email, license_type, total) VALUES (?, ?, ?) "
+            "ON CONFLICT (md_email, license_type) DO UPDATE SET total = excluded.total",
+            rows
+        )
+        bump_ledger_version(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# Atomically reserve one slot; returns (reservation_id, None) or (None, error message)
+def reserve_capacity(md_email, license_type, nurse=None, db_path=None):
+    md_email = str(md_email).strip().lower()
+    license_type = str(license_type).strip().upper()
+    if license_type not in LEDGER_LICENSE_TYPES:
+        return None, f"Capacity is only tracked for {' and '.join(LEDGER_LICENSE_TYPES)} license types."
+
+    conn = connect_capacity_ledger(db_path)
+    try:
+        # BEGIN IMMEDIATE takes the write lock up front so two sessions cannot both claim the last slot
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT c.total - (SELECT COUNT(*) FROM reservations r WHERE r.md_email = c.md_email "
+            "AND r.license_type = c.license_type AND r.status IN ('reserved', 'confirmed')) "
+            "FROM capacity c WHERE c.md_email = ? AND c.license_type = ?",
+            (md_email, license_type)
+        ).fetchone()
+        if row is None:
+            conn.execute("ROLLBACK")
+            return None, "This medical director is not in the capacity ledger."
+        if row[0] <= 0:
+            conn.execute("ROLLBACK")
+            return None, f"This medical director is at capacity for {license_type}s."
+
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor = conn.execute(
+            "INSERT INTO reservations (md_email, license_type, nurse, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'reserved', ?, ?)",
+            (md_email, license_type, nurse, now, now)
+        )
+        bump_ledger_version(conn)
+        conn.execute("COMMIT")
+        return cursor.lastrowid, None
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# Move a reservation from one status to another; returns True if the reservation was updated
+def update_reservation_status(reservation_id, new_status, allowed_statuses, db_path=None):
+    placeholders = ', '.join('?' for _ in allowed_statuses)
+    conn = connect_capacity_ledger(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute(
+            f"UPDATE reservations SET status = ?, updated_at = ? WHERE id = ? AND status IN ({placeholders})",
+            (new_status, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), int(reservation_id), *allowed_statuses)
+        )
+        if cursor.rowcount:
+            bump_ledger_version(conn)
+        conn.execute("COMMIT")
+        return cursor.rowcount > 0
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def confirm_reservation(reservation_id, db_path=None):
+    return update_reservation_status(reservation_id, 'confirmed', ('reserved',), db_path)
+
+def release_reservation(reservation_id, db_path=None):
+    return update_reservation_status(reservation_id, 'released', ('reserved', 'confirmed'), db_path)
+
+# Recent reservations that still hold capacity, newest first
+def list_active_reservations(limit=20, db_path=None):
+    conn = connect_capacity_ledger(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT id, md_email, license_type, nurse, status, created_at FROM reservations "
+            "WHERE status IN ('reserved', 'confirmed') ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"id": r[0], "md_email": r[1], "license_type": r[2], "nurse": r[3], "status": r[4], "created_at": r[5]}
+        for r in rows
+    ]
+
+# Read remaining capacity per (md_email, license_type), reusing the cached snapshot until the ledger version changes
+def get_available_capacity(cache, db_path=None):
+    conn = connect_capacity_ledger(db_path)
+    try:
+        version = get_ledger_version(conn)
+        with cache["lock"]:
+            if cache.get("version") == version:
+                return cache["available"]
+        rows = conn.execute(
+            "SELECT c.md_email, c.license_type, c.total - COUNT(r.id) FROM capacity c "
+            "LEFT JOIN reservations r ON r.md_email = c.md_email AND r.license_type = c.license_type "
+            "AND r.status IN ('reserved', 'confirmed') GROUP BY c.md_email, c.license_type"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    available = {(email, license_type): max(int(remaining), 0) for email, license_type, remaining in rows}
+    with cache["lock"]:
+        cache["version"] = version
+        cache["available"] = available
+    return available
+
+# Overlay live ledger capacity onto the doctors table used by the candidate filters
+def apply_live_capacity(doctors_df, available):
+    if not available or doctors_df is None or doctors_df.empty:
+        return doctors_df
+
+    live_df = doctors_df.copy()
+    emails = live_df['Email'].astype(str).str.strip().str.lower()
+    for license_type in LEDGER_LICENSE_TYPES:
+        column = f'{license_type} Capacity'
+        live_df[column] = [
+            available.get((email, license_type), capacity) for email, capacity in zip(emails, live_df[column])
+        ]
+    live_df['Capacity Status'] = [
+        create_capacity_status(np_capacity, rn_capacity)
+        for np_capacity, rn_capacity in zip(live_df['NP Capacity'], live_df['RN Capacity'])
+    ]
+    return live_df
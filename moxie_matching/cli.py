@@ -0,0 +1,147 @@
+"""Command-line entry point: python -m moxie_matching <command> ..."""
+
+import argparse
+import os
+import sys
+import time
+
+from .export import EXPORT_CHUNK_ROWS, EXPORT_FORMATS, EXPORT_TABLES, export_table
+from .match_sheet import precompute_match_sheet
+from .synthetic import generate_roster
+from .training import MIN_TRAINING_SAMPLES, WEIGHT_PRIOR_STRENGTH, train_ranking_weights
+
+
+# Print engine messages to stderr so stdout stays machine-readable
+def notify_stderr(level, message):
+    print(f"[{level}] {message}", file=sys.stderr)
+
+def run_precompute(args):
+    search_types = {"nurse": ["nurse"], "md": ["md"], "both": ["nurse", "md"]}[args.side]
+    api_key = os.getenv("ANTHROPIC_API_KEY", "")
+    if args.llm and not api_key:
+        notify_stderr("warning", "ANTHROPIC_API_KEY is not set; writing ranker results only.")
+
+    start = time.perf_counter()
+    summary = precompute_match_sheet(
+        search_types,
+        data_dir=args.data_dir,
+        sheet_dir=args.out,
+        workers=args.workers,
+        k=args.k,
+        limit=args.limit,
+        use_llm=args.llm,
+        api_key=api_key,
+        llm_concurrency=args.llm_concurrency,
+        use_live_capacity=not args.static_capacity,
+        notify=notify_stderr,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"Match sheet: {summary['path']} (fingerprint {summary['fingerprint'][:16]})")
+    for search_type, counts in summary["sides"].items():
+        print(
+            f"  {search_type}: {counts['ranked']}/{counts['searches']} ranked, "
+            f"{counts['llm']} refined by LLM, {counts['llm_failures']} LLM failures"
+        )
+    print(f"Done in {elapsed:.1f}s")
+    return 0
+
+def run_train_weights(args):
+    summary = train_ranking_weights(
+        feedback_db=args.feedback_db,
+        data_dir=args.data_dir,
+        weights_dir=args.out,
+        min_samples=args.min_samples,
+        prior_strength=args.prior_strength,
+        dry_run=args.dry_run,
+    )
+    usable = ", ".join(f"{count} {search_type}" for search_type, count in summary["samples"].items())
+    print(f"Feedback: {summary['entries']} entries, usable pairs by search type: {usable}; {summary['skipped']} unresolved")
+    for search_type, error in summary["errors"].items():
+        notify_stderr("warning", f"{search_type} search keeps its current weights: {error}")
+    if summary["error"]:
+        notify_stderr("error", summary["error"])
+        return 1
+    for search_type, fit in summary["fits"].items():
+        print(f"{search_type} search:")
+        for name, weight in fit["weights"].items():
+            print(f"  {name:<11} {weight:.3f}")
+        stats = fit["stats"]
+        print(f"  Rating RMSE: {stats['rmse_default']:.4f} with the default weights, {stats['rmse_learned']:.4f} learned")
+    if summary["path"]:
+        print(f"Published version {summary['version']}: {summary['path']}")
+    else:
+        print("Dry run; nothing published.")
+    return 0
+
+def run_export(args):
+    fmt = args.format or ("parquet" if args.path.endswith(".parquet") else "csv")
+    start = time.perf_counter()
+    try:
+        count = export_table(args.path, fmt, args.table, args.chunk_rows, args.feedback_db)
+    except RuntimeError as e:
+        notify_stderr("error", str(e))
+        return 1
+    print(f"Exported {count} {args.table} rows to {args.path} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+def run_synth_roster(args):
+    start = time.perf_counter()
+    try:
+        counts = generate_roster(args.out, nurses=args.nurses, mds=args.mds, seed=args.seed)
+    except ValueError as e:
+        notify_stderr("error", str(e))
+        return 1
+    for name, rows in counts.items():
+        print(f"  {os.path.join(args.out, name)}: {rows} rows")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m moxie_matching", description="Headless Moxie matching tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    precompute = subparsers.add_parser("precompute", help="Precompute a match sheet for every nurse and/or MD.")
+    precompute.add_argument("--side", choices=["nurse", "md", "both"], default="both",
+                            help="'nurse' ranks MDs for every nurse, 'md' ranks nurses for every MD.")
+    precompute.add_argument("--data-dir", default=".", help="Directory holding the roster CSV exports.")
+    precompute.add_argument("--out", default=None, help="Sheet directory (default: $MOXIE_MATCH_SHEET_DIR or match_sheets).")
+    precompute.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Ranker worker processes.")
+    precompute.add_argument("-k", type=int, default=3, help="Matches kept per search.")
+    precompute.add_argument("--limit", type=int, default=None, help="Only the first N searches per side (for trial runs).")
+    precompute.add_argument("--llm", action="store_true", help="Refine each ranking with the LLM.")
+    precompute.add_argument("--llm-concurrency", type=int, default=4, help="Maximum LLM requests in flight.")
+    precompute.add_argument("--static-capacity", action="store_true",
+                            help="Ignore the capacity ledger and use the capacities parsed from the roster.")
+    precompute.set_defaults(func=run_precompute)
+
+    train = subparsers.add_parser("train-weights", help="Fit one ranking weight set per search type from the feedback log and publish them.")
+    train.add_argument("--feedback-db", default=None, help="Feedback store (default: $MOXIE_FEEDBACK_DB or matching_feedback.db).")
+    train.add_argument("--data-dir", default=".", help="Directory holding the roster CSV exports.")
+    train.add_argument("--out", default=None,
+                       help="Weights directory (default: $MOXIE_RANKING_WEIGHTS_DIR or ranking_weights).")
+    train.add_argument("--min-samples", type=int, default=MIN_TRAINING_SAMPLES, help="Refuse to fit on fewer rated pairs.")
+    train.add_argument("--prior-strength", type=float, default=WEIGHT_PRIOR_STRENGTH,
+                       help="Pull toward the default weights, in pseudo-ratings.")
+    train.add_argument("--dry-run", action="store_true", help="Fit and report without publishing.")
+    train.set_defaults(func=run_train_weights)
+
+    export = subparsers.add_parser("export", help="Stream the feedback log or match run history to CSV or Parquet.")
+    export.add_argument("path", help="Output file; a .parquet suffix selects Parquet unless --format is given.")
+    export.add_argument("--table", choices=list(EXPORT_TABLES), default="feedback", help="What to export.")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default=None, help="Output format (Parquet needs pyarrow).")
+    export.add_argument("--feedback-db", default=None, help="Feedback store (default: $MOXIE_FEEDBACK_DB or matching_feedback.db).")
+    export.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS, help="Rows read and written per chunk.")
+    export.set_defaults(func=run_export)
+
+    synth = subparsers.add_parser("synth-roster", help="Write seeded synthetic roster exports with the real CSV layouts.")
+    synth.add_argument("out", help="Directory to write Medical_List.csv, md_metadata.csv and hubspot_moxie.csv into.")
+    synth.add_argument("--nurses", type=int, default=900, help="Matching tickets (rows of hubspot_moxie.csv).")
+    synth.add_argument("--mds", type=int, default=90, help="Medical directors.")
+    synth.add_argument("--seed", type=int, default=0, help="The same seed always writes the same files.")
+    synth.set_defaults(func=run_synth_roster)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
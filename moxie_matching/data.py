@@ -0,0 +1,104 @@
+"""Roster field parsing and lookup indexes."""
+
+import re
+
+import pandas as pd
+
+from .history import build_doctor_name_lookup
+
+
+# Helper function to extract capacity information
+def extract_capacity_info(capacity_text, license_type):
+    if not isinstance(capacity_text, str):
+        return 0
+    
+    # Check for "at capacity" phrases
+    if f"at capacity for {license_type}s" in capacity_text.lower():
+        return 0
+    
+    # Look for capacity numbers
+    match = re.search(r'(\d+)\s+more\s+' + license_type + r's', capacity_text, re.IGNORECASE)
+    if match:
+        return int(match.group(1))
+    
+    return 0  # Default to 0 if no capacity info found
+
+# Helper function to create capacity status from NP and RN capacity
+def create_capacity_status(np_capacity, rn_capacity):
+    np_status = f"Has capacity for {np_capacity} more NPs" if np_capacity > 0 else "At capacity for NPs"
+    rn_status = f"Has capacity for {rn_capacity} more RNs" if rn_capacity > 0 else "At capacity for RNs"
+    return f"{np_status}, {rn_status}"
+
+# Extract traits/preferences for display
+def extract_personality_traits(traits_text):
+    if not traits_text or not isinstance(traits_text, str):
+        return []
+    
+    # Split by commas and clean up
+    traits = [trait.strip() for trait in traits_text.split(',')]
+    return traits
+
+def extract_md_preferences(prefs_text):
+    if not prefs_text or not isinstance(prefs_text, str):
+        return []
+    
+    # Split into sentences or by semicolons
+    prefs = []
+    for pref in re.split(r'[.;]', prefs_text):
+        if pref.strip():
+            prefs.append(pref.strip())
+    
+    return prefs
+
+# Personality-trait patterns behind the nurse-side MD filters, precomputed as flag columns at load time
+TRAIT_FILTER_PATTERNS = {
+    "Trait Younger": "young|younger",
+    "Trait Older": "older|middle|experienced",
+    "Trait Hands-on": "hands-on|training|collaborative",
+    "Trait Autonomous": "autonomous|hands-off|independent",
+}
+
+def add_trait_filter_flags(doctors_df):
+    traits = doctors_df['Personality Traits'] if 'Personality Traits' in doctors_df.columns else pd.Series('', index=doctors_df.index)
+    for flag, pattern in TRAIT_FILTER_PATTERNS.items():
+        doctors_df[flag] = traits.str.contains(pattern, case=False, na=False).astype(bool)
+    return doctors_df
+
+# Build an inverted index from state code to the DataFrame row labels available in that state
+def build_state_index(df, codes_column):
+    index = {}
+    if codes_column not in df.columns:
+        return index
+    for label, codes in df[codes_column].items():
+        if not isinstance(codes, list):
+            continue
+        for code in codes:
+            index.setdefault(code, []).append(label)
+    # Label arrays let distance lookups run as vectorized pandas operations
+    return {code: pd.Index(labels) for code, labels in index.items()}
+
+# Map exact (lowercased) identifiers such as emails to the first row label that carries them
+def build_identifier_index(df, columns):
+    index = {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        for label, value in df[column].items():
+            if pd.notna(value):
+                index.setdefault(str(value).strip().lower(), label)
+    return index
+
+# Build all lookup indexes over the loaded rosters
+def build_roster_indexes(doctors_df, nurses_df):
+    return {
+        "nurses_by_state": build_state_index(nurses_df, 'Licensed States List'),
+        "doctors_by_state": build_state_index(doctors_df, 'State Codes'),
+        "nurses_by_identifier": build_identifier_index(nurses_df, ['Ticket Number Counter', 'Bird Eats Bug Email']),
+        "doctors_by_full_name": build_identifier_index(
+            pd.DataFrame({'Full Name': doctors_df['First Name'].astype(str) + ' ' + doctors_df['Last Name'].astype(str)}),
+            ['Full Name']
+        ),
+        # Enrichment of model results: exact email, then normalized name (titles, nicknames and credentials dropped)
+        "doctors_by_email": build_identifier_index(doctors_df, ['Email']),
+        "doctors_by_name": build_doctor_name_lookup(doctors_df),
+    }
@@ -0,0 +1,90 @@
+"""Streaming exports of the feedback log and match run history, written chunk by chunk as CSV or Parquet."""
+
+import csv
+import importlib.util
+import os
+
+from .feedback import FEEDBACK_COLUMNS, connect_feedback_store, feedback_filter_sql
+from .runs import MATCH_RUN_COLUMNS
+
+
+# Rows held in memory at once; also the Parquet row-group size
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_FORMATS = ("csv", "parquet")
+# Exportable tables: (columns, source relation). Feedback reads the entries view so run reasoning is filled in
+EXPORT_TABLES = {
+    "feedback": (FEEDBACK_COLUMNS, "feedback_entries"),
+    "runs": (MATCH_RUN_COLUMNS, "match_runs"),
+}
+# Fixed Parquet column types, so a chunk that happens to be all NULL in a column still matches the schema
+EXPORT_COLUMN_TYPES = {
+    "id": "int64", "match_score": "double", "user_rating": "int64", "accuracy": "double", "match_rank": "int64",
+    "latency_ms": "double", "input_tokens": "int64", "output_tokens": "int64",
+}
+
+# Parquet needs pyarrow, which is optional; CSV always works
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+# Rows of one table in id order, `chunk_rows` at a time. One statement is stepped through, so the whole
+# export reads a single snapshot even while ratings keep arriving. Filters apply to feedback only
+def iter_export_chunks(table="feedback", chunk_rows=EXPORT_CHUNK_ROWS, db_path=None, **filters):
+    columns, source = EXPORT_TABLES[table]
+    conn = connect_feedback_store(db_path)
+    try:
+        where, params = feedback_filter_sql(conn, **filters) if table == "feedback" else ("", [])
+        order = "id" if table == "feedback" else "rowid"
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {source}{where} ORDER BY {order}", params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def write_csv_chunks(f, columns, chunks):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    count = 0
+    for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+# One row group per chunk, built column-wise from the chunk's tuples
+def write_parquet_chunks(path, columns, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.type_for_alias(EXPORT_COLUMN_TYPES.get(column, "string"))) for column in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+# Stream a table to `path` without building it in memory; returns the number of rows written. The file is
+# written under a temporary name and renamed, so a failed export never leaves a truncated file behind
+def export_table(path, fmt="csv", table="feedback", chunk_rows=EXPORT_CHUNK_ROWS, db_path=None, **filters):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    columns = EXPORT_TABLES[table][0]
+    chunks = iter_export_chunks(table, chunk_rows, db_path, **filters)
+    tmp_path = f"{path}.tmp"
+    try:
+        if fmt == "csv":
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                count = write_csv_chunks(f, columns, chunks)
+        else:
+            count = write_parquet_chunks(tmp_path, columns, chunks)
+        os.replace(tmp_path, path)
+    finally:
+        chunks.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
@@ -0,0 +1,120 @@
+"""Nurse profile extraction from Manual Entry free text."""
+
+import re
+
+from .states import STATE_ADJACENCY, US_STATE_CODES
+
+
+# Lexicons for pulling a nurse profile out of free text in Manual Entry mode
+SERVICE_LEXICON = {
+    "Botox": ("botox", "neurotoxin", "tox", "dysport", "xeomin", "jeuveau", "daxxify"),
+    "Filler": ("filler", "fillers", "juvederm", "restylane", "lip flip"),
+    "Microneedling": ("microneedling", "micro-needling", "microneedle"),
+    "IV Hydration": ("iv hydration", "iv therapy", "iv drip", "iv drips", "ivs", "hydration"),
+    "Peels": ("peel", "peels", "chemical peel"),
+    "PRP": ("prp", "prf", "platelet rich", "platelet-rich"),
+    "Weight Loss": ("weight loss", "semaglutide", "tirzepatide", "glp-1", "glp1"),
+    "Lasers": ("laser", "lasers", "ipl"),
+    "PDO Threads": ("pdo", "threads", "thread lift"),
+    "Kybella": ("kybella",),
+    "BHRT": ("bhrt", "hrt", "hormone", "hormones"),
+    "Peptides": ("peptide", "peptides"),
+}
+
+LICENSE_PATTERNS = (
+    ("NP", re.compile(r"\bN\.?P\b|nurse practitioner|\bF?NP-?C?\b|\bAPRN\b", re.IGNORECASE)),
+    ("RN", re.compile(r"\bRN\b|registered nurse", re.IGNORECASE)),
+    # "PA" is also Pennsylvania, so only accept unambiguous physician-assistant wording
+    ("PA", re.compile(r"physician'?s? assistant|\bPA-C\b|\b(?:an?|as) PA\b", re.IGNORECASE)),
+)
+
+NEW_GRAD_PATTERN = re.compile(r"new grad|newly (?:graduated|licensed)|brand new|no experience|just (?:graduated|started|licensed)|beginner", re.IGNORECASE)
+
+ADVANCED_PATTERN = re.compile(r"\badvanced\b|\bexpert\b|\bseasoned\b|\btrainer\b|\binjector trainer\b", re.IGNORECASE)
+
+YEARS_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)", re.IGNORECASE)
+
+MONTHS_PATTERN = re.compile(r"(\d+)\s*(?:months?|mos?)\b", re.IGNORECASE)
+
+# "and TX" continues a list of places, but "NP and MD" pairs credentials, so after "and" the credential codes
+# below are not read as states; "licensed in MD" still is
+STATE_CODE_PATTERN = re.compile(r"\b(in|from|based in|located in|licensed in|and)\s+([A-Z]{2})\b")
+
+# "Austin, TX" only where the code ends the clause or is followed by a ZIP code, so a comma before other
+# text ("TX, MD supervision needed") is not read as a state
+CITY_STATE_CODE_PATTERN = re.compile(r",\s*([A-Z]{2})(?:\s+(\d{5})\b|(?=\s*(?:[.;:)\n]|$)))")
+# Codes that are also credentials ("Smith, MD", "Jane Doe, PA") count after a comma only with a ZIP code,
+# and never after "and"
+CREDENTIAL_CODES = {"MD", "PA", "NP", "RN", "DO"}
+
+# Build the state name pattern once, longest names first so "west virginia" wins over "virginia" and
+# "washington d.c." over "washington"; lookarounds instead of \b so names ending in "." still match
+STATE_NAME_PATTERN = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(name) for name in sorted(US_STATE_CODES, key=len, reverse=True)) + r")(?!\w)",
+    re.IGNORECASE
+)
+
+# Services mentioned anywhere in free text, using the service lexicon
+def extract_services(text):
+    if not isinstance(text, str) or not text.strip():
+        return []
+    lowered = text.lower()
+    return [
+        service for service, synonyms in SERVICE_LEXICON.items()
+        if any(re.search(r"\b" + re.escape(synonym) + r"\b", lowered) for synonym in synonyms)
+    ]
+
+# Pull state, license type, experience and services out of a free-text nurse description
+def extract_manual_profile(text):
+    profile = {"states": [], "license_type": None, "experience": None, "years": None, "services": []}
+    if not isinstance(text, str) or not text.strip():
+        return profile
+
+    # States: full names anywhere, postal codes only in a location context ("in TX", "Austin, TX")
+    for match in STATE_NAME_PATTERN.finditer(text):
+        code = US_STATE_CODES[re.sub(r"\s+", " ", match.group(1).lower())]
+        if code not in profile["states"]:
+            profile["states"].append(code)
+    city_codes = [
+        code for code, zip_code in CITY_STATE_CODE_PATTERN.findall(text) if zip_code or code not in CREDENTIAL_CODES
+    ]
+    location_codes = [
+        code for prefix, code in STATE_CODE_PATTERN.findall(text) if prefix != "and" or code not in CREDENTIAL_CODES
+    ]
+    for code in location_codes + city_codes:
+        if code in STATE_ADJACENCY and code not in profile["states"]:
+            profile["states"].append(code)
+
+    for license_type, pattern in LICENSE_PATTERNS:
+        if pattern.search(text):
+            profile["license_type"] = license_type
+            break
+
+    # Experience, mapped onto the HubSpot levels: Brand new / Experienced / Advanced
+    years_match = YEARS_PATTERN.search(text)
+    months_match = MONTHS_PATTERN.search(text)
+    if years_match:
+        profile["years"] = float(years_match.group(1))
+    elif months_match:
+        profile["years"] = int(months_match.group(1)) / 12.0
+    if NEW_GRAD_PATTERN.search(text):
+        profile["experience"] = "Brand new"
+    elif ADVANCED_PATTERN.search(text) or (profile["years"] is not None and profile["years"] >= 5):
+        profile["experience"] = "Advanced"
+    elif profile["years"] is not None:
+        profile["experience"] = "Brand new" if profile["years"] < 1 else "Experienced"
+    elif re.search(r"\bexperienced\b", text, re.IGNORECASE):
+        profile["experience"] = "Experienced"
+
+    profile["services"] = extract_services(text)
+
+    return profile
+
+# Summarize an extracted manual profile for the prompt
+def format_manual_profile(profile):
+    return "\n".join([
+        f"- State(s): {', '.join(profile['states']) if profile['states'] else 'Not stated'}",
+        f"- License Type: {profile['license_type'] or 'Not stated'}",
+        f"- Experience Level: {profile['experience'] or 'Not stated'}",
+        f"- Services: {', '.join(profile['services']) if profile['services'] else 'Not stated'}",
+    ])
@@ -0,0 +1,526 @@
+"""SQLite feedback store: O(1) appends, monotonic ids, running aggregates (including score calibration),
+indexed and full-text queries with keyset pagination, links to the match runs being rated, and a one-time
+import of the legacy JSON log."""
+
+import datetime
+import json
+import math
+import os
+import sqlite3
+
+
+# Feedback log: a sqlite store (WAL mode) so concurrent submitters never overwrite each other
+FEEDBACK_DB = os.getenv("MOXIE_FEEDBACK_DB", "matching_feedback.db")
+LEGACY_FEEDBACK_FILE = "matching_feedback.json"
+
+FEEDBACK_PAGE_SIZE = 25
+
+FEEDBACK_COLUMNS = (
+    "id", "timestamp", "md_name", "nurse_name", "match_score", "user_rating", "accuracy", "comments", "match_reasoning",
+    "run_id", "match_rank",
+)
+
+# Aggregates kept per scope: one "all" row plus one row per MD, per nurse and per day ("YYYY-MM-DD")
+FEEDBACK_STATS_KEYS = (
+    ("all", "''"),
+    ("md", "{row}.md_name"),
+    ("nurse", "{row}.nurse_name"),
+    ("day", "substr({row}.timestamp, 1, 10)"),
+)
+
+FEEDBACK_STATS_NEW_KEYS = " UNION ALL ".join(
+    f"SELECT '{scope}' AS scope, {key.format(row='NEW')} AS key" for scope, key in FEEDBACK_STATS_KEYS
+)
+
+# Every insert folds into the aggregates inside the inserting transaction, so they can never drift from the log.
+# Entries without a score (legacy entries that never had one) count toward the ratings only
+FEEDBACK_STATS_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS feedback_stats_insert AFTER INSERT ON feedback
+    BEGIN
+        INSERT INTO feedback_stats (scope, key, entries, score_entries, score_sum, score_sumsq, rating_sum, rating_sumsq)
+        SELECT scope, key, 1, NEW.match_score IS NOT NULL, COALESCE(NEW.match_score, 0),
+               COALESCE(NEW.match_score * NEW.match_score, 0), NEW.user_rating, NEW.user_rating * NEW.user_rating
+        FROM ({FEEDBACK_STATS_NEW_KEYS}) WHERE true
+        ON CONFLICT (scope, key) DO UPDATE SET
+            entries = entries + 1,
+            score_entries = score_entries + excluded.score_entries,
+            score_sum = score_sum + excluded.score_sum,
+            score_sumsq = score_sumsq + excluded.score_sumsq,
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_sumsq = rating_sumsq + excluded.rating_sumsq;
+    END;
+"""
+
+# Where a rated score came from: an LLM refinement, the deterministic ranker (live or from a precomputed
+# sheet), or a score typed in on the Add Feedback tab
+FEEDBACK_SOURCE_SQL = """
+    CASE
+        WHEN {row}.run_id IS NULL THEN 'manual'
+        WHEN (SELECT source FROM match_runs WHERE match_runs.run_id = {row}.run_id) LIKE '%llm' THEN 'llm'
+        ELSE 'ranker'
+    END
+"""
+# Scores are kept in tenths of a point, clipped to the 0-10 scale
+FEEDBACK_SCORE_TENTHS_SQL = "MAX(0, MIN(100, CAST(ROUND({row}.match_score * 10) AS INTEGER)))"
+FEEDBACK_ERROR_SQL = "({row}.match_score - {row}.user_rating)"
+
+# Calibration aggregates, folded in on insert like the stats: a joint histogram of score against rating per
+# source (at most 3 x 101 x 10 rows), and the score-minus-rating error per MD and source
+FEEDBACK_CALIBRATION_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS feedback_calibration_insert AFTER INSERT ON feedback
+    WHEN NEW.match_score IS NOT NULL
+    BEGIN
+        INSERT INTO feedback_calibration (source, score_tenths, rating, entries)
+        VALUES ({FEEDBACK_SOURCE_SQL.format(row="NEW")}, {FEEDBACK_SCORE_TENTHS_SQL.format(row="NEW")}, NEW.user_rating, 1)
+        ON CONFLICT (source, score_tenths, rating) DO UPDATE SET entries = entries + 1;
+        INSERT INTO feedback_errors (md_name, source, entries, error_sum, error_sumsq, abs_error_sum)
+        VALUES (
+            NEW.md_name, {FEEDBACK_SOURCE_SQL.format(row="NEW")}, 1, {FEEDBACK_ERROR_SQL.format(row="NEW")},
+            {FEEDBACK_ERROR_SQL.format(row="NEW")} * {FEEDBACK_ERROR_SQL.format(row="NEW")},
+            abs({FEEDBACK_ERROR_SQL.format(row="NEW")})
+        )
+        ON CONFLICT (md_name, source) DO UPDATE SET
+            entries = entries + 1,
+            error_sum = error_sum + excluded.error_sum,
+            error_sumsq = error_sumsq + excluded.error_sumsq,
+            abs_error_sum = abs_error_sum + excluded.abs_error_sum;
+    END;
+"""
+
+# Entries as the history view reads them: feedback given on a recorded match run stores no reasoning of
+# its own, it is read from the run's match
+FEEDBACK_ENTRIES_VIEW = """
+    CREATE VIEW IF NOT EXISTS feedback_entries AS
+    SELECT feedback.id AS id, feedback.timestamp AS timestamp, feedback.md_name AS md_name,
+           feedback.nurse_name AS nurse_name, feedback.match_score AS match_score,
+           feedback.user_rating AS user_rating, feedback.accuracy AS accuracy, feedback.comments AS comments,
+           COALESCE(
+               NULLIF(feedback.match_reasoning, ''),
+               json_extract(match_runs.matches, '$[' || feedback.match_rank || '].reasoning'),
+               ''
+           ) AS match_reasoning,
+           feedback.run_id AS run_id, feedback.match_rank AS match_rank
+    FROM feedback LEFT JOIN match_runs ON match_runs.run_id = feedback.run_id;
+"""
+
+# Full-text index over comments and reasoning; external content (the entries view), so no text is duplicated
+FEEDBACK_FTS_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE feedback_fts USING fts5(
+        comments, match_reasoning, content='feedback_entries', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER feedback_fts_insert AFTER INSERT ON feedback
+    BEGIN
+        INSERT INTO feedback_fts (rowid, comments, match_reasoning)
+        SELECT id, comments, match_reasoning FROM feedback_entries WHERE id = NEW.id;
+    END
+    """,
+)
+
+# Schema steps in order; a store records how many it has applied in PRAGMA user_version, so each runs once
+# per database. Stores from before the version was kept start at 0 and re-run every (idempotent) step,
+# rebuilding the derived tables from the log. Add a step here rather than DDL in connect_feedback_store
+def create_feedback_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            md_name TEXT NOT NULL,
+            nurse_name TEXT NOT NULL,
+            match_score REAL,
+            user_rating INTEGER NOT NULL,
+            accuracy REAL,
+            comments TEXT,
+            match_reasoning TEXT,
+            legacy_id INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+
+def create_feedback_stats(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_stats (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            score_entries INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL,
+            score_sumsq REAL NOT NULL,
+            rating_sum REAL NOT NULL,
+            rating_sumsq REAL NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    """)
+    add_score_entries_column(conn)
+    conn.execute(FEEDBACK_STATS_TRIGGER)
+    rebuild_feedback_stats(conn)
+
+def create_feedback_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS feedback_by_md ON feedback (md_name, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS feedback_by_nurse ON feedback (nurse_name, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS feedback_by_rating ON feedback (user_rating, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS feedback_by_timestamp ON feedback (timestamp, id)")
+
+# Match runs, the feedback columns that point at them, and the entries view (and full-text index) over both
+def create_match_runs(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS match_runs (
+            run_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            search_type TEXT NOT NULL,
+            search_value TEXT NOT NULL,
+            filters TEXT,
+            source TEXT NOT NULL,
+            prompt_hash TEXT,
+            model TEXT,
+            latency_ms REAL,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            matches TEXT NOT NULL
+        )
+    """)
+    add_run_columns(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS feedback_by_run ON feedback (run_id, match_rank)")
+    conn.execute("CREATE INDEX IF NOT EXISTS match_runs_by_created ON match_runs (created_at)")
+    conn.execute(FEEDBACK_ENTRIES_VIEW)
+    rebuild_feedback_fts(conn)
+
+def create_feedback_calibration(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_calibration (
+            source TEXT NOT NULL,
+            score_tenths INTEGER NOT NULL,
+            rating INTEGER NOT NULL,
+            entries INTEGER NOT NULL,
+            PRIMARY KEY (source, score_tenths, rating)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_errors (
+            md_name TEXT NOT NULL,
+            source TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            error_sum REAL NOT NULL,
+            error_sumsq REAL NOT NULL,
+            abs_error_sum REAL NOT NULL,
+            PRIMARY KEY (md_name, source)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(FEEDBACK_CALIBRATION_TRIGGER)
+    rebuild_feedback_calibration(conn)
+
+# Stores whose aggregates counted a missing score as 0: count scored entries apart and rebuild
+def count_scored_feedback(conn):
+    conn.execute("DROP TRIGGER IF EXISTS feedback_stats_insert")
+    add_score_entries_column(conn)
+    conn.execute(FEEDBACK_STATS_TRIGGER)
+    rebuild_feedback_stats(conn)
+
+FEEDBACK_SCHEMA_STEPS = (
+    create_feedback_tables,
+    create_feedback_stats,
+    create_feedback_indexes,
+    create_match_runs,
+    create_feedback_calibration,
+    count_scored_feedback,
+)
+FEEDBACK_SCHEMA_VERSION = len(FEEDBACK_SCHEMA_STEPS)
+
+# Open a feedback connection; every call gets its own connection so Streamlit sessions never share one.
+# Only a store behind FEEDBACK_SCHEMA_VERSION pays for schema work
+def connect_feedback_store(db_path=None):
+    conn = sqlite3.connect(db_path or FEEDBACK_DB, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < FEEDBACK_SCHEMA_VERSION:
+        try:
+            upgrade_feedback_store(conn)
+        except BaseException:
+            conn.close()
+            raise
+    return conn
+
+# Apply the pending schema steps in one transaction, under the write lock so concurrent first connections
+# do it once
+def upgrade_feedback_store(conn):
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for step in FEEDBACK_SCHEMA_STEPS[version:]:
+            step(conn)
+        conn.execute(f"PRAGMA user_version = {FEEDBACK_SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+# Recompute the aggregates from the log
+def rebuild_feedback_stats(conn):
+    conn.execute("DELETE FROM feedback_stats")
+    for scope, key in FEEDBACK_STATS_KEYS:
+        conn.execute(f"""
+            INSERT INTO feedback_stats (scope, key, entries, score_entries, score_sum, score_sumsq, rating_sum, rating_sumsq)
+            SELECT '{scope}', {key.format(row="feedback")}, COUNT(*), COUNT(match_score), TOTAL(match_score),
+                   TOTAL(match_score * match_score), SUM(user_rating), SUM(user_rating * user_rating)
+            FROM feedback GROUP BY 2 HAVING COUNT(*) > 0
+        """)
+
+def rebuild_feedback_calibration(conn):
+    conn.execute("DELETE FROM feedback_calibration")
+    conn.execute("DELETE FROM feedback_errors")
+    source, error = FEEDBACK_SOURCE_SQL.format(row="feedback"), FEEDBACK_ERROR_SQL.format(row="feedback")
+    conn.execute(f"""
+        INSERT INTO feedback_calibration (source, score_tenths, rating, entries)
+        SELECT {source}, {FEEDBACK_SCORE_TENTHS_SQL.format(row="feedback")}, user_rating, COUNT(*)
+        FROM feedback WHERE match_score IS NOT NULL GROUP BY 1, 2, 3
+    """)
+    conn.execute(f"""
+        INSERT INTO feedback_errors (md_name, source, entries, error_sum, error_sumsq, abs_error_sum)
+        SELECT md_name, {source}, COUNT(*), SUM({error}), SUM({error} * {error}), SUM(abs({error}))
+        FROM feedback WHERE match_score IS NOT NULL GROUP BY 1, 2
+    """)
+
+# Stores created before the aggregates counted scored entries apart
+def add_score_entries_column(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(feedback_stats)")}
+    if "score_entries" not in columns:
+        conn.execute("ALTER TABLE feedback_stats ADD COLUMN score_entries INTEGER NOT NULL DEFAULT 0")
+
+# Stores created before feedback could reference a match run
+def add_run_columns(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(feedback)")}
+    for column, column_type in (("run_id", "TEXT"), ("match_rank", "INTEGER")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE feedback ADD COLUMN {column} {column_type}")
+
+# (Re)create the full-text index over the entries view and index every existing entry; sqlite builds
+# without FTS5 get no index and text search falls back to LIKE
+def rebuild_feedback_fts(conn):
+    conn.execute("DROP TRIGGER IF EXISTS feedback_fts_insert")
+    conn.execute("DROP TABLE IF EXISTS feedback_fts")
+    try:
+        for statement in FEEDBACK_FTS_SCHEMA:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        return
+    conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+
+def feedback_fts_enabled(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback_fts'").fetchone() is not None
+
+# Insert parameters for one entry, in INSERT_FEEDBACK_SQL order
+def feedback_row(md_name, nurse_name, match_score, user_rating, comments, match_reasoning, timestamp=None, legacy_id=None,
+                 run_id=None, match_rank=None):
+    return (
+        timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        md_name,
+        nurse_name,
+        float(match_score) if match_score is not None else None,
+        int(user_rating),
+        int(user_rating) / 10.0,  # Accuracy as a fraction of the max rating
+        comments,
+        match_reasoning,
+        legacy_id,
+        run_id,
+        match_rank,
+    )
+
+INSERT_FEEDBACK_SQL = (
+    "INSERT INTO feedback (timestamp, md_name, nurse_name, match_score, user_rating, accuracy, comments, "
+    "match_reasoning, legacy_id, run_id, match_rank) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Append one entry in a single-row transaction; returns its id (AUTOINCREMENT ids never repeat)
+def add_feedback_entry(md_name, nurse_name, match_score, user_rating, comments, match_reasoning, db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        cursor = conn.execute(
+            INSERT_FEEDBACK_SQL,
+            feedback_row(md_name, nurse_name, match_score, user_rating, comments, match_reasoning)
+        )
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+# All entries, oldest first, as dicts with the legacy JSON keys
+def load_feedback_entries(db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(FEEDBACK_COLUMNS)} FROM feedback_entries ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(FEEDBACK_COLUMNS, row)) for row in rows]
+
+# Bumped by every insert (the AUTOINCREMENT high-water mark); callers cache on it to know when to recompute
+def feedback_version(db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'feedback'").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+# Mean and population standard deviation from a running count, sum and sum of squares
+def mean_and_std(entries, total, total_sq):
+    if not entries:
+        return None, None
+    mean = total / entries
+    return mean, math.sqrt(max(total_sq / entries - mean * mean, 0.0))
+
+def stats_from_row(entries, score_entries, score_sum, score_sumsq, rating_sum, rating_sumsq):
+    score_mean, score_std = mean_and_std(score_entries, score_sum, score_sumsq)
+    rating_mean, rating_std = mean_and_std(entries, rating_sum, rating_sumsq)
+    return {
+        "entries": entries,
+        "avg_match_score": score_mean,
+        "match_score_std": score_std,
+        "avg_user_rating": rating_mean,
+        "user_rating_std": rating_std,
+        "accuracy": rating_mean / 10.0 if rating_mean is not None else None,
+    }
+
+# Aggregates for every key of one scope ("md", "nurse" or "day"), keyed and sorted by name / date
+def feedback_group_stats(scope, db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT key, entries, score_entries, score_sum, score_sumsq, rating_sum, rating_sumsq FROM feedback_stats "
+            "WHERE scope = ? ORDER BY key", (scope,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row[0]: stats_from_row(*row[1:]) for row in rows}
+
+# Everything the history view needs before it touches a single entry: the overall stats, the MD and nurse
+# filter options and the date range, read from the aggregates in one snapshot
+def feedback_summary(db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        conn.execute("BEGIN")
+        overall = conn.execute(
+            "SELECT entries, score_entries, score_sum, score_sumsq, rating_sum, rating_sumsq FROM feedback_stats "
+            "WHERE scope = 'all' AND key = ''"
+        ).fetchone()
+        keys = {
+            scope: [row[0] for row in conn.execute("SELECT key FROM feedback_stats WHERE scope = ? ORDER BY key", (scope,))]
+            for scope in ("md", "nurse")
+        }
+        first_day, last_day = conn.execute("SELECT MIN(key), MAX(key) FROM feedback_stats WHERE scope = 'day'").fetchone()
+        version = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'feedback'").fetchone()
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    summary = stats_from_row(*(overall or (0, 0, 0.0, 0.0, 0.0, 0.0)))
+    summary.update({
+        "md_names": keys["md"],
+        "nurse_names": keys["nurse"],
+        "first_day": first_day,
+        "last_day": last_day,
+        "version": version[0] if version else 0,
+    })
+    return summary
+
+# WHERE clause for the history filters, valid on both the feedback table and the entries view; every
+# condition is served by an index (or the FTS index)
+def feedback_filter_sql(conn, md_name=None, nurse_name=None, min_rating=None, max_rating=None,
+                        start_date=None, end_date=None, search=None):
+    conditions, params = [], []
+    if md_name:
+        conditions.append("md_name = ?")
+        params.append(md_name)
+    if nurse_name:
+        conditions.append("nurse_name = ?")
+        params.append(nurse_name)
+    if min_rating is not None:
+        conditions.append("user_rating >= ?")
+        params.append(int(min_rating))
+    if max_rating is not None:
+        conditions.append("user_rating <= ?")
+        params.append(int(max_rating))
+    if start_date:
+        conditions.append("timestamp >= ?")
+        params.append(str(start_date))
+    if end_date:
+        conditions.append("timestamp < ?")
+        params.append(str(end_date + datetime.timedelta(days=1)))
+    terms = (search or "").split()
+    if terms and feedback_fts_enabled(conn):
+        # Every word must appear, as a word prefix; quoting keeps FTS syntax in user input literal
+        conditions.append("id IN (SELECT rowid FROM feedback_fts WHERE feedback_fts MATCH ?)")
+        params.append(" ".join('"{}"*'.format(term.replace('"', '""')) for term in terms))
+    else:
+        for term in terms:
+            conditions.append("id IN (SELECT id FROM feedback_entries WHERE comments LIKE ? OR match_reasoning LIKE ?)")
+            params.extend([f"%{term}%"] * 2)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+# One page of filtered entries, newest first. Keyset pagination: pass the returned cursor as `before_id`
+# for the next (older) page, so a deep page costs the same as the first. limit=None returns every match
+def query_feedback(before_id=None, limit=FEEDBACK_PAGE_SIZE, db_path=None, **filters):
+    conn = connect_feedback_store(db_path)
+    try:
+        where, params = feedback_filter_sql(conn, **filters)
+        if before_id is not None:
+            where += (" AND " if where else " WHERE ") + "id < ?"
+            params.append(before_id)
+        sql = f"SELECT {', '.join(FEEDBACK_COLUMNS)} FROM feedback_entries{where} ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)  # One extra row tells whether an older page exists
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    entries = [dict(zip(FEEDBACK_COLUMNS, row)) for row in rows[:limit]]
+    next_before_id = entries[-1]["id"] if limit is not None and len(rows) > limit else None
+    return entries, next_before_id
+
+# Counts read the base table: the entries view's join to the runs would otherwise be done for every row
+def count_feedback(db_path=None, **filters):
+    conn = connect_feedback_store(db_path)
+    try:
+        where, params = feedback_filter_sql(conn, **filters)
+        return conn.execute(f"SELECT COUNT(*) FROM feedback{where}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+# Import matching_feedback.json once, in one transaction. The file is left in place as a backup; its
+# ids (which could collide) are kept as legacy_id and entries get fresh ids in file order. A missing or
+# null score is stored as NULL, which the aggregates and calibration skip
+def migrate_legacy_feedback(json_path=LEGACY_FEEDBACK_FILE, db_path=None):
+    if not os.path.exists(json_path):
+        return 0
+    conn = connect_feedback_store(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM feedback_meta WHERE key = 'legacy_json_migrated'").fetchone():
+            conn.execute("ROLLBACK")
+            return 0
+        with open(json_path) as f:
+            entries = json.load(f)
+        conn.executemany(INSERT_FEEDBACK_SQL, [
+            feedback_row(
+                entry.get("md_name", ""), entry.get("nurse_name", ""), entry.get("match_score"),
+                entry.get("user_rating") or 0, entry.get("comments", ""), entry.get("match_reasoning", ""),
+                timestamp=entry.get("timestamp"), legacy_id=entry.get("id")
+            )
+            for entry in entries
+        ])
+        conn.execute(
+            "INSERT INTO feedback_meta (key, value) VALUES ('legacy_json_migrated', ?)",
+            (f"{len(entries)} entries from {os.path.abspath(json_path)}",)
+        )
+        conn.execute("COMMIT")
+        return len(entries)
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,125 @@
+"""Per-MD match outcome features mined from the HubSpot ticket history."""
+
+import re
+
+import pandas as pd
+
+
+# Normalize a person's name for lookups: drop titles, nicknames, credentials and "[MD Profile]" suffixes
+def normalize_person_name(name):
+    if not isinstance(name, str):
+        return ""
+    name = re.sub(r'\[.*?\]|"[^"]*"|\([^)]*\)', ' ', name)
+    name = re.sub(r',\s*(NP|RN|PA|MD|DO)\b.*$', ' ', name, flags=re.IGNORECASE)
+    name = re.sub(r'^\s*dr\.?\s+', ' ', name, flags=re.IGNORECASE)
+    name = re.sub(r'[^a-z\s-]', ' ', name.lower())
+    return ' '.join(name.split())
+
+# Map normalized full names (and unambiguous last names) to doctor row labels
+def build_doctor_name_lookup(doctors_df):
+    by_full_name = {}
+    by_last_name = {}
+    for label, first, last in zip(doctors_df.index, doctors_df['First Name'], doctors_df['Last Name']):
+        full_name = normalize_person_name(f"{first} {last}")
+        if not full_name:
+            continue
+        by_full_name.setdefault(full_name, label)
+        by_last_name.setdefault(full_name.split()[-1], []).append(label)
+    unique_last_names = {name: labels[0] for name, labels in by_last_name.items() if len(labels) == 1}
+    return by_full_name, unique_last_names
+
+# Resolve a free-text MD name from the HubSpot history ("Dr. Snipes", "Dr. Michael \"Mike\" Woo-ming") to a row label
+def resolve_doctor_label(name, name_lookup):
+    by_full_name, by_last_name = name_lookup
+    normalized = normalize_person_name(name)
+    if not normalized:
+        return None
+    if normalized in by_full_name:
+        return by_full_name[normalized]
+    return by_last_name.get(normalized.split()[-1])
+
+# Historical outcome columns in the HubSpot export ("MD #2 Option ", "MD #3 Cancelation", ...)
+MD_SLOT_COLUMN_PATTERN = re.compile(r'^MD #(\d+) (Option|Cancelation|Approval Sent)$')
+
+# Pseudo-count used to shrink rates for rarely offered MDs toward the overall rate
+HISTORY_PRIOR_WEIGHT = 3
+
+# Mine per-MD acceptance, cancellation and time-to-sign from past matching tickets
+def add_match_history_features(doctors_df, hubspot_df):
+    doctors_df = doctors_df.copy()
+    offers = pd.Series(0, index=doctors_df.index, dtype=float)
+    signings = pd.Series(0, index=doctors_df.index, dtype=float)
+    cancellations = pd.Series(0, index=doctors_df.index, dtype=float)
+    days_to_sign = {label: [] for label in doctors_df.index}
+
+    if hubspot_df is not None and not hubspot_df.empty:
+        slots = {}
+        for column in hubspot_df.columns:
+            match = MD_SLOT_COLUMN_PATTERN.match(column.strip())
+            if match:
+                slots.setdefault(int(match.group(1)), {})[match.group(2)] = column
+
+        name_lookup = build_doctor_name_lookup(doctors_df)
+        resolved = {}
+
+        def resolve(name):
+            if name not in resolved:
+                resolved[name] = resolve_doctor_label(name, name_lookup)
+            return resolved[name]
+
+        signed_with = hubspot_df['Signed With'] if 'Signed With' in hubspot_df.columns else pd.Series(None, index=hubspot_df.index)
+        ticket_cancel = hubspot_df['Match Cancelation Reason'] if 'Match Cancelation Reason' in hubspot_df.columns else pd.Series(None, index=hubspot_df.index)
+        created = pd.to_datetime(hubspot_df['Create date'], errors='coerce') if 'Create date' in hubspot_df.columns else pd.Series(pd.NaT, index=hubspot_df.index)
+        signed_on = pd.to_datetime(hubspot_df['Signing Date'], errors='coerce') if 'Signing Date' in hubspot_df.columns else pd.Series(pd.NaT, index=hubspot_df.index)
+
+        for position, row_label in enumerate(hubspot_df.index):
+            signer = resolve(signed_with.iloc[position]) if pd.notna(signed_with.iloc[position]) else None
+            if signer is not None:
+                signings[signer] += 1
+                if pd.notna(created.iloc[position]) and pd.notna(signed_on.iloc[position]):
+                    days_to_sign[signer].append((signed_on.iloc[position] - created.iloc[position]).days)
+
+            for columns in slots.values():
+                option = hubspot_df.at[row_label, columns['Option']] if 'Option' in columns else None
+                md_label = resolve(option) if isinstance(option, str) else None
+                if md_label is None:
+                    continue
+                offers[md_label] += 1
+                if md_label == signer:
+                    continue
+                # An offer counts as cancelled when its slot was cancelled, or the ticket was cancelled
+                # or signed with a different MD
+                slot_cancel = hubspot_df.at[row_label, columns['Cancelation']] if 'Cancelation' in columns else None
+                if pd.notna(slot_cancel) or pd.notna(ticket_cancel.iloc[position]) or signer is not None:
+                    cancellations[md_label] += 1
+
+    total_offers = offers.sum()
+    overall_acceptance = signings.sum() / total_offers if total_offers else 0.0
+    overall_cancellation = cancellations.sum() / total_offers if total_offers else 0.0
+
+    doctors_df['Match Offers'] = offers.astype(int)
+    doctors_df['Match Signings'] = signings.astype(int)
+    doctors_df['Acceptance Rate'] = (
+        (signings + HISTORY_PRIOR_WEIGHT * overall_acceptance) / (offers + HISTORY_PRIOR_WEIGHT)
+    ).clip(0, 1)
+    doctors_df['Cancellation Rate'] = (
+        (cancellations + HISTORY_PRIOR_WEIGHT * overall_cancellation) / (offers + HISTORY_PRIOR_WEIGHT)
+    ).clip(0, 1)
+    doctors_df['Median Days To Sign'] = [
+        float(pd.Series(days).median()) if days else float('nan') for days in (days_to_sign[label] for label in doctors_df.index)
+    ]
+    return doctors_df
+
+# Describe an MD's matching history for the prompt (empty when the MD has never been offered)
+def format_match_history(doctor):
+    offers = int(doctor.get('Match Offers', 0) or 0)
+    if offers <= 0:
+        return ""
+    history = (
+        f"offered {offers} times, {doctor.get('Match Signings', 0)} signed, "
+        f"acceptance rate {doctor.get('Acceptance Rate', 0):.0%}, cancellation rate {doctor.get('Cancellation Rate', 0):.0%}"
+    )
+    median_days = doctor.get('Median Days To Sign')
+    if median_days is not None and pd.notna(median_days):
+        history += f", median {median_days:.0f} days to sign"
+    return history
@@ -0,0 +1,187 @@
+"""Process-wide background queue for match jobs: progress, cooperative cancellation and an in-flight cap."""
+
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .llm import query_claude
+from .prompts import create_claude_prompt, get_prompt_hash
+from .ranking import rank_candidates
+from .tracing import NULL_TRACE, trace_span, use_trace
+
+
+JOB_WORKERS = int(os.getenv("MOXIE_JOB_WORKERS", "4"))
+MAX_IN_FLIGHT_JOBS = int(os.getenv("MOXIE_MAX_IN_FLIGHT_JOBS", "16"))
+# Finished jobs stay pollable this long so a session that reconnects can still pick up its result
+FINISHED_JOB_TTL = 600
+
+class JobCancelled(Exception):
+    pass
+
+class MatchJob:
+    def __init__(self, job_id, key):
+        self.id = job_id
+        self.key = key
+        self.status = "queued"
+        self.progress = "Queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = 1
+        # Seconds spent parked in hold() and whether a billable (LLM) call was made
+        self.held_seconds = 0.0
+        self.cost_incurred = False
+        # Spans of the job's stages (queue wait, prompt, API call), for the request that waits on it
+        self.trace = NULL_TRACE
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._release_event = threading.Event()
+
+    # Report progress from inside the job; raises JobCancelled once nobody wants the result any more
+    def set_progress(self, message):
+        self.progress = message
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    # Park the job for up to `seconds` unless release() is called first, so cancellations in the meantime cost nothing
+    def hold(self, seconds):
+        held_from = time.monotonic()
+        self._release_event.wait(seconds)
+        self.held_seconds += time.monotonic() - held_from
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def release(self):
+        self._release_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self._done_event.is_set()
+
+    def wait(self, timeout=None):
+        return self._done_event.wait(timeout)
+
+    def elapsed(self):
+        return (self.finished_at or time.monotonic()) - self.submitted_at
+
+    # Time spent doing work rather than waiting in hold()
+    def work_seconds(self):
+        return max(self.elapsed() - self.held_seconds, 0.0)
+
+class MatchJobQueue:
+    def __init__(self, workers=JOB_WORKERS, max_in_flight=MAX_IN_FLIGHT_JOBS):
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="match-job")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._by_key = {}
+
+    # Submit func(job, *args) unless an identical job is already in flight; returns (job, None) or (None, error).
+    # A `trace` records the job's stages; a joined in-flight job keeps the trace it was submitted with
+    def submit(self, key, func, *args, trace=None, **kwargs):
+        with self._lock:
+            self._prune()
+            existing = self._by_key.get(key)
+            if existing is not None and not existing.done() and not existing.cancelled:
+                existing.subscribers += 1
+                existing.release()
+                return existing, None
+            if sum(1 for job in self._jobs.values() if not job.done()) >= self.max_in_flight:
+                return None, "The matching service is busy. Please try again in a moment."
+            job = MatchJob(next(self._ids), key)
+            if trace is not None:
+                job.trace = trace
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job, None
+
+    def _run(self, job, func, args, kwargs):
+        try:
+            if job.cancelled:
+                raise JobCancelled()
+            job.status = "running"
+            job.started_at = time.monotonic()
+            if job.trace.enabled:
+                now = time.perf_counter()
+                job.trace.record("queue_wait", now - (job.started_at - job.submitted_at), now)
+            with use_trace(job.trace):
+                job.result = func(job, *args, **kwargs)
+            job.status = "cancelled" if job.cancelled else "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.monotonic()
+            job._done_event.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # Drop one subscriber; the job is cancelled once no session is waiting for it
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done():
+                return False
+            job.subscribers -= 1
+            if job.subscribers <= 0:
+                job._cancel_event.set()
+                job.release()
+                job.progress = "Cancelled"
+            return True
+
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done())
+
+    def stats(self):
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _prune(self):
+        cutoff = time.monotonic() - FINISHED_JOB_TTL
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done() and job.finished_at < cutoff]:
+            job = self._jobs.pop(job_id)
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+# Job body for the deterministic ranking
+def rank_match_job(job, search_type, search_value, doctors_df, nurses_df, indexes, filters):
+    job.set_progress("Ranking candidates")
+    with trace_span("rank"):
+        matches, error = rank_candidates(search_type, search_value, doctors_df, nurses_df, filters=filters, indexes=indexes)
+    return {"matches": matches, "error": error}
+
+# Job body for AI refinement: build the prompt and call the model, checking for cancellation between steps.
+# A speculative job holds for `hold` seconds first so a quickly abandoned selection never reaches the API
+def refine_match_job(job, search_type, search_value, doctors_df, nurses_df, indexes, filters, api_key, hold=0):
+    if hold:
+        job.set_progress("Waiting for the selection to settle")
+        with trace_span("prefetch_hold"):
+            job.hold(hold)
+    job.set_progress("Building prompt")
+    with trace_span("build_prompt"):
+        prompt, error = create_claude_prompt(search_type, search_value, doctors_df, nurses_df, filters=filters, indexes=indexes)
+    if error:
+        return {"error": error}
+    job.set_progress("Waiting for the AI model")
+    job.cost_incurred = True
+    usage = {}
+    response = query_claude(prompt, api_key, usage=usage)
+    job.set_progress("Finishing")
+    return {"response": response, "prompt_hash": get_prompt_hash(prompt), "usage": usage}
@@ -0,0 +1,84 @@
+"""Anthropic API calls and response parsing."""
+
+import json
+import time
+
+import anthropic
+
+from .tracing import trace_span
+
+
+# Function to call Claude API with fallback to Haiku model. Pass a dict as `usage` to get back the model
+# that answered, its latency and token counts
+def query_claude(prompt, api_key, max_retries=2, notify=None, usage=None):
+    # First try with the primary model (Sonnet)
+    primary_model = "claude-3-5-sonnet-20240620"
+    fallback_model = "claude-3-haiku-20240307"
+    
+    for attempt in range(max_retries):
+        try:
+            # Choose model based on the attempt number
+            current_model = primary_model if attempt == 0 else fallback_model
+            
+            with trace_span("llm_call", model=current_model, attempt=attempt + 1) as span:
+                # Initialize the client
+                client = anthropic.Anthropic(api_key=api_key)
+                
+                # Make the API request
+                request_start = time.perf_counter()
+                message = client.messages.create(
+                    model=current_model,
+                    max_tokens=4000,
+                    temperature=0.2,
+                    system="You are a medical staffing expert at Moxie. You help match nurses with medical directors based on their location, experience, services offered, personality traits, and other relevant factors. You always prioritize state licensing requirements (especially for California) and capacity limitations. You always respond in JSON format as specified in the prompts.",
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+                if span is not None:
+                    message_usage = getattr(message, "usage", None)
+                    span["input_tokens"] = getattr(message_usage, "input_tokens", None)
+                    span["output_tokens"] = getattr(message_usage, "output_tokens", None)
+            if usage is not None:
+                message_usage = getattr(message, "usage", None)
+                usage.update({
+                    "model": getattr(message, "model", None) or current_model,
+                    "latency_ms": (time.perf_counter() - request_start) * 1000,
+                    "input_tokens": getattr(message_usage, "input_tokens", None),
+                    "output_tokens": getattr(message_usage, "output_tokens", None),
+                })
+            return message.content[0].text
+            
+        except Exception as e:
+            error_str = str(e)
+            
+            # If this was the primary model and we got an overloaded error
+            if attempt == 0 and "overloaded_error" in error_str:
+                if notify:
+                    notify("warning", "Primary AI model is busy. Trying with a faster model...")
+                time.sleep(1)  # Brief pause before retrying
+                continue
+                
+            # If this was the fallback model or another error
+            elif attempt == max_retries - 1:
+                if notify:
+                    notify("error", f"API error: {error_str}")
+                return json.dumps({"error": f"API error: {error_str}"})
+                
+            # If this was the primary model but not an overloaded error
+            else:
+                if notify:
+                    notify("error", f"API error: {error_str}")
+                return json.dumps({"error": f"API error: {error_str}"})
+
+# Parse a model response into its JSON payload; returns (payload, None) or (None, error message)
+def parse_match_response(response):
+    try:
+        payload = json.loads(response)
+    except (TypeError, json.JSONDecodeError):
+        return None, "Error parsing response. Please try again."
+    if not isinstance(payload, dict):
+        return None, "Error parsing response. Please try again."
+    if "error" in payload:
+        return None, payload["error"]
+    return payload, None
@@ -0,0 +1,235 @@
+"""Precomputed match sheets keyed by a fingerprint of the roster exports and ranking weights."""
+
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .candidates import find_doctor, find_nurse, resolve_match_doctor
+from .capacity import LEDGER_LICENSE_TYPES, apply_live_capacity, get_available_capacity, seed_capacity_ledger
+from .llm import parse_match_response, query_claude
+from .prompts import create_claude_prompt
+from .ranking import active_ranking_weights, rank_candidates
+from .roster import load_roster
+
+
+# Bump when the sheet layout or the meaning of its results changes so old sheets are ignored
+SHEET_SCHEMA_VERSION = 1
+MATCH_SHEET_DIR = os.getenv("MOXIE_MATCH_SHEET_DIR", "match_sheets")
+ROSTER_FILES = ("Medical_List.csv", "md_metadata.csv", "hubspot_moxie.csv")
+
+# Filters the UI starts with; precomputed results are only served when a search uses exactly these
+DEFAULT_SHEET_FILTERS = {
+    "md": {"experience": None, "license_type": None, "location": "Same State Only", "requirements": ""},
+    "nurse": {"md_age": None, "interaction_style": None, "location": "Same State Only", "service_requirements": ""},
+}
+
+# Fingerprint of the roster exports and the ranker weights (learned or default). Live capacity is left out so
+# reservations made after the nightly run do not orphan the sheet; lookups check it per result instead
+def roster_fingerprint(data_dir=".", weights=None):
+    digest = hashlib.sha256(f"schema:{SHEET_SCHEMA_VERSION}".encode())
+    for file_name in ROSTER_FILES:
+        path = os.path.join(data_dir, file_name)
+        digest.update(file_name.encode())
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    digest.update(json.dumps(weights or active_ranking_weights()[1], sort_keys=True).encode())
+    return digest.hexdigest()
+
+def match_sheet_path(fingerprint, sheet_dir=None):
+    return os.path.join(sheet_dir or MATCH_SHEET_DIR, f"match_sheet_{fingerprint[:16]}.json")
+
+# Keys the UI selects by: "First Last" for MDs, the stripped email for nurses
+def sheet_search_values(search_type, doctors_df, nurses_df):
+    if search_type == "md":
+        names = doctors_df['First Name'].astype(str) + " " + doctors_df['Last Name'].astype(str)
+        return sorted(set(names))
+    emails = nurses_df['Bird Eats Bug Email'].dropna().astype(str).str.strip()
+    return sorted(set(email for email in emails if '@' in email))
+
+def sheet_key(search_value):
+    return str(search_value).strip().lower()
+
+# Worker-process roster, loaded once per process by the pool initializer
+_worker_roster = None
+
+def _init_worker(data_dir, available):
+    global _worker_roster
+    doctors_df, nurses_df, indexes = load_roster(data_dir)
+    if available:
+        doctors_df = apply_live_capacity(doctors_df, available)
+    _worker_roster = (doctors_df, nurses_df, indexes)
+
+def _rank_batch(search_type, search_values, filters, k):
+    doctors_df, nurses_df, indexes = _worker_roster
+    return _rank_values(search_type, search_values, doctors_df, nurses_df, indexes, filters, k)
+
+def _rank_values(search_type, search_values, doctors_df, nurses_df, indexes, filters, k):
+    results = {}
+    for search_value in search_values:
+        matches, error = rank_candidates(search_type, search_value, doctors_df, nurses_df, filters=filters, k=k, indexes=indexes)
+        results[sheet_key(search_value)] = {"matches": matches, "error": error, "source": "ranker"}
+    return results
+
+# Rank every nurse (search_type "nurse") or every MD ("md"), spreading batches over worker processes
+def compute_ranked_sheet(search_type, doctors_df, nurses_df, indexes, data_dir=".", available=None,
+                         filters=None, k=3, workers=1, batch_size=50, limit=None):
+    filters = dict(DEFAULT_SHEET_FILTERS[search_type] if filters is None else filters)
+    search_values = sheet_search_values(search_type, doctors_df, nurses_df)[:limit]
+
+    if workers <= 1:
+        return _rank_values(search_type, search_values, doctors_df, nurses_df, indexes, filters, k)
+
+    batches = [search_values[start:start + batch_size] for start in range(0, len(search_values), batch_size)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir, available)) as pool:
+        for batch_results in pool.map(_rank_batch, [search_type] * len(batches), batches,
+                                      [filters] * len(batches), [k] * len(batches)):
+            results.update(batch_results)
+    return results
+
+# Replace ranker results with LLM results, at most `concurrency` requests in flight; failures keep the ranking
+def refine_sheet_with_llm(search_type, results, search_values, doctors_df, nurses_df, indexes, api_key,
+                          filters=None, concurrency=4):
+    filters = dict(DEFAULT_SHEET_FILTERS[search_type] if filters is None else filters)
+
+    def refine(search_value):
+        prompt, error = create_claude_prompt(search_type, search_value, doctors_df, nurses_df, filters=filters, indexes=indexes)
+        if error:
+            return search_value, None, error
+        payload, error = parse_match_response(query_claude(prompt, api_key))
+        return search_value, payload, error
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for search_value, payload, error in pool.map(refine, search_values):
+            if error:
+                failures[sheet_key(search_value)] = error
+                continue
+            results[sheet_key(search_value)] = {"matches": payload.get("matches", []), "error": None, "source": "llm"}
+    return failures
+
+def write_match_sheet(sheet, sheet_dir=None):
+    path = match_sheet_path(sheet["fingerprint"], sheet_dir)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write to a temp file and rename so readers never see a half-written sheet
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(sheet, f)
+    os.replace(tmp_path, path)
+    return path
+
+# Merge new results into the sheet for this fingerprint (so the nurse and MD sides can be built separately)
+def build_match_sheet(fingerprint, search_type, results, filters=None, sheet_dir=None):
+    sheet = load_match_sheet(fingerprint, sheet_dir) or {
+        "schema_version": SHEET_SCHEMA_VERSION,
+        "fingerprint": fingerprint,
+        "sides": {},
+    }
+    sheet["generated_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    sheet["sides"][search_type] = {
+        "filters": dict(DEFAULT_SHEET_FILTERS[search_type] if filters is None else filters),
+        "results": results,
+    }
+    return sheet
+
+# Load the sheet for a fingerprint, or None when it is missing, stale or unreadable
+def load_match_sheet(fingerprint, sheet_dir=None):
+    try:
+        with open(match_sheet_path(fingerprint, sheet_dir)) as f:
+            sheet = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if sheet.get("schema_version") != SHEET_SCHEMA_VERSION or sheet.get("fingerprint") != fingerprint:
+        return None
+    return sheet
+
+# Precomputed matches checked against the live roster: None when a matched MD (nurse search) or the searched
+# MD (MD search) has since run out of capacity for the nurse's license type, so the search is ranked live
+# instead. Otherwise the matches with each MD's current capacity status
+def live_sheet_matches(search_type, search_value, matches, doctors_df, nurses_df, indexes):
+    if search_type == "nurse":
+        nurse = find_nurse(nurses_df, search_value, indexes)
+        if nurse is None:
+            return None
+        nurse_license = str(nurse['Provider License Type']).strip().upper()
+        column = f"{nurse_license} Capacity"
+        live_matches = []
+        for match in matches:
+            doctor = resolve_match_doctor(match, doctors_df, indexes)
+            if doctor is None:
+                return None
+            if nurse_license in LEDGER_LICENSE_TYPES and column in doctor.index and not doctor[column] > 0:
+                return None
+            capacity_status = doctor.get('Capacity Status', match.get("capacity_status", ""))
+            live_matches.append(dict(match, capacity_status=str(capacity_status)))
+        return live_matches
+
+    doctor = find_doctor(doctors_df, search_value, indexes)
+    if doctor is None:
+        return None
+    for match in matches:
+        license_type = str(match.get("license_type", "")).strip().upper()
+        column = f"{license_type} Capacity"
+        if license_type in LEDGER_LICENSE_TYPES and column in doctor.index and not doctor[column] > 0:
+            return None
+    return matches
+
+# Precomputed result for one search, only when it was computed with the same filters. With a roster the
+# result is also checked against live capacity (see live_sheet_matches)
+def lookup_match_sheet(sheet, search_type, search_value, filters, doctors_df=None, nurses_df=None, indexes=None):
+    if not sheet:
+        return None
+    side = sheet.get("sides", {}).get(search_type)
+    if not side or side["filters"] != {key: filters.get(key) for key in side["filters"]}:
+        return None
+    result = side["results"].get(sheet_key(search_value))
+    if not result or result.get("error"):
+        return None
+    if doctors_df is not None:
+        matches = live_sheet_matches(search_type, search_value, result["matches"], doctors_df, nurses_df, indexes)
+        if matches is None:
+            return None
+        result = dict(result, matches=matches)
+    return dict(result, generated_at=sheet.get("generated_at"))
+
+# Headless entry point used by the CLI: load, rank (and optionally refine) and write the sheet
+def precompute_match_sheet(search_types, data_dir=".", sheet_dir=None, workers=1, k=3, limit=None,
+                           use_llm=False, api_key=None, llm_concurrency=4, use_live_capacity=True, notify=None):
+    doctors_df, nurses_df, indexes = load_roster(data_dir, notify=notify)
+    available = None
+    if use_live_capacity:
+        try:
+            # Seed exactly as the app does on load so the sheet is ranked against the same capacity snapshot
+            seed_capacity_ledger(doctors_df)
+            available = get_available_capacity({"version": None, "available": {}, "lock": threading.Lock()})
+        except sqlite3.Error as e:
+            if notify:
+                notify("warning", f"Capacity ledger unavailable, using static capacity: {e}")
+        if available:
+            doctors_df = apply_live_capacity(doctors_df, available)
+
+    fingerprint = roster_fingerprint(data_dir)
+    summary = {"fingerprint": fingerprint, "sides": {}}
+    for search_type in search_types:
+        results = compute_ranked_sheet(search_type, doctors_df, nurses_df, indexes, data_dir=data_dir,
+                                       available=available, k=k, workers=workers, limit=limit)
+        failures = {}
+        if use_llm and api_key:
+            search_values = [value for value in sheet_search_values(search_type, doctors_df, nurses_df)[:limit]
+                             if not results.get(sheet_key(value), {}).get("error")]
+            failures = refine_sheet_with_llm(search_type, results, search_values, doctors_df, nurses_df, indexes,
+                                             api_key, concurrency=llm_concurrency)
+        sheet = build_match_sheet(fingerprint, search_type, results, sheet_dir=sheet_dir)
+        summary["path"] = write_match_sheet(sheet, sheet_dir)
+        summary["sides"][search_type] = {
+            "searches": len(results),
+            "ranked": sum(1 for result in results.values() if not result["error"]),
+            "llm": sum(1 for result in results.values() if result["source"] == "llm"),
+            "llm_failures": len(failures),
+        }
+    return summary
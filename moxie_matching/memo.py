@@ -0,0 +1,43 @@
+"""Bounded LRU memo of match results, keyed by search, filters and roster version."""
+
+from collections import OrderedDict
+
+
+# Enough to hop between a handful of people and filter combinations without growing the session unbounded
+RESULT_MEMO_SIZE = 20
+
+def new_result_memo():
+    return OrderedDict()
+
+# Filters compare equal regardless of order, blank values or case/whitespace in free text
+def normalize_filters(filters):
+    normalized = []
+    for key, value in sorted((filters or {}).items()):
+        if isinstance(value, str):
+            value = " ".join(value.lower().split())
+        if value in (None, ""):
+            continue
+        normalized.append((key, value))
+    return tuple(normalized)
+
+def result_memo_key(search_type, search_value, filters, roster_version):
+    return (search_type, " ".join(str(search_value).lower().split()), normalize_filters(filters), roster_version)
+
+# Fetch a result and mark it most recently used
+def memo_get(memo, key):
+    if key not in memo:
+        return None
+    memo.move_to_end(key)
+    return memo[key]
+
+# Store a result, evicting the least recently used entries beyond max_entries
+def memo_put(memo, key, result, max_entries=RESULT_MEMO_SIZE):
+    memo[key] = result
+    memo.move_to_end(key)
+    while len(memo) > max_entries:
+        memo.popitem(last=False)
+
+# (key, result) pairs, most recently used first
+def memo_recent(memo, limit=None):
+    recent = list(reversed(memo.items()))
+    return recent if limit is None else recent[:limit]
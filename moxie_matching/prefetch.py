@@ -0,0 +1,76 @@
+"""Speculative prefetch bookkeeping: the cost guard on abandoned AI calls, hit rate and latency saved."""
+
+import collections
+import os
+import threading
+import time
+
+
+# Speculative AI calls wait this long for the selection to settle before spending anything
+SPECULATION_HOLD_SECONDS = float(os.getenv("MOXIE_SPECULATION_HOLD_SECONDS", "1.5"))
+# At most this many speculative AI calls may go unused per window before AI speculation pauses
+SPECULATION_WASTE_BUDGET = int(os.getenv("MOXIE_SPECULATION_WASTE_BUDGET", "20"))
+SPECULATION_WASTE_WINDOW = 3600
+
+class SpeculationTracker:
+    def __init__(self, waste_budget=SPECULATION_WASTE_BUDGET, waste_window=SPECULATION_WASTE_WINDOW):
+        self.waste_budget = waste_budget
+        self.waste_window = waste_window
+        self._lock = threading.Lock()
+        self._wasted_calls = collections.deque()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.abandoned = 0
+        self.wasted_llm_calls = 0
+        self.seconds_saved = 0.0
+
+    # Whether another speculative AI call fits in the waste budget
+    def allow_llm(self):
+        with self._lock:
+            self._expire()
+            return len(self._wasted_calls) < self.waste_budget
+
+    def record_started(self):
+        with self._lock:
+            self.started += 1
+
+    # A search used speculative jobs: the work they had already done is latency the user did not wait for
+    def record_hit(self, jobs):
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += sum(job.work_seconds() for job in jobs)
+
+    # A search ran with no matching speculation (e.g. the filters were changed first)
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    # A speculation was dropped unused; count its AI call against the budget if one was made
+    def record_abandoned(self, jobs):
+        with self._lock:
+            self.abandoned += 1
+            wasted = sum(1 for job in jobs if job.cost_incurred)
+            self.wasted_llm_calls += wasted
+            now = time.monotonic()
+            self._wasted_calls.extend([now] * wasted)
+
+    def summary(self):
+        with self._lock:
+            self._expire()
+            searches = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / searches if searches else None,
+                "seconds_saved": self.seconds_saved,
+                "abandoned": self.abandoned,
+                "wasted_llm_calls": self.wasted_llm_calls,
+                "llm_paused": len(self._wasted_calls) >= self.waste_budget,
+            }
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.waste_window
+        while self._wasted_calls and self._wasted_calls[0] < cutoff:
+            self._wasted_calls.popleft()
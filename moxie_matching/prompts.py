@@ -0,0 +1,438 @@
+"""Prompt construction for the LLM matching pass."""
+
+import hashlib
+
+import pandas as pd
+
+from .candidates import find_doctor, find_nurse, select_doctor_candidates, select_nurse_candidates
+from .data import build_roster_indexes
+from .extract import extract_manual_profile, format_manual_profile
+from .history import format_match_history
+from .states import normalize_state
+from .text_store import row_text
+from .tracing import trace_span
+
+
+# Format one doctor's profile for a prompt, showing capacity for the nurse's license type
+def format_doctor_for_prompt(doctor, nurse_license, text_table=None):
+    # Get the states (handling multiple states)
+    states = doctor.get('States List', []) if isinstance(doctor.get('States List'), list) else [doctor.get('Residing State  (Lives In)', '')]
+    states_str = ', '.join(str(s) for s in states if s)
+    
+    # Get capacity information based on nurse's license type
+    capacity_status = doctor.get('Capacity Status', '')
+    if str(nurse_license).upper() == "NP":
+        capacity_info = f"NP Capacity: {doctor.get('NP Capacity', 'Unknown')}"
+    else:  # RN or other
+        capacity_info = f"RN Capacity: {doctor.get('RN Capacity', 'Unknown')}"
+    
+    # Get personality traits and preferences
+    traits = row_text(doctor, 'Personality Traits', text_table)
+    preferences = row_text(doctor, 'MD Preferences', text_table)
+    
+    doctor_info = f"""
+    Doctor:
+    - Name: {doctor['First Name']} {doctor['Last Name']}
+    - Email: {doctor['Email']}
+    - State(s): {states_str}
+    - {capacity_info}
+    - Capacity Status: {capacity_status}
+    """
+    
+    if traits:
+        doctor_info += f"- Personality: {traits}\n"
+    
+    if preferences:
+        doctor_info += f"- Preferences: {preferences}\n"
+    
+    match_history = format_match_history(doctor)
+    if match_history:
+        doctor_info += f"- Match History: {match_history}\n"
+    
+    return doctor_info
+
+# Function to create a matching prompt
+def create_claude_prompt(search_type, search_value, doctors_df, nurses_df, filters=None, indexes=None):
+    if filters is None:
+        filters = {}
+    
+    if indexes is None:
+        indexes = build_roster_indexes(doctors_df, nurses_df)
+    
+    if search_type == "md":
+        # Find the doctor in the dataframe
+        doctor = find_doctor(doctors_df, search_value, indexes)
+        
+        if doctor is None:
+            return None, "Doctor not found in database."
+        
+        # Extract personality traits and preferences for more detailed matching
+        personality_traits = row_text(doctor, 'Personality Traits', indexes.get("doctor_text"))
+        md_preferences = row_text(doctor, 'MD Preferences', indexes.get("doctor_text"))
+        states = doctor.get('States List', [])
+        if not states and 'Residing State  (Lives In)' in doctor:
+            states = [doctor['Residing State  (Lives In)']]
+            
+        # Get capacity information
+        capacity_status = doctor.get('Capacity Status', '')
+        np_capacity = doctor.get('NP Capacity', 0)
+        rn_capacity = doctor.get('RN Capacity', 0)
+        
+        # Create base prompt
+        prompt = f"""
+        You are an Operations Manager at Moxie tasked with matching medical directors with nurses.
+        
+        Doctor Information:
+        - Name: {doctor['First Name']} {doctor['Last Name']}
+        - Email: {doctor['Email']}
+        - State(s): {', '.join(str(s) for s in states if s)}
+        - Onboarded: {doctor.get('Create Date', 'Unknown')}
+        - Capacity Status: {capacity_status}
+        - NP Capacity: {np_capacity}
+        - RN Capacity: {rn_capacity}
+        """
+        
+        # Add personality traits if available
+        if personality_traits:
+            prompt += f"- Personality: {personality_traits}\n"
+        
+        # Add MD preferences if available
+        if md_preferences:
+            prompt += f"- Preferences: {md_preferences}\n"
+        
+        # Add historical match outcomes if available
+        match_history = format_match_history(doctor)
+        if match_history:
+            prompt += f"- Match History: {match_history}\n"
+            
+        # Add important state constraints
+        prompt += """
+        IMPORTANT STATE RESTRICTIONS:
+        - California: Medical directors in California can only supervise nurses in California.
+        - For other states, prioritize same-state matches but nearby states are acceptable if specified in filters.
+        """
+        
+        # Add capacity note
+        prompt += """
+        CAPACITY REQUIREMENTS:
+        - Check each nurse's license type (RN or NP) against the doctor's capacity
+        - Do NOT match with nurses whose license type exceeds the doctor's capacity
+        """
+        
+        # Add filter requirements to the prompt
+        if filters.get("experience"):
+            prompt += f"\n\nPreference for nurses with experience level: {filters['experience']}"
+            
+        if filters.get("location") == "Same State Only":
+            prompt += "\nLocation requirement: Only include nurses in the same state as the doctor."
+        elif filters.get("location") == "Nearby States Acceptable":
+            prompt += "\nLocation preference: Prioritize nurses in the same state, but nearby states are acceptable if not in California."
+        elif filters.get("location") == "Any Location":
+            prompt += "\nLocation preference: While prioritizing same-state matches, any location is acceptable EXCEPT for California doctors who must be matched with California nurses only."
+            
+        if filters.get("license_type") and filters.get("license_type") != "Any":
+            prompt += f"\n\nOnly looking for nurses with license type: {filters['license_type']}"
+            
+        if filters.get("requirements") and filters.get("requirements").strip():
+            prompt += f"\n\nAdditional requirements to consider:\n{filters['requirements']}"
+        
+        prompt += """
+        
+        Using the doctor information above, analyze the following nurse candidates and identify the top 3 best matches based on:
+        1. State licensing requirements (STRICT requirement for California)
+        2. Capacity availability for the nurse's license type (STRICT requirement)
+        3. Experience level compatibility (experienced doctors can mentor newer nurses)
+        4. Service offering alignment
+        5. Personality compatibility
+        6. Adherence to doctor's preferences
+        7. Any specific notes or requirements mentioned
+        
+        For each match, provide:
+        1. The nurse's name
+        2. Contact information
+        3. License type (important for capacity verification)
+        4. A detailed explanation of why they're a good match, making specific connections between:
+           - How this nurse's license type fits within the doctor's capacity
+           - How they meet state licensing requirements
+           - The doctor's personality traits and the nurse's background/experience
+           - How the doctor's preferences align with the nurse's profile
+           - Shared geographical advantages of their locations
+           - Why their experience levels complement each other
+        5. A match score out of 10
+        
+        Be specific and detailed in your reasoning, drawing direct connections between the doctor's profile and the nurse's background.
+        
+        Available Nurses:
+        """
+        
+        # Select eligible nurses (state, capacity, filters, MD preferences), closest and most relevant first
+        with trace_span("filter_candidates"):
+            selected_nurses, error = select_nurse_candidates(doctor, nurses_df, indexes, filters)
+        if error:
+            return None, error
+        
+        
+        # Add nurse information to the prompt
+        for _, nurse in selected_nurses.iterrows():
+            # Safe extraction of fields
+            nurse_name = str(nurse['Ticket Number Counter']) if pd.notna(nurse['Ticket Number Counter']) else "Unknown"
+            nurse_email = str(nurse['Bird Eats Bug Email']) if pd.notna(nurse['Bird Eats Bug Email']) else "No email"
+            nurse_license = str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else "Unknown"
+            nurse_experience = str(nurse['Experience Level  ']) if pd.notna(nurse['Experience Level  ']) else "Unknown"
+            nurse_state = str(nurse['State (MedSpa Premise)']) if pd.notna(nurse['State (MedSpa Premise)']) else "Unknown"
+            nurse_services = str(nurse['Services Provided']) if pd.notna(nurse['Services Provided']) else "None specified"
+            nurse_notes = row_text(nurse, 'Addt\'l Service Notes', indexes.get("nurse_text")) or "None"
+            licensed_states = nurse.get('Licensed States List', [])
+            licensed_line = f"- Licensed States: {', '.join(licensed_states)}\n" if len(licensed_states) > 1 else ""
+            
+            # Add to prompt
+            prompt += f"""
+            Nurse:
+            - Name: {nurse_name}
+            - Email: {nurse_email}
+            - License Type: {nurse_license}
+            - Experience: {nurse_experience}
+            - State: {nurse_state}
+            {licensed_line}- Services: {nurse_services}
+            - Notes: {nurse_notes}
+            
+            """
+        
+        # Add response format instructions
+        prompt += """
+        Format your response as JSON with the following structure:
+        {
+            "matches": [
+                {
+                    "name": "Nurse Name",
+                    "email": "nurse@email.com",
+                    "license_type": "RN or NP",
+                    "match_score": 8.5,
+                    "reasoning": "Detailed explanation of why this is a good match that specifically mentions capacity, state requirements, and compatibility factors"
+                },
+                ...
+            ]
+        }
+        
+        Only include the JSON in your response, nothing else.
+        """
+        
+        return prompt, None
+    
+    elif search_type == "nurse":
+        # Find the nurse
+        nurse = find_nurse(nurses_df, search_value, indexes)
+        
+        if nurse is None:
+            return None, "Nurse not found in database."
+        
+        # Safe extraction of fields
+        nurse_name = str(nurse['Ticket Number Counter']) if pd.notna(nurse['Ticket Number Counter']) else "Unknown"
+        nurse_email = str(nurse['Bird Eats Bug Email']) if pd.notna(nurse['Bird Eats Bug Email']) else "No email"
+        nurse_license = str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else "Unknown"
+        nurse_experience = str(nurse['Experience Level  ']) if pd.notna(nurse['Experience Level  ']) else "Unknown"
+        nurse_state = str(nurse['State (MedSpa Premise)']) if pd.notna(nurse['State (MedSpa Premise)']) else "Unknown"
+        nurse_services = str(nurse['Services Provided']) if pd.notna(nurse['Services Provided']) else "None specified"
+        nurse_notes = row_text(nurse, 'Addt\'l Service Notes', indexes.get("nurse_text")) or "None"
+        nurse_state_code = nurse.get('State Code') or normalize_state(nurse_state)
+        nurse_state_codes = nurse.get('Licensed States List') or ([nurse_state_code] if nurse_state_code else [])
+        is_ca_nurse = nurse_state_code == "CA"
+        
+        # Create base prompt
+        prompt = f"""
+        You are an Operations Manager at Moxie tasked with matching nurses with the right medical directors.
+        
+        Nurse Information:
+        - Name: {nurse_name}
+        - Email: {nurse_email}
+        - License Type: {nurse_license}
+        - Experience Level: {nurse_experience}
+        - State: {nurse_state}
+        - Services: {nurse_services}
+        - Additional Notes: {nurse_notes}
+        
+        IMPORTANT STATE RESTRICTIONS:
+        - California: Nurses from California can ONLY be matched with medical directors in California due to strict state licensing requirements.
+        - For other states, prioritize same-state matches but nearby states are acceptable if specified in filters.
+        """
+        
+        # Add capacity note
+        prompt += """
+        CAPACITY REQUIREMENTS:
+        - Medical directors have limits on how many nurses they can supervise
+        - Check each MD's capacity for the specific license type (RN or NP)
+        - Do NOT match the nurse with any MD who is at capacity for their license type
+        """
+        
+        # Add filter requirements to the prompt
+        if filters.get("md_age") and filters.get("md_age") != "Any":
+            prompt += f"\n\nPreference for medical directors who are: {filters['md_age']}"
+            
+        if filters.get("interaction_style") and filters.get("interaction_style") != "Any":
+            prompt += f"\n\nPreference for medical directors with interaction style: {filters['interaction_style']}"
+            
+        if filters.get("location") == "Same State Only":
+            prompt += "\nLocation requirement: Only include medical directors in the same state as the nurse."
+        elif filters.get("location") == "Nearby States Acceptable":
+            prompt += "\nLocation preference: Prioritize medical directors in the same state, but nearby states are acceptable if not in California."
+        elif filters.get("location") == "Any Location":
+            prompt += "\nLocation preference: While prioritizing same-state matches, any location is acceptable EXCEPT for California nurses who must be matched with California medical directors only."
+            
+        if filters.get("service_requirements") and filters.get("service_requirements").strip():
+            prompt += f"\n\nAdditional service requirements to consider:\n{filters['service_requirements']}"
+        
+        prompt += """
+        
+        Using the nurse information above, analyze the following medical directors and identify the top 3 best matches based on:
+        1. State licensing requirements (STRICT requirement for California)
+        2. Capacity availability for this nurse's license type (STRICT requirement)
+        3. Experience level compatibility (experienced doctors can mentor newer nurses)
+        4. Personality compatibility
+        5. Doctor's preferences and requirements
+        6. Historical match outcomes (acceptance and cancellation rates, time to sign)
+        7. Any specific notes or requirements mentioned
+        
+        For each match, provide:
+        1. The doctor's name
+        2. Contact information
+        3. Capacity status
+        4. A detailed explanation of why they're a good match, making specific connections between:
+           - How this specific doctor has capacity for this nurse's license type
+           - How they meet state licensing requirements 
+           - How the doctor's personality traits and working style benefit this nurse
+           - Specific geographic advantages of their locations
+           - How their experience levels complement each other
+        5. A match score out of 10
+        
+        Be specific and detailed in your reasoning, drawing direct connections between their profiles.
+        
+        Available Medical Directors:
+        """
+        
+        # Select eligible doctors (state, capacity, filters), closest and most relevant first
+        with trace_span("filter_candidates"):
+            selected_doctors, error = select_doctor_candidates(
+                doctors_df, indexes, nurse_license, nurse_state_codes, is_ca_nurse, filters
+            )
+        if error:
+            return None, error
+        
+        # Add doctor information to the prompt
+        for _, doctor in selected_doctors.iterrows():
+            prompt += format_doctor_for_prompt(doctor, nurse_license, indexes.get("doctor_text")) + "\n"
+        
+        # Add response format instructions
+        prompt += """
+        Format your response as JSON with the following structure:
+        {
+            "matches": [
+                {
+                    "name": "Dr. Name",
+                    "email": "doctor@email.com",
+                    "capacity_status": "Has capacity for X more of this license type",
+                    "match_score": 8.5, 
+                    "reasoning": "Detailed explanation of why this is a good match that specifically references capacity, state requirements, and personality fit"
+                },
+                ...
+            ]
+        }
+        
+        Only include the JSON in your response, nothing else.
+        """
+        
+        return prompt, None
+    
+    elif search_type == "manual":
+        # Extract a structured profile locally and shortlist real MDs from the roster indexes
+        profile = extract_manual_profile(search_value)
+        manual_license = profile["license_type"] or "Unknown"
+        is_ca_nurse = "CA" in profile["states"]
+        keyword_text = ' '.join(
+            part for part in [filters.get("matching_priorities") or '', ' '.join(profile["services"])] if part.strip()
+        )
+        with trace_span("filter_candidates"):
+            selected_doctors, error = select_doctor_candidates(
+                doctors_df, indexes, manual_license, profile["states"], is_ca_nurse,
+                {"location": "Any Location", "service_requirements": keyword_text}
+            )
+        if error:
+            return None, error
+        
+        # Manual entry form with additional filter context
+        prompt = f"""
+        You are an Operations Manager at Moxie tasked with matching nurses with medical directors.
+        
+        IMPORTANT STATE RESTRICTIONS:
+        - California: Nurses from California can ONLY be matched with medical directors in California due to strict state licensing requirements.
+        - For other states, prioritize same-state matches but nearby states are acceptable.
+        
+        CAPACITY REQUIREMENTS:
+        - Medical directors have limits on how many nurses they can supervise
+        - You must check each MD's capacity for the specific license type (RN or NP)
+        - Do NOT match a nurse with any MD who is at capacity for their license type
+        
+        A user has submitted the following information:
+        {search_value}
+        
+        Profile extracted from this information:
+        {format_manual_profile(profile)}
+        
+        """
+        
+        # Add filter requirements
+        if filters.get("person_type"):
+            prompt += f"This person is identified as a {filters.get('person_type')}.\n\n"
+            
+        if filters.get("matching_priorities") and filters.get("matching_priorities").strip():
+            prompt += f"Matching priorities to consider:\n{filters.get('matching_priorities')}\n\n"
+        
+        prompt += """
+        Based on this information, identify if this is a doctor or a nurse, and choose the best matches ONLY from the medical directors listed below. Do not suggest anyone who is not on this list.
+        
+        For each match, provide:
+        1. The name of the matched professional
+        2. Contact information if available
+        3. Capacity status (if matching with a doctor)
+        4. A detailed explanation of why they're a good match, specifically:
+           - How they meet state licensing requirements (especially for California)
+           - Available capacity for the nurse's license type (if applicable)
+           - How their personalities would complement each other
+           - How their experience levels align
+           - Any shared specialties or interests
+        5. A match score out of 10
+        
+        Be specific in your reasoning, with concrete examples of why these individuals would work well together.
+        
+        Available Medical Directors:
+        """
+        
+        for _, doctor in selected_doctors.iterrows():
+            prompt += format_doctor_for_prompt(doctor, manual_license, indexes.get("doctor_text")) + "\n"
+        
+        prompt += """
+        Format your response as JSON with the following structure:
+        {
+            "person_type": "doctor" or "nurse",
+            "matches": [
+                {
+                    "name": "Name",
+                    "email": "email@example.com",
+                    "capacity_status": "Has capacity for X more of this license type" (include only if matching with a doctor),
+                    "match_score": 8.5,
+                    "reasoning": "Detailed explanation of why this is a good match with specific references to state requirements, capacity, and compatibility factors"
+                },
+                ...
+            ]
+        }
+        
+        Only include the JSON in your response, nothing else.
+        """
+        
+        return prompt, None
+    
+    else:  # For backward compatibility or future expansion
+        return None, "Invalid search type specified."
+
+# Create a hash from the prompt for caching
+def get_prompt_hash(prompt):
+    return hashlib.md5(prompt.encode()).hexdigest()
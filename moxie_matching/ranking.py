@@ -0,0 +1,400 @@
+"""Deterministic, explainable ranking of eligible candidates."""
+
+import glob
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .candidates import candidate_distances, find_doctor, find_nurse, select_doctor_candidates, select_nurse_candidates
+from .capacity import LEDGER_LICENSE_TYPES
+from .data import build_roster_indexes
+from .extract import SERVICE_LEXICON, extract_manual_profile, extract_services
+from .states import normalize_state, parse_state_codes
+from .text_store import text_contains
+from .tracing import trace_span
+
+
+# Relative feature weights for the deterministic ranker
+DEFAULT_RANKING_WEIGHTS = {
+    "state": 3.0,
+    "capacity": 2.0,
+    "experience": 1.5,
+    "services": 1.5,
+    "traits": 1.0,
+    "keywords": 1.0,
+    "history": 1.0,
+}
+
+# Each search type has its own formulas (and features), so each gets its own weight set
+RANKING_SEARCH_TYPES = ("nurse", "md", "manual")
+
+# Learned weights published by `python -m moxie_matching train-weights`; the newest usable file wins
+RANKING_WEIGHTS_DIR = os.getenv("MOXIE_RANKING_WEIGHTS_DIR", "ranking_weights")
+RANKING_WEIGHTS_FILE_PATTERN = re.compile(r"^ranking_weights_v(\d+)\.json$")
+
+# Services are stored as bitmasks so overlap is a vectorized AND plus a popcount lookup
+SERVICE_BITS = {service: 1 << position for position, service in enumerate(SERVICE_LEXICON)}
+
+SERVICE_NAME_BITS = {service.lower(): bit for service, bit in SERVICE_BITS.items()}
+
+SERVICE_POPCOUNT = np.array([bin(mask).count("1") for mask in range(1 << len(SERVICE_BITS))])
+
+EXPERIENCE_RANKS = {"brand new": 0, "new graduate": 0, "experienced": 1, "advanced": 2}
+
+# Experience fit by nurse rank (brand new, experienced, advanced) for each kind of MD
+EXPERIENCE_FIT_REQUIRES_EXPERIENCE = np.array([0.0, 0.8, 1.0])
+
+EXPERIENCE_FIT_PREFERS_BEGINNERS = np.array([1.0, 0.8, 0.6])
+
+EXPERIENCE_FIT_NEUTRAL = np.array([0.6, 0.8, 1.0])
+
+REQUIRES_EXPERIENCE_PATTERN = r"experience|experienced provider|advanced services"
+
+PREFERS_BEGINNERS_PATTERN = r"beginner|new grad|newer provider|hands[- ]on|training|mentor|teach"
+
+POSITIVE_TRAITS_PATTERN = r"responsive|communicative|kind|collaborative|helpful|easy[- ]going|easy to get|eager|supportive|hands[- ]on"
+
+DISLIKED_SERVICES_PATTERN = re.compile(r"(?:doesn't|does not|don't|do not|not|no)\s+(?:like|want|do|offer)?\s*([a-z /-]+)", re.IGNORECASE)
+
+# Bitmask of the services in a "Botox; Filler" style list (unknown entries fall back to the lexicon)
+def services_mask(services_text):
+    if not isinstance(services_text, str):
+        return 0
+    mask = 0
+    for service in re.split(r'[;,]', services_text):
+        bit = SERVICE_NAME_BITS.get(service.strip().lower())
+        if bit is None:
+            for name in extract_services(service):
+                mask |= SERVICE_BITS[name]
+        else:
+            mask |= bit
+    return mask
+
+def services_mask_from_names(services):
+    mask = 0
+    for service in services:
+        mask |= SERVICE_BITS.get(service, 0)
+    return mask
+
+# Services an MD's preferences speak against ("He doesn't like IV hydration")
+def disliked_services_mask(preferences):
+    if not isinstance(preferences, str):
+        return 0
+    mask = 0
+    for match in DISLIKED_SERVICES_PATTERN.finditer(preferences):
+        mask |= services_mask_from_names(extract_services(match.group(1)))
+    return mask
+
+def experience_rank(level):
+    if not isinstance(level, str):
+        return 1
+    return EXPERIENCE_RANKS.get(level.strip().lower(), 1)
+
+# Precompute ranker features once at load time so ranking only does array arithmetic
+def add_ranking_features(doctors_df, nurses_df):
+    doctors_df = doctors_df.copy()
+    nurses_df = nurses_df.copy()
+
+    nurses_df['License Key'] = nurses_df['Provider License Type'].astype('string').str.upper().str.strip()
+    nurses_df['Experience Rank'] = nurses_df['Experience Level  '].apply(experience_rank).astype(int)
+    nurses_df['Services Mask'] = nurses_df['Services Provided'].apply(services_mask).astype(int)
+
+    preferences = doctors_df['MD Preferences'].fillna('').astype(str) if 'MD Preferences' in doctors_df.columns else pd.Series('', index=doctors_df.index)
+    traits = doctors_df['Personality Traits'].fillna('').astype(str) if 'Personality Traits' in doctors_df.columns else pd.Series('', index=doctors_df.index)
+    md_text = (traits + ' ' + preferences).str.lower()
+    doctors_df['Requires Experience'] = md_text.str.contains(REQUIRES_EXPERIENCE_PATTERN)
+    doctors_df['Prefers Beginners'] = md_text.str.contains(PREFERS_BEGINNERS_PATTERN)
+    doctors_df['Positive Trait Count'] = md_text.str.count(POSITIVE_TRAITS_PATTERN).astype(int)
+    doctors_df['Disliked Services Mask'] = preferences.apply(disliked_services_mask).astype(int)
+    doctors_df['Liked Services Mask'] = [
+        services_mask_from_names(extract_services(text)) & ~disliked
+        for text, disliked in zip(md_text, doctors_df['Disliked Services Mask'])
+    ]
+    doctors_df['Ranking Text'] = (doctors_df['First Name'].astype(str) + ' ' + doctors_df['Last Name'].astype(str) + ' ' + md_text).str.lower()
+    nurses_df['Ranking Text'] = (
+        nurses_df['Provider License Type'].fillna('').astype(str) + ' ' +
+        nurses_df['Experience Level  '].fillna('').astype(str) + ' ' +
+        nurses_df['Services Provided'].fillna('').astype(str) + ' ' +
+        nurses_df['Addt\'l Service Notes'].fillna('').astype(str)
+    ).str.lower()
+    return doctors_df, nurses_df
+
+# Share of keywords found in each candidate's combined (lowercased) text
+def keyword_feature(candidates_df, keywords, text_table=None):
+    hits = np.zeros(len(candidates_df))
+    for keyword in keywords:
+        hits += text_contains(candidates_df, 'Ranking Text', keyword, text_table)
+    return hits / len(keywords)
+
+# 1.0 in the same state, halving with each border crossing; 0 when unreachable
+def state_feature(candidates_df, state_index, source_codes):
+    if not source_codes:
+        return np.full(len(candidates_df), 0.5)
+    hops = candidate_distances(state_index, source_codes).reindex(candidates_df.index).fillna(np.inf).to_numpy()
+    return 1.0 / (1.0 + hops)
+
+# Published weight files as (version, path), newest first
+def ranking_weight_files(weights_dir=None):
+    files = []
+    for path in glob.glob(os.path.join(weights_dir or RANKING_WEIGHTS_DIR, "ranking_weights_v*.json")):
+        match = RANKING_WEIGHTS_FILE_PATTERN.match(os.path.basename(path))
+        if match:
+            files.append((int(match.group(1)), path))
+    return sorted(files, reverse=True)
+
+# One weight set with every feature; features a file leaves out keep their default weight
+def complete_ranking_weights(learned):
+    weights = {name: float(learned.get(name, default)) for name, default in DEFAULT_RANKING_WEIGHTS.items()}
+    if any(weight < 0 for weight in weights.values()) or sum(weights.values()) <= 0:
+        raise ValueError("unusable ranking weights")
+    return weights
+
+# The newest usable published weights as (version, {search type: weights}); (0, defaults) when none have been
+# published. Search types a file leaves out keep the default weights. Files from before weights were trained
+# per search type hold one set fitted on nurse-search features, so it applies to the nurse and manual searches
+def load_ranking_weights(weights_dir=None):
+    for version, path in ranking_weight_files(weights_dir):
+        try:
+            with open(path) as f:
+                learned = json.load(f)["weights"]
+            if not any(isinstance(value, dict) for value in learned.values()):
+                learned = {"nurse": learned, "manual": learned}
+            weights = {
+                search_type: complete_ranking_weights(learned.get(search_type, DEFAULT_RANKING_WEIGHTS))
+                for search_type in RANKING_SEARCH_TYPES
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            continue
+        return version, weights
+    return 0, {search_type: dict(DEFAULT_RANKING_WEIGHTS) for search_type in RANKING_SEARCH_TYPES}
+
+# Weights loaded once per process (the app, each precompute worker), so every search ranks with the same set
+_active_ranking_weights = None
+
+def active_ranking_weights():
+    global _active_ranking_weights
+    if _active_ranking_weights is None:
+        _active_ranking_weights = load_ranking_weights()
+    return _active_ranking_weights
+
+# License, states, experience rank and services of a roster nurse, as the MD ranker scores them
+def nurse_ranking_profile(nurse):
+    nurse_license = str(nurse['Provider License Type']) if pd.notna(nurse['Provider License Type']) else "Unknown"
+    nurse_state_code = nurse.get('State Code') or normalize_state(nurse.get('State (MedSpa Premise)'))
+    nurse_state_codes = nurse.get('Licensed States List') or ([nurse_state_code] if nurse_state_code else [])
+    return (
+        nurse_license, nurse_state_code, nurse_state_codes,
+        experience_rank(nurse.get('Experience Level  ')), services_mask(nurse.get('Services Provided')),
+    )
+
+# The same profile read from a manual search's free text
+def manual_ranking_profile(text):
+    profile = extract_manual_profile(text)
+    nurse_state_codes = profile["states"]
+    return (
+        profile["license_type"] or "Unknown", nurse_state_codes[0] if nurse_state_codes else None, nurse_state_codes,
+        experience_rank(profile["experience"]), services_mask_from_names(profile["services"]),
+    )
+
+# Feature matrix for nurse candidates of one doctor (MD search)
+def score_nurse_candidates(doctor, candidates_df, state_index, keywords, requested_services, text_table=None):
+    states = doctor.get('States List', []) or [doctor.get('Residing State  (Lives In)', '')]
+    licenses = candidates_df['License Key'].fillna('').to_numpy()
+
+    np_capacity = float(doctor.get('NP Capacity', 0) or 0)
+    rn_capacity = float(doctor.get('RN Capacity', 0) or 0)
+    capacity = np.where(licenses == "NP", np_capacity, np.where(licenses == "RN", rn_capacity, max(np_capacity, rn_capacity)))
+
+    ranks = candidates_df['Experience Rank'].to_numpy()
+    if doctor.get('Requires Experience', False):
+        experience = EXPERIENCE_FIT_REQUIRES_EXPERIENCE[ranks]
+    elif doctor.get('Prefers Beginners', False):
+        experience = EXPERIENCE_FIT_PREFERS_BEGINNERS[ranks]
+    else:
+        experience = EXPERIENCE_FIT_NEUTRAL[ranks]
+
+    masks = candidates_df['Services Mask'].to_numpy()
+    if requested_services:
+        services = SERVICE_POPCOUNT[masks & requested_services] / SERVICE_POPCOUNT[requested_services]
+    else:
+        services = np.minimum(SERVICE_POPCOUNT[masks], 6) / 6.0
+    disliked = int(doctor.get('Disliked Services Mask', 0) or 0)
+    if disliked:
+        services = np.where(masks & disliked, services * 0.5, services)
+
+    features = {
+        "state": state_feature(candidates_df, state_index, parse_state_codes(states)),
+        "capacity": np.minimum(capacity, 3.0) / 3.0,
+        "experience": experience,
+        "services": services,
+    }
+    if keywords:
+        features["keywords"] = keyword_feature(candidates_df, keywords, text_table)
+    return features
+
+# Feature matrix for doctor candidates of one nurse profile (nurse and manual search)
+def score_doctor_candidates(nurse_license, nurse_state_codes, nurse_rank, nurse_services, candidates_df, state_index, keywords,
+                            text_table=None):
+    license_key = str(nurse_license).upper()
+    if license_key in LEDGER_LICENSE_TYPES:
+        capacity = candidates_df[f'{license_key} Capacity'].to_numpy(dtype=float)
+    else:
+        capacity = np.maximum(candidates_df['NP Capacity'].to_numpy(dtype=float), candidates_df['RN Capacity'].to_numpy(dtype=float))
+
+    requires_experience = candidates_df['Requires Experience'].to_numpy(dtype=bool)
+    prefers_beginners = candidates_df['Prefers Beginners'].to_numpy(dtype=bool)
+    experience = np.where(
+        requires_experience, EXPERIENCE_FIT_REQUIRES_EXPERIENCE[nurse_rank],
+        np.where(prefers_beginners, EXPERIENCE_FIT_PREFERS_BEGINNERS[nurse_rank], EXPERIENCE_FIT_NEUTRAL[nurse_rank])
+    )
+
+    # MDs whose notes mention the nurse's services score higher; services they speak against score lower
+    nurse_count = max(SERVICE_POPCOUNT[nurse_services], 1)
+    liked = candidates_df['Liked Services Mask'].to_numpy(dtype=int)
+    disliked = candidates_df['Disliked Services Mask'].to_numpy(dtype=int)
+    services = 0.5 + 0.5 * SERVICE_POPCOUNT[liked & nurse_services] / nurse_count - 0.5 * SERVICE_POPCOUNT[disliked & nurse_services] / nurse_count
+
+    features = {
+        "state": state_feature(candidates_df, state_index, nurse_state_codes),
+        "capacity": np.minimum(capacity, 3.0) / 3.0,
+        "experience": experience,
+        "services": np.clip(services, 0.0, 1.0),
+        "traits": np.minimum(candidates_df['Positive Trait Count'].to_numpy(dtype=float), 3.0) / 3.0,
+    }
+    if keywords:
+        features["keywords"] = keyword_feature(candidates_df, keywords, text_table)
+    if 'Acceptance Rate' in candidates_df.columns:
+        features["history"] = candidates_df['Acceptance Rate'].fillna(0).to_numpy(dtype=float)
+    return features
+
+# Features of one rated (MD, nurse) pair as a `search_type` search scores them, with no requirement keywords.
+# `nurse` is a roster nurse row, or the search text for a manual search
+def pair_features(search_type, doctor, nurse, doctors_df, nurses_df, indexes):
+    if search_type == "md":
+        features = score_nurse_candidates(doctor, nurses_df.loc[[nurse.name]], indexes["nurses_by_state"], [], 0)
+    else:
+        profile = manual_ranking_profile(nurse) if search_type == "manual" else nurse_ranking_profile(nurse)
+        nurse_license, _, nurse_state_codes, nurse_rank, nurse_services = profile
+        features = score_doctor_candidates(
+            nurse_license, nurse_state_codes, nurse_rank, nurse_services,
+            doctors_df.loc[[doctor.name]], indexes["doctors_by_state"], []
+        )
+    return {name: float(values[0]) for name, values in features.items()}
+
+# Short human-readable explanation of a ranked match from its score breakdown
+def explain_ranking(breakdown):
+    labels = {
+        "state": "location", "capacity": "capacity", "experience": "experience fit", "services": "service alignment",
+        "traits": "MD working style", "keywords": "requirement keywords", "history": "past match outcomes",
+    }
+    strengths = [labels[name] for name, value in sorted(breakdown.items(), key=lambda item: -item[1]) if value >= 0.7]
+    weaknesses = [labels[name] for name, value in breakdown.items() if value < 0.4]
+    reasoning = "Strong on " + ", ".join(strengths) + "." if strengths else "No standout strengths."
+    if weaknesses:
+        reasoning += " Weaker on " + ", ".join(weaknesses) + "."
+    return reasoning
+
+# Deterministic, explainable ranking of eligible counterparts without calling the model
+def rank_candidates(search_type, search_value, doctors_df, nurses_df, filters=None, k=3, indexes=None, weights=None):
+    if filters is None:
+        filters = {}
+    if indexes is None:
+        indexes = build_roster_indexes(doctors_df, nurses_df)
+    if weights is None:
+        weights = active_ranking_weights()[1].get(search_type, DEFAULT_RANKING_WEIGHTS)
+
+    # Keyword text is scored as a feature instead of being used to reorder the candidates
+    keyword_filter = {"md": "requirements", "nurse": "service_requirements", "manual": "matching_priorities"}.get(search_type)
+    keyword_text = (filters.get(keyword_filter) or '') if keyword_filter else ''
+    keywords = keyword_text.lower().split()
+    eligibility_filters = {key: value for key, value in filters.items() if key != keyword_filter}
+
+    if search_type == "md":
+        doctor = find_doctor(doctors_df, search_value, indexes)
+        if doctor is None:
+            return [], "Doctor not found in database."
+        with trace_span("filter_candidates") as span:
+            candidates, error = select_nurse_candidates(doctor, nurses_df, indexes, eligibility_filters, limit=None)
+            if span is not None:
+                span["candidates"] = len(candidates) if candidates is not None else 0
+        if error:
+            return [], error
+        with trace_span("score_candidates"):
+            features = score_nurse_candidates(
+                doctor, candidates, indexes["nurses_by_state"], keywords,
+                services_mask_from_names(extract_services(keyword_text)), indexes.get("nurse_text")
+            )
+    elif search_type in ("nurse", "manual"):
+        if search_type == "nurse":
+            nurse = find_nurse(nurses_df, search_value, indexes)
+            if nurse is None:
+                return [], "Nurse not found in database."
+            nurse_license, nurse_state_code, nurse_state_codes, nurse_rank, nurse_services = nurse_ranking_profile(nurse)
+        else:
+            nurse_license, nurse_state_code, nurse_state_codes, nurse_rank, nurse_services = manual_ranking_profile(search_value)
+            eligibility_filters = {"location": "Any Location"}
+        with trace_span("filter_candidates") as span:
+            candidates, error = select_doctor_candidates(
+                doctors_df, indexes, nurse_license, nurse_state_codes,
+                "CA" in ([nurse_state_code] if search_type == "nurse" else nurse_state_codes),
+                eligibility_filters, limit=None
+            )
+            if span is not None:
+                span["candidates"] = len(candidates) if candidates is not None else 0
+        if error:
+            return [], error
+        with trace_span("score_candidates"):
+            features = score_doctor_candidates(
+                nurse_license, nurse_state_codes, nurse_rank, nurse_services,
+                candidates, indexes["doctors_by_state"], keywords, indexes.get("doctor_text")
+            )
+    else:
+        return [], "Invalid search type specified."
+
+    names = list(features)
+    matrix = np.column_stack([features[name] for name in names])
+    feature_weights = np.array([weights.get(name, 0.0) for name in names], dtype=float)
+    scores = matrix @ feature_weights / max(feature_weights.sum(), 1e-9) * 10.0
+
+    # Stable sort keeps the eligibility order (closest states first) between equal scores;
+    # a nurse with several tickets appears once, under their best-scoring ticket
+    emails = candidates['Bird Eats Bug Email' if search_type == "md" else 'Email']
+    top_positions = []
+    seen_emails = set()
+    for position in np.argsort(-scores, kind='stable'):
+        email = str(emails.iat[position]).strip().lower()
+        if email in seen_emails:
+            continue
+        seen_emails.add(email)
+        top_positions.append(position)
+        if len(top_positions) >= k:
+            break
+
+    matches = []
+    for position in top_positions:
+        candidate = candidates.iloc[position]
+        breakdown = {name: round(float(matrix[position, column]), 2) for column, name in enumerate(names)}
+        if search_type == "md":
+            ticket = candidate.get('Ticket Number Counter')
+            match = {
+                "name": str(ticket) if pd.notna(ticket) else str(candidate['Bird Eats Bug Email']),
+                "email": str(candidate['Bird Eats Bug Email']),
+                "license_type": str(candidate['Provider License Type']),
+            }
+        else:
+            match = {
+                "name": f"{candidate['First Name']} {candidate['Last Name']}",
+                "email": str(candidate['Email']),
+                "capacity_status": str(candidate.get('Capacity Status', '')),
+            }
+        match.update({
+            "match_score": round(float(scores[position]), 1),
+            "reasoning": explain_ranking(breakdown),
+            "score_breakdown": breakdown,
+        })
+        matches.append(match)
+
+    return matches, None
@@ -0,0 +1,163 @@
+"""HTML rendering for match cards from precompiled templates, batched into one payload."""
+
+from html import escape
+
+from .states import normalize_state
+
+
+# Templates are single-line so a batch of cards stays one HTML block for the markdown renderer
+MATCH_CARD_TEMPLATE = (
+    '<div class="match-card">'
+    '<div style="display: flex; justify-content: space-between; align-items: center;">'
+    '<h4>{name}</h4><div class="compatibility-score {score_class}">{score}</div>'
+    '</div>'
+    '<p><strong>Contact:</strong> {email}</p>'
+    '{detail}'
+    '{profile}'
+    '<div class="match-reason"><p><strong>Why this match works:</strong> {reasoning}</p>{breakdown}</div>'
+    '</div>'
+).format
+DETAIL_TEMPLATE = '<p><strong>{label}:</strong> {value}</p>'.format
+PROFILE_TEMPLATE = (
+    '<div class="nurse-info">'
+    '<div class="nurse-detail"><h4>Location</h4>{states}</div>'
+    '<div class="nurse-detail"><h4>Personality Traits</h4>{traits}</div>'
+    '</div>'
+).format
+TAG_TEMPLATE = '<span class="{css_class}">{text}</span> '.format
+
+def score_class(score):
+    return "high-score" if score >= 8.0 else "medium-score" if score >= 6.0 else "low-score"
+
+# State tags, flagging California because of its licensing restriction
+def render_state_tags(states):
+    tags = []
+    for state in states:
+        if not isinstance(state, str) or not state.strip():
+            continue
+        css_class = "trait-tag state-tag warning-tag" if normalize_state(state) == "CA" else "trait-tag state-tag"
+        tags.append(TAG_TEMPLATE(css_class=css_class, text=escape(state)))
+    return "".join(tags)
+
+def render_trait_tags(traits):
+    return "".join(TAG_TEMPLATE(css_class="trait-tag", text=escape(trait.strip())) for trait in traits if trait.strip())
+
+# One match card; profile is an optional {"states": [...], "traits": [...]} for the matched MD
+def render_match_card(match, profile=None):
+    try:
+        score = float(match.get('match_score', 0))
+    except (TypeError, ValueError):
+        score = 0.0
+
+    if match.get('license_type'):
+        detail = DETAIL_TEMPLATE(label="License", value=escape(str(match['license_type'])))
+    elif match.get('capacity_status'):
+        detail = DETAIL_TEMPLATE(label="Capacity", value=escape(str(match['capacity_status'])))
+    else:
+        detail = ""
+
+    profile_html = ""
+    if profile is not None:
+        profile_html = PROFILE_TEMPLATE(
+            states=render_state_tags(profile.get("states", [])) or "Location not specified",
+            traits=render_trait_tags(profile.get("traits", [])) or "No traits specified",
+        )
+
+    breakdown = match.get('score_breakdown')
+    breakdown_html = ""
+    if breakdown:
+        breakdown_html = "<p>" + "".join(
+            TAG_TEMPLATE(css_class="trait-tag", text=f"{escape(str(feature))}: {value:.2f}")
+            for feature, value in breakdown.items()
+        ) + "</p>"
+
+    return MATCH_CARD_TEMPLATE(
+        name=escape(str(match.get('name', ''))),
+        score_class=score_class(score),
+        score=escape(str(match.get('match_score', ''))),
+        email=escape(str(match.get('email', ''))),
+        detail=detail,
+        profile=profile_html,
+        reasoning=escape(str(match.get('reasoning', ''))),
+        breakdown=breakdown_html,
+    )
+
+# All cards (and an optional heading) as a single HTML payload
+def render_match_cards(matches, profiles=None, title=None):
+    if profiles is None:
+        profiles = [None] * len(matches)
+    parts = [f"<h3>{escape(title)}</h3>"] if title else []
+    parts.extend(render_match_card(match, profile) for match, profile in zip(matches, profiles))
+    return "".join(parts)
+
+FEEDBACK_CARD_TEMPLATE = (
+    '<div class="feedback-card {card_class}">'
+    '<div class="feedback-header"><h4>{md_name} + {nurse_name}</h4>'
+    '<span class="rating-badge {rating_class}">{rating}/10</span></div>'
+    '<p class="timestamp">{timestamp}</p>'
+    '<div class="match-details">'
+    '<p><strong>Algorithm Score:</strong> {score}</p>'
+    '<p><strong>Match Reasoning:</strong> {reasoning}</p>'
+    '</div>'
+    '<p><strong>User Comments:</strong> {comments}</p>'
+    '</div>'
+).format
+
+def feedback_classes(rating):
+    if rating >= 8:
+        return "positive-feedback", "rating-high"
+    if rating >= 5:
+        return "neutral-feedback", "rating-medium"
+    return "negative-feedback", "rating-low"
+
+# A page of feedback log entries as a single HTML payload
+def render_feedback_cards(entries):
+    parts = []
+    for entry in entries:
+        card_class, rating_class = feedback_classes(entry['user_rating'])
+        parts.append(FEEDBACK_CARD_TEMPLATE(
+            card_class=card_class,
+            md_name=escape(str(entry['md_name'])),
+            nurse_name=escape(str(entry['nurse_name'])),
+            rating_class=rating_class,
+            rating=entry['user_rating'],
+            timestamp=escape(str(entry['timestamp'])),
+            score=f"{entry['match_score']}/10" if entry['match_score'] is not None else "Not recorded",
+            reasoning=escape(str(entry['match_reasoning'] or '')),
+            comments=escape(entry['comments']) if entry['comments'] else "No comments provided.",
+        ))
+    return "".join(parts)
+
+TRACE_ROW_TEMPLATE = (
+    '<div class="trace-row" title="{title}">'
+    '<div class="trace-label">{indent}{name} <strong>{duration:.1f} ms</strong></div>'
+    '<div class="trace-track"><div class="trace-bar {bar_class}" style="left: {left:.2f}%; width: {width:.2f}%;"></div></div>'
+    '</div>'
+).format
+
+# Waterfall of one finished trace (as written to the trace log): a row per span, its bar placed on the request's
+# timeline. Spans of background jobs the request waited on are coloured apart; failed spans are red
+def render_trace_waterfall(trace):
+    spans = trace["spans"]
+    if not spans:
+        return ""
+    begin = min(0.0, min(span["start_ms"] for span in spans))
+    end = max(trace["duration_ms"], max(span["start_ms"] + span["duration_ms"] for span in spans))
+    total = max(end - begin, 1e-6)
+    rows = []
+    for span in spans:
+        if span["error"]:
+            bar_class = "error-span"
+        else:
+            bar_class = "job-span" if span["trace_id"] != trace["trace_id"] else ""
+        details = ", ".join(f"{key}={value}" for key, value in span["attrs"].items() if value is not None)
+        rows.append(TRACE_ROW_TEMPLATE(
+            title=escape(f"{span['thread']} · starts at {span['start_ms']:.1f} ms" + (f" · {details}" if details else "")),
+            indent="&nbsp;&nbsp;" * span["depth"],
+            name=escape(span["name"]) + (f" ({escape(span['error'])})" if span["error"] else ""),
+            duration=span["duration_ms"],
+            bar_class=bar_class,
+            left=(span["start_ms"] - begin) / total * 100,
+            width=span["duration_ms"] / total * 100,
+        ))
+    return "".join(rows)
@@ -0,0 +1,240 @@
+"""Roster loading from the CSV exports."""
+
+import os
+import re
+
+import pandas as pd
+
+from .data import add_trait_filter_flags, build_roster_indexes, create_capacity_status, extract_capacity_info
+from .history import add_match_history_features
+from .ranking import add_ranking_features
+from .states import normalize_state, parse_state_codes
+from .text_store import DOCTOR_TEXT_FIELDS, NURSE_TEXT_FIELDS, split_text_fields
+
+
+# Load and prepare the MD and nurse rosters from the CSV exports in data_dir; notify(level, message) reports problems
+def load_roster(data_dir=".", notify=None):
+    # Load medical directors from CSV if available
+    try:
+        doctors_df = pd.read_csv(os.path.join(data_dir, 'Medical_List.csv'))
+        # Filter for medical directors
+        doctors_df = doctors_df[doctors_df['Lifecycle Stage'] == 'Medical Director Onboarded']
+    except FileNotFoundError:
+        # Create a sample doctor dataframe if CSV is not available
+        doctor_data = [
+            {"First Name": "John", "Last Name": "Smith", "Email": "john.smith@example.com", 
+             "Residing State  (Lives In)": "CA", "Create Date": "2023-01-15", "Lifecycle Stage": "Medical Director Onboarded",
+             "Capacity Status": "Has capacity for 3 more NPs, 2 more RNs"},
+            {"First Name": "Emily", "Last Name": "Johnson", "Email": "emily.j@example.com", 
+             "Residing State  (Lives In)": "TX", "Create Date": "2023-02-20", "Lifecycle Stage": "Medical Director Onboarded",
+             "Capacity Status": "At capacity for NPs, has capacity for 2 more RNs"},
+            {"First Name": "Michael", "Last Name": "Brown", "Email": "m.brown@example.com", 
+             "Residing State  (Lives In)": "FL", "Create Date": "2023-03-10", "Lifecycle Stage": "Medical Director Onboarded",
+             "Capacity Status": "Has capacity for 1 more NP, at capacity for RNs"},
+            {"First Name": "Sarah", "Last Name": "Garcia", "Email": "s.garcia@example.com", 
+             "Residing State  (Lives In)": "CA", "Create Date": "2023-04-05", "Lifecycle Stage": "Medical Director Onboarded",
+             "Capacity Status": "At capacity for both NPs and RNs"},
+            {"First Name": "David", "Last Name": "Martinez", "Email": "d.martinez@example.com", 
+             "Residing State  (Lives In)": "NY", "Create Date": "2023-05-12", "Lifecycle Stage": "Medical Director Onboarded",
+             "Capacity Status": "Has capacity for 2 more NPs, 3 more RNs"}
+        ]
+        doctors_df = pd.DataFrame(doctor_data)
+    
+    # Try to load the MD metadata
+    try:
+        md_metadata_df = pd.read_csv(os.path.join(data_dir, 'md_metadata.csv'))
+    except FileNotFoundError:
+        # If not found, create an empty dataframe with appropriate columns
+        md_metadata_df = pd.DataFrame(columns=['First Name', 'Last Name', 'Email', 'Residing State  (Lives In)', 
+                                              'MD Preferences', 'Personality Traits'])
+    
+    # Add capacity information if it doesn't exist
+    if 'Capacity Status' not in md_metadata_df.columns:
+        md_metadata_df['Capacity Status'] = "Has capacity for 2 more NPs, Has capacity for 3 more RNs"
+    
+    # Extract capacity information
+    md_metadata_df['NP Capacity'] = md_metadata_df['Capacity Status'].apply(
+        lambda x: extract_capacity_info(x, 'NP') if isinstance(x, str) else 0
+    )
+    
+    md_metadata_df['RN Capacity'] = md_metadata_df['Capacity Status'].apply(
+        lambda x: extract_capacity_info(x, 'RN') if isinstance(x, str) else 0
+    )
+    
+    # Process MD metadata
+    # Handle First Name field - remove "Dr. " prefix if present
+    md_metadata_df['First Name'] = md_metadata_df['First Name'].apply(
+        lambda x: x.replace('Dr. ', '') if isinstance(x, str) and x.startswith('Dr. ') else x
+    )
+    
+    # Process multiple states - convert to individual boolean checks to avoid ambiguity
+    md_metadata_df['Multiple States'] = md_metadata_df['Residing State  (Lives In)'].apply(
+        lambda x: (isinstance(x, str) and (';' in x or ',' in x))
+    )
+    
+    md_metadata_df['States List'] = md_metadata_df['Residing State  (Lives In)'].apply(
+        lambda x: [s.strip() for s in re.split(r'[;,]', str(x))] if isinstance(x, str) else []
+    )
+    
+    # Flag for preferences - convert to individual boolean checks
+    md_metadata_df['Has Preferences'] = md_metadata_df['MD Preferences'].apply(
+        lambda x: (isinstance(x, str) and len(x.strip()) > 0)
+    )
+    
+    # Split personality traits into a list for easier processing
+    md_metadata_df['Traits List'] = md_metadata_df['Personality Traits'].apply(
+        lambda x: [trait.strip() for trait in str(x).split(',')] if isinstance(x, str) else []
+    )
+    
+    # Identify if the row is actually a nurse practitioner - use individual boolean checks
+    md_metadata_df['Is NP'] = md_metadata_df['Last Name'].apply(
+        lambda x: (isinstance(x, str) and 'NP' in x.upper())
+    )
+    
+    # Create a dataframe for just the NPs
+    nurse_providers_df = md_metadata_df[md_metadata_df['Is NP'] == True].copy()
+    
+    # Remove NPs from the MD dataframe
+    md_metadata_df = md_metadata_df[md_metadata_df['Is NP'] == False].copy()
+    
+    # Create nurses dataframe directly from the provided data or from hubspot CSV
+    hubspot_df = None
+    try:
+        nurses_df = pd.read_csv(os.path.join(data_dir, 'hubspot_moxie.csv'))
+        # Keep the full export for mining historical match outcomes
+        hubspot_df = nurses_df
+        # Filter to only relevant columns
+        relevant_cols = [
+            'Ticket Number Counter', 'Bird Eats Bug Email', 'Provider License Type',
+            'Experience Level  ', 'State (MedSpa Premise)', 'Services Provided',
+            'Addt\'l Service Notes', 'Licensed States'
+        ]
+        # Use columns that are actually in the dataframe
+        available_cols = [col for col in relevant_cols if col in nurses_df.columns]
+        nurses_df = nurses_df[available_cols].dropna(subset=['Bird Eats Bug Email'])
+    except FileNotFoundError:
+        # Create a minimal empty dataframe with required columns
+        if notify:
+            notify("error", "No nurse data file found. Please upload the hubspot_moxie.csv file.")
+        nurses_df = pd.DataFrame(columns=[
+            'Ticket Number Counter', 'Bird Eats Bug Email', 'Provider License Type',
+            'Experience Level  ', 'State (MedSpa Premise)', 'Services Provided',
+            'Addt\'l Service Notes', 'Licensed States'
+        ])
+    
+    # Normalize nurse states to postal codes; a nurse is eligible in the premise state plus any licensed states
+    nurses_df['State Code'] = nurses_df['State (MedSpa Premise)'].apply(normalize_state)
+    licensed_states = nurses_df['Licensed States'] if 'Licensed States' in nurses_df.columns else pd.Series(None, index=nurses_df.index)
+    nurses_df['Licensed States List'] = [
+        ([premise] if premise else []) + [code for code in parse_state_codes(licensed) if code != premise]
+        for premise, licensed in zip(nurses_df['State Code'], licensed_states)
+    ]
+    
+    # Merge MD metadata with main doctors dataframe if possible
+    if len(doctors_df) > 0 and len(md_metadata_df) > 0:
+        # Try to match by email first (most reliable)
+        merged_df = pd.merge(
+            doctors_df, 
+            md_metadata_df[['Email', 'MD Preferences', 'Personality Traits', 'Multiple States', 
+                           'States List', 'Has Preferences', 'Traits List', 'NP Capacity', 'RN Capacity']], 
+            on='Email', 
+            how='left'
+        )
+        
+        # For any unmatched rows, try matching by name
+        unmatched = merged_df[merged_df['MD Preferences'].isna()]
+        if not unmatched.empty:
+            # Create a name field for matching
+            doctors_df['Full Name'] = doctors_df['First Name'] + ' ' + doctors_df['Last Name']
+            md_metadata_df['Full Name'] = md_metadata_df['First Name'] + ' ' + md_metadata_df['Last Name']
+            
+            # Try matching again
+            for idx, row in unmatched.iterrows():
+                full_name = f"{row['First Name']} {row['Last Name']}"
+                matches = md_metadata_df[md_metadata_df['Full Name'].str.contains(full_name, case=False, na=False)]
+                
+                if not matches.empty:
+                    metadata = matches.iloc[0]
+                    merged_df.at[idx, 'MD Preferences'] = metadata['MD Preferences']
+                    merged_df.at[idx, 'Personality Traits'] = metadata['Personality Traits']
+                    merged_df.at[idx, 'Multiple States'] = metadata['Multiple States']
+                    merged_df.at[idx, 'States List'] = metadata['States List']
+                    merged_df.at[idx, 'Has Preferences'] = metadata['Has Preferences']
+                    merged_df.at[idx, 'Traits List'] = metadata['Traits List']
+                    merged_df.at[idx, 'NP Capacity'] = metadata['NP Capacity']
+                    merged_df.at[idx, 'RN Capacity'] = metadata['RN Capacity']
+        
+        doctors_df = merged_df
+        
+        # Fill in missing values
+        doctors_df['MD Preferences'] = doctors_df['MD Preferences'].fillna('')
+        doctors_df['Personality Traits'] = doctors_df['Personality Traits'].fillna('')
+        doctors_df['Multiple States'] = doctors_df['Multiple States'].fillna(False)
+        doctors_df['Has Preferences'] = doctors_df['Has Preferences'].fillna(False)
+        doctors_df['NP Capacity'] = doctors_df['NP Capacity'].fillna(0)
+        doctors_df['RN Capacity'] = doctors_df['RN Capacity'].fillna(0)
+        
+        # Ensure States List is properly filled - handling Series safely
+        doctors_df['States List'] = doctors_df.apply(
+            lambda row: row['States List'] if isinstance(row['States List'], list) else 
+                        [row['Residing State  (Lives In)']] if pd.notna(row['Residing State  (Lives In)']) else [],
+            axis=1
+        )
+        
+        # Ensure Traits List is properly filled - handling Series safely
+        doctors_df['Traits List'] = doctors_df.apply(
+            lambda row: row['Traits List'] if isinstance(row['Traits List'], list) else 
+                        [trait.strip() for trait in str(row['Personality Traits']).split(',')] 
+                        if pd.notna(row['Personality Traits']) else [],
+            axis=1
+        )
+        
+        # Always create Capacity Status from the NP and RN capacity for consistency
+        doctors_df['Capacity Status'] = doctors_df.apply(
+            lambda row: create_capacity_status(row['NP Capacity'], row['RN Capacity']),
+            axis=1
+        )
+        
+    # If we still don't have metadata for doctors, use the metadata dataframe directly
+    elif len(doctors_df) == 0 and len(md_metadata_df) > 0:
+        doctors_df = md_metadata_df.copy()
+        
+        # Add missing columns expected by the application
+        if 'Create Date' not in doctors_df.columns:
+            doctors_df['Create Date'] = '2023-01-01'  # Default date
+        if 'Lifecycle Stage' not in doctors_df.columns:
+            doctors_df['Lifecycle Stage'] = 'Medical Director Onboarded'
+        if 'NP Capacity' not in doctors_df.columns:
+            doctors_df['NP Capacity'] = 2  # Default capacity
+        if 'RN Capacity' not in doctors_df.columns:
+            doctors_df['RN Capacity'] = 3  # Default capacity
+        if 'Capacity Status' not in doctors_df.columns:
+            doctors_df['Capacity Status'] = doctors_df.apply(
+                lambda row: create_capacity_status(row['NP Capacity'], row['RN Capacity']),
+                axis=1
+            )
+    
+    # Normalize doctor states to postal codes
+    if 'States List' not in doctors_df.columns:
+        doctors_df['States List'] = doctors_df['Residing State  (Lives In)'].apply(
+            lambda x: [s.strip() for s in re.split(r'[;,]', str(x))] if isinstance(x, str) else []
+        )
+    doctors_df['State Codes'] = doctors_df['States List'].apply(parse_state_codes)
+    
+    # Add historical match-outcome features mined from the HubSpot MD option columns
+    doctors_df = add_match_history_features(doctors_df, hubspot_df)
+    
+    # Precompute compact numeric features used by the deterministic ranker
+    doctors_df, nurses_df = add_ranking_features(doctors_df, nurses_df)
+    doctors_df = add_trait_filter_flags(doctors_df)
+    
+    # Long free text goes to side stores fetched by row label, so filtering never copies it
+    doctors_df, doctor_text = split_text_fields(doctors_df, DOCTOR_TEXT_FIELDS)
+    nurses_df, nurse_text = split_text_fields(nurses_df, NURSE_TEXT_FIELDS)
+    
+    indexes = build_roster_indexes(doctors_df, nurses_df)
+    indexes["doctor_text"] = doctor_text
+    indexes["nurse_text"] = nurse_text
+    
+    return doctors_df, nurses_df, indexes
+    
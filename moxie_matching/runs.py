@@ -0,0 +1,84 @@
+"""Match run log: every result shown to ops with its provenance, so a rating joins to the exact run it rates."""
+
+import datetime
+import json
+import uuid
+
+from .feedback import INSERT_FEEDBACK_SQL, connect_feedback_store, feedback_row
+
+
+MATCH_RUN_COLUMNS = (
+    "run_id", "created_at", "search_type", "search_value", "filters", "source", "prompt_hash", "model",
+    "latency_ms", "input_tokens", "output_tokens", "matches",
+)
+
+# Record one displayed result; returns its run id. `usage` is what query_claude reports for AI results
+def record_match_run(search_type, search_value, filters, source, matches, prompt_hash=None, usage=None,
+                     latency_ms=None, db_path=None):
+    usage = usage or {}
+    run_id = uuid.uuid4().hex
+    conn = connect_feedback_store(db_path)
+    try:
+        conn.execute(
+            f"INSERT INTO match_runs ({', '.join(MATCH_RUN_COLUMNS)}) VALUES ({', '.join('?' * len(MATCH_RUN_COLUMNS))})",
+            (
+                run_id,
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                search_type,
+                str(search_value),
+                json.dumps(filters or {}, sort_keys=True, default=str),
+                source,
+                prompt_hash,
+                usage.get("model"),
+                usage.get("latency_ms", latency_ms),
+                usage.get("input_tokens"),
+                usage.get("output_tokens"),
+                json.dumps(matches, default=str),
+            )
+        )
+    finally:
+        conn.close()
+    return run_id
+
+def get_match_run(run_id, db_path=None):
+    conn = connect_feedback_store(db_path)
+    try:
+        row = conn.execute(f"SELECT {', '.join(MATCH_RUN_COLUMNS)} FROM match_runs WHERE run_id = ?", (run_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    run = dict(zip(MATCH_RUN_COLUMNS, row))
+    run["filters"] = json.loads(run["filters"] or "{}")
+    run["matches"] = json.loads(run["matches"])
+    return run
+
+# MD and nurse a rated match is logged under: the searched person and the matched counterpart, by the
+# identifiers the app selects them by (MD full name, nurse email)
+def run_pair_names(run, match):
+    if run["search_type"] == "md":
+        return run["search_value"], str(match.get('email') or match.get('name') or '')
+    return str(match.get('name') or ''), run["search_value"] if run["search_type"] == "nurse" else "Manual entry"
+
+# Feedback on match `match_rank` (0-based) of a recorded run; returns (feedback id, None) or (None, error).
+# The reasoning is not copied: the history view reads it from the run
+def add_run_feedback(run_id, match_rank, user_rating, comments, db_path=None):
+    run = get_match_run(run_id, db_path)
+    if run is None:
+        return None, "This match run is no longer on record."
+    if not 0 <= match_rank < len(run["matches"]):
+        return None, "This match is not part of the run."
+    match = run["matches"][match_rank]
+    md_name, nurse_name = run_pair_names(run, match)
+    try:
+        match_score = float(match.get('match_score') or 0)
+    except (TypeError, ValueError):
+        match_score = 0.0
+    conn = connect_feedback_store(db_path)
+    try:
+        cursor = conn.execute(INSERT_FEEDBACK_SQL, feedback_row(
+            md_name, nurse_name, match_score, user_rating, comments, "", run_id=run_id, match_rank=match_rank
+        ))
+        return cursor.lastrowid, None
+    finally:
+        conn.close()
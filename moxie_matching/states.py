@@ -0,0 +1,139 @@
+"""US state normalization, border adjacency and distance tiers."""
+
+import re
+
+
+# US state names (and common misspellings seen in the HubSpot export) mapped to postal codes
+US_STATE_CODES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+    # Known typos / variants in the source data
+    "arkansa": "AR", "washington dc": "DC", "washington d.c.": "DC",
+}
+
+# Land borders between states (corner-only contacts such as the Four Corners are not counted)
+STATE_ADJACENCY = {
+    "AL": ("FL", "GA", "MS", "TN"),
+    "AK": (),
+    "AZ": ("CA", "CO", "NM", "NV", "UT"),
+    "AR": ("LA", "MO", "MS", "OK", "TN", "TX"),
+    "CA": ("AZ", "NV", "OR"),
+    "CO": ("AZ", "KS", "NE", "NM", "OK", "UT", "WY"),
+    "CT": ("MA", "NY", "RI"),
+    "DE": ("MD", "NJ", "PA"),
+    "DC": ("MD", "VA"),
+    "FL": ("AL", "GA"),
+    "GA": ("AL", "FL", "NC", "SC", "TN"),
+    "HI": (),
+    "ID": ("MT", "NV", "OR", "UT", "WA", "WY"),
+    "IL": ("IA", "IN", "KY", "MO", "WI"),
+    "IN": ("IL", "KY", "MI", "OH"),
+    "IA": ("IL", "MN", "MO", "NE", "SD", "WI"),
+    "KS": ("CO", "MO", "NE", "OK"),
+    "KY": ("IL", "IN", "MO", "OH", "TN", "VA", "WV"),
+    "LA": ("AR", "MS", "TX"),
+    "ME": ("NH",),
+    "MD": ("DC", "DE", "PA", "VA", "WV"),
+    "MA": ("CT", "NH", "NY", "RI", "VT"),
+    "MI": ("IN", "OH", "WI"),
+    "MN": ("IA", "ND", "SD", "WI"),
+    "MS": ("AL", "AR", "LA", "TN"),
+    "MO": ("AR", "IA", "IL", "KS", "KY", "NE", "OK", "TN"),
+    "MT": ("ID", "ND", "SD", "WY"),
+    "NE": ("CO", "IA", "KS", "MO", "SD", "WY"),
+    "NV": ("AZ", "CA", "ID", "OR", "UT"),
+    "NH": ("MA", "ME", "VT"),
+    "NJ": ("DE", "NY", "PA"),
+    "NM": ("AZ", "CO", "OK", "TX"),
+    "NY": ("CT", "MA", "NJ", "PA", "VT"),
+    "NC": ("GA", "SC", "TN", "VA"),
+    "ND": ("MN", "MT", "SD"),
+    "OH": ("IN", "KY", "MI", "PA", "WV"),
+    "OK": ("AR", "CO", "KS", "MO", "NM", "TX"),
+    "OR": ("CA", "ID", "NV", "WA"),
+    "PA": ("DE", "MD", "NJ", "NY", "OH", "WV"),
+    "RI": ("CT", "MA"),
+    "SC": ("GA", "NC"),
+    "SD": ("IA", "MN", "MT", "ND", "NE", "WY"),
+    "TN": ("AL", "AR", "GA", "KY", "MO", "MS", "NC", "VA"),
+    "TX": ("AR", "LA", "NM", "OK"),
+    "UT": ("AZ", "CO", "ID", "NV", "WY"),
+    "VT": ("MA", "NH", "NY"),
+    "VA": ("DC", "KY", "MD", "NC", "TN", "WV"),
+    "WA": ("ID", "OR"),
+    "WV": ("KY", "MD", "OH", "PA", "VA"),
+    "WI": ("IA", "IL", "MI", "MN"),
+    "WY": ("CO", "ID", "MT", "NE", "SD", "UT"),
+}
+
+# Precompute border-crossing distances between every pair of connected states (BFS from each state)
+def compute_state_hops(adjacency):
+    hops = {}
+    for origin in adjacency:
+        distances = {origin: 0}
+        frontier = [origin]
+        while frontier:
+            next_frontier = []
+            for state in frontier:
+                for neighbor in adjacency.get(state, ()):
+                    if neighbor not in distances:
+                        distances[neighbor] = distances[state] + 1
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        hops[origin] = distances
+    return hops
+
+STATE_HOPS = compute_state_hops(STATE_ADJACENCY)
+
+# Maximum border crossings allowed for each "Location Priority" option (None means no limit)
+LOCATION_MAX_HOPS = {
+    "Same State Only": 0,
+    "Nearby States Acceptable": 1,
+    "Any Location": None,
+}
+
+# Normalize a state name or postal code ("California ", "ca", "Arkansa") to its postal code
+def normalize_state(value):
+    if not isinstance(value, str):
+        return None
+    cleaned = value.strip()
+    if not cleaned:
+        return None
+    if cleaned.upper() in STATE_ADJACENCY:
+        return cleaned.upper()
+    return US_STATE_CODES.get(re.sub(r'\s+', ' ', cleaned.lower()))
+
+# Parse a free-text list of states ("Colorado; New Jersey ", "TX, OK") into unique postal codes
+def parse_state_codes(value):
+    if isinstance(value, list):
+        parts = value
+    elif isinstance(value, str):
+        parts = re.split(r'[;,/]', value)
+    else:
+        return []
+    codes = []
+    for part in parts:
+        code = normalize_state(part)
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+# (distance, state code) pairs ordered by border crossings from the source states, limited to max_hops
+def enumerate_state_tiers(source_codes, max_hops=None):
+    distances = {}
+    for source in source_codes:
+        for code, hops in STATE_HOPS.get(source, {}).items():
+            if max_hops is not None and hops > max_hops:
+                continue
+            if code not in distances or hops < distances[code]:
+                distances[code] = hops
+    return sorted((hops, code) for code, hops in distances.items())
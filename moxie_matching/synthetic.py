@@ -0,0 +1,452 @@
+"""Seeded synthetic roster exports: Medical_List.csv, md_metadata.csv and hubspot_moxie.csv with the real
+column layouts, quirks and value mix, at any scale and with no real people in them."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .states import US_STATE_CODES
+
+
+ROWS_PER_WRITE = 10_000
+
+FIRST_NAMES = (
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth", "William",
+    "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen", "Daniel", "Lisa",
+    "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra", "Steven", "Ashley", "Paul", "Kimberly", "Andrew",
+    "Emily", "Joshua", "Donna", "Kevin", "Michelle", "Brian", "Carol", "George", "Amanda", "Timothy", "Melissa",
+    "Ryan", "Deborah", "Jason", "Stephanie", "Eric", "Rebecca", "Jacob", "Laura", "Nicholas", "Sharon", "Tyler",
+    "Cynthia", "Aaron", "Kathleen", "Adam", "Amy",
+)
+LAST_NAMES = (
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee",
+    "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young",
+    "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green", "Adams", "Nelson", "Baker",
+    "Hall", "Rivera", "Campbell", "Mitchell", "Carter", "Roberts", "Gomez", "Phillips", "Evans", "Turner", "Diaz",
+    "Parker", "Cruz", "Edwards", "Collins", "Reyes", "Stewart", "Morris", "Morales", "Murphy", "Cook", "Rogers",
+    "Gutierrez", "Ortiz", "Morgan", "Cooper", "Peterson", "Bailey", "Reed", "Kelly", "Howard", "Ramos", "Kim", "Cox",
+    "Ward", "Richardson", "Watson", "Brooks", "Chavez", "Wood", "James", "Bennett", "Gray", "Mendoza", "Ruiz",
+    "Hughes", "Price", "Alvarez", "Castillo", "Sanders", "Patel", "Myers", "Long", "Ross", "Foster", "Jimenez",
+)
+EMAIL_DOMAINS = {
+    "gmail.com": 0.70, "yahoo.com": 0.07, "icloud.com": 0.06, "comcast.net": 0.04, "aol.com": 0.04,
+    "hotmail.com": 0.03, "outlook.com": 0.03, "me.com": 0.03,
+}
+
+# Share of MDs living in each state, as in the MD export. Some state names always carry a trailing space
+# there, and a few MDs list several states separated by ";"
+MD_STATES = {
+    "California": 0.28, "Florida": 0.09, "Arizona": 0.07, "Washington": 0.05, "Texas": 0.05, "Ohio": 0.04,
+    "Illinois": 0.04, "New York": 0.04, "Michigan": 0.04, "Hawaii": 0.03, "Pennsylvania": 0.03, "Oregon": 0.03,
+    "Georgia": 0.02, "Tennessee": 0.02, "Colorado": 0.02, "New Jersey": 0.02, "Minnesota": 0.01, "Wisconsin": 0.01,
+    "Virginia": 0.01, "Maryland": 0.01, "Mississippi": 0.01, "Louisiana": 0.01, "Utah": 0.01, "Nevada": 0.01,
+    "Nebraska": 0.01, "Massachusetts": 0.01, "North Carolina": 0.01, "Rhode Island": 0.01, "South Carolina": 0.01,
+}
+TRAILING_SPACE_STATES = {"California", "Washington", "Hawaii", "Pennsylvania", "Oregon", "New Jersey", "Utah"}
+MULTI_STATE_SHARE = 0.05
+DR_PREFIX_SHARE = 0.85
+# Last-name suffixes the MD export carries for a few rows; ", NP" rows are nurse practitioners to the loader
+LAST_NAME_SUFFIXES = {"": 0.97, " [MD Profile]": 0.01, ", NP": 0.015, ", NP Medical Director": 0.005}
+MD_PREFERENCES_SHARE = 0.23
+MD_PREFERENCES = (
+    "Maxed out on NP's in {code}", "maxed on midlevels in {code}", "prefers 6mo experience at least",
+    "Prefers to work with {code} providers within his area", "mid-levels only", "Only advance providers",
+    "does not allow weight loss for RNs", "Prefers no controlled substances",
+    "open to beginners, but they should have at least done some hands-on experience.",
+    "Doesn't like IV hydration, particular about how people do filler",
+    "Maxed on Mid-levels and does not want to oversee RNs. Has room for 2 more PAs",
+    "prefers 6mo experience at least, maxed out on NP's in {code} ",
+)
+PERSONALITY_TRAITS_SHARE = 0.98
+PERSONALITY_TRAITS = (
+    "communicative", "younger physician", "kind", "personable", "responsive", "younger nurse practitioner",
+    "collaborative", "easy to get along with", "older physician", "easy going", "easy to get a hold of", "helpful",
+    "nice", "middle age", "very experienced", "eager", "easy-going", "compliant", "straight and to the point",
+    "sometimes hard to get a hold of", "autonomous", "smart", "eager for more providers", "hands-off and knowledgable",
+    "loves Moxie", "has his own spa with Moxie", "oversees a lot of spas",
+)
+
+# Ticket (nurse) distributions, as in the HubSpot matching pipeline export; "Arkansa" is a typo the export has
+TICKET_STATES = {
+    "California": 0.434, "Texas": 0.167, "Pennsylvania": 0.067, "Ohio": 0.063, "North Carolina": 0.048,
+    "Illinois": 0.041, "Arizona": 0.033, "Colorado": 0.021, "Wisconsin": 0.02, "Michigan": 0.02, "Virginia": 0.018,
+    "Minnesota": 0.013, "Indiana": 0.013, "Tennessee": 0.009, "Missouri": 0.008, "Georgia": 0.004, "Idaho": 0.004,
+    "Florida": 0.003, "Arkansa": 0.002, "Montana": 0.002, "West Virginia": 0.002, "Utah": 0.002, "Massachusetts": 0.002,
+}
+LICENSE_TYPES = {"RN": 0.726, "NP": 0.193, "PA": 0.052, "RN; NP": 0.013, "MD": 0.009, "NP; RN": 0.007}
+EXPERIENCE_LEVELS = {"Experienced": 0.533, "Brand new ": 0.39, "Advanced": 0.077}
+TICKET_STATUSES = {
+    "Rejected": 0.53, "Signed": 0.307, "Intro Made": 0.054, "Ready to Sign": 0.04, "Cancelled": 0.022, "Blocked": 0.017,
+    "Delayed Matching": 0.016, "Delayed Signing": 0.009, "Pending": 0.003, "Approval Sent": 0.001,
+}
+# Services Provided: each service's share of tickets, in the order the export lists them
+SERVICES = {
+    "Botox": 0.99, "Filler": 0.94, "Peels": 0.42, "IV Hydration": 0.52, "Microneedling": 0.58, "PRP": 0.37,
+    "Weight Loss": 0.32, "Lasers": 0.11, "PDO Threads": 0.09, "Kybella": 0.09, "BHRT": 0.04, "Peptides": 0.03,
+}
+FUTURE_SERVICES_SHARE = 0.63
+FUTURE_SERVICES = {
+    "Weight Loss": 0.3, "Lasers": 0.17, "Lasers; Weight Loss": 0.09, "Weight Loss; BHRT": 0.07, "PDO Threads": 0.05,
+    "IV Hydration; Weight Loss": 0.05, "PRP; Lasers": 0.05, "BHRT": 0.04, "Microneedling; PRP": 0.04,
+    "PRP; Weight Loss": 0.04, "Microneedling; Lasers": 0.03, "Microneedling": 0.03, "Lasers; Peels": 0.04,
+}
+SERVICE_NOTES_SHARE = 0.7
+SERVICE_NOTES = (
+    "Secondary MD", "wants derm or plastics MD", "Also doing NAD+ and would like an MD as close as possible",
+    "Initially: Vitamin Shots, lip tinting / Future: hydrafacial", "Wants an MD who is hands-on with training",
+    "Brand new injector, completed two trainings and wants mentorship on filler technique before going solo.",
+    "Opening a second location next quarter; would prefer one MD to oversee both spas.",
+    "Needs an MD comfortable with semaglutide protocols for the weight loss program.",
+    "Prefers an MD who is easy to reach by text, current MD was hard to get a hold of.",
+)
+BUG_EMAIL_SHARE = 0.69
+SHARED_EMAIL_SHARE = 0.07
+SPA_TICKET_SHARE = 0.08
+TEAM_TICKET_SHARE = 0.05
+# Number of MD options offered on a ticket, and how an option names the MD
+MD_OPTION_COUNTS = {0: 0.02, 1: 0.49, 2: 0.48, 3: 0.005, 4: 0.005}
+MD_OPTION_STYLES = {"Dr. {first} {last}": 0.83, "Dr. {last}": 0.15, "{first} {last}": 0.02}
+SAME_STATE_OPTION_SHARE = 0.85
+SIGNED_WITH_FIRST_OPTION_SHARE = 0.89
+CANCELATION_REASONS = {
+    "Provider chose another MD": 0.567, "MD didn't respond": 0.115, "MD not interested": 0.048,
+    "Other (check comments in Notes section)": 0.042, "Provider prefers local MD": 0.04,
+    "Provider prefers MD with more experience": 0.04, "MD Maxed on Midlevels": 0.033,
+    "Provider didn't click with MD": 0.025, "MD not comfortable with services": 0.023,
+    "Provider doesn't like personality": 0.019, "Trouble scheduling convo": 0.01,
+    "MD think provider doesn't have enough experience": 0.01, "Provider wants MD with Advanced Background": 0.008,
+    "MD Fee is too high": 0.004,
+}
+RECORD_SOURCES = {"CRM UI": 0.545, "Workflow": 0.455}
+PRIORITY_SHARE = 0.55
+PRIORITIES = {"High": 0.573, "Medium": 0.38, "Low": 0.047}
+LOCATION_PREFERENCE_SHARE = 0.61
+TICKET_TAGS_SHARE = 0.44
+
+MD_CREATED = (np.datetime64("2022-11-01T00:00"), np.datetime64("2025-02-01T00:00"))
+TICKET_CREATED = (np.datetime64("2023-12-11T00:00"), np.datetime64("2025-02-20T00:00"))
+
+# Every column of the HubSpot ticket export, in its order; the ones the loader never reads stay empty
+HUBSPOT_COLUMNS = (
+    'Ticket ID', "Addt'l Service Notes", 'Appointment Status', 'Appointment Status (retired)', 'Assigned Teams',
+    'Assigned To', 'Background', 'Bird Eats Bug Email', 'Bird Eats Bug URL', 'Category',
+    'Churned checklist complete', 'City', 'Client Name', 'Client Phone Number', 'Close date',
+    'Confirmed MD Fee (Moxie Managed)', 'Contract Out Date', 'Contract Signed Date', 'Conversation Link',
+    'Create date', 'Created by user ID', 'Delayed Matching Reason', 'Delayed Signing Reason',
+    'Discovery Call Complete', 'Discovery Call Date', 'Do You Think Provider Will Return To Moxie?',
+    'Escalation Priority', 'Escalation Type', 'Escalation Type Drilldown', 'Escalation Value Calculation',
+    'Estimated Completion Date', 'Experience Level  ', 'External MD Type', 'FDS Model', 'File upload',
+    'First agent email response date', 'From Phone Number', 'FUTURE Services (if known)',
+    'GHL - Client Current Offer', 'Has OM already had overview call?', 'HubSpot team', 'Interaction Source',
+    'Interaction Type', 'Interview Booked Date', 'Is Churn Risk?', 'Is this a special case?', 'Kick-Off Date',
+    'Last activity date', 'Last CES survey comment', 'Last CES survey date', 'Last CES survey rating',
+    'Last Closed Date', 'Last contacted date', 'Last customer reply date', 'Last Edited Time (Notion)',
+    'Last message from visitor', 'Last message received date', 'Last modified date', 'Last response date',
+    'Licensed States', 'Linear Ticket URL', 'Link to Escalation Notes', 'Live Session Url',
+    'Match Cancelation Reason', 'MD #1 Approval Sent', 'MD #1 Intro Sent ', 'MD #1 Option', 'MD #2 Approval Sent ',
+    'MD #2 Cancelation', 'MD #2 Intro Sent', 'MD #2 Option ', 'MD #3 Approval Sent', 'MD #3 Cancelation',
+    'MD #3 Intro Sent', 'MD #3 Option', 'MD #4 Approval Sent', 'MD #4 Cancelation', 'MD #4 Intro Sent',
+    'MD #4 Option ', 'MD #5 Approval Sent', 'MD #5 Intro Sent', 'MD #5 Option', 'MD Email', 'MD Location',
+    'MD Location Preference (state)', 'MD Type', 'Medical Director ', 'Medspa', 'Medspa MS ID', 'Medspa Name',
+    'Medspa Owner', 'Merged Ticket IDs', 'Moxie bookkeeping feature flag ', 'MS User Name + Role',
+    'New MD Preferences', 'Next activity date', 'Not Interested Reason', 'Notes/Remarks',
+    'Number of Associated Companies', 'Number of Sales Activities', 'Number of times contacted',
+    'Onboarding Booked Date', 'Onboarding Call Date', 'Onboarding Checklist Items', 'Onboarding manager',
+    'Originating channel account', 'Originating channel type', 'Owner assigned date', 'Payment Type',
+    'PC Type Being Used', 'Phone Number', 'Pipeline', 'Priority', 'Provider Escalation Details',
+    'Provider License Type', 'Provider Owner', 'PSM', 'Reason for switching', 'Record source',
+    'Record source detail 1', 'Record source detail 2', 'Record source detail 3', 'Recruiting Source', 'Region',
+    'Reporter', 'Request Type', "Requestor's Team", 'Resolution', 'Resolution Satisfaction', 'Resolution Strategy',
+    'Resume', 'Root Cause', 'Send to Linear', 'Services Offered', 'Services Provided', 'Severity', 'Shared teams',
+    'Shared users', 'Signed With', 'Signing Date', 'SLA Due Date', 'Source', 'Source System',
+    'State (MedSpa Premise)', 'Support Tier', 'Tech Support', 'Ticket description', 'Ticket ID.1',
+    'ticket id support', 'Ticket name', 'Ticket Number Counter', 'Ticket owner', 'Ticket Source', 'Ticket status',
+    'Ticket Tags', 'Time to close (HH:mm:ss)', 'Time to close in SLA hours (HH:mm:ss)',
+    'Time to Close SLA Due Date', 'Time to Close SLA Met', 'Time to Close SLA Met (Binary)',
+    'Time to Close SLA Ticket Status', 'Time to first agent email reply (HH:mm:ss)',
+    'Time to first response in SLA hours (HH:mm:ss)', 'Time to First Response SLA Due Date',
+    'Time to First Response SLA Status', 'Time to Next Response SLA Due Date', 'Time to Next Response SLA Status',
+    'To Phone number', 'Updated by user ID', 'Waiting On', 'Waiting On Reason', 'Was this Delayed?',
+    'Will Moxie manage MD payments?', 'Winback Details', 'Associated Email', 'Associated Feedback submission',
+    'Associated Postal Mail', 'Associated Contact', 'Associated Company', 'Associated Invoice',
+    'Associated Meeting', 'Associated Communication', 'Associated Order', 'Associated Conversation session',
+    'Affected Medspa', 'Associated Note', 'Associated Course', 'Associated Service', 'Associated Ticket',
+    'Associated Conversation', 'Associated Call', 'Reporter.1', 'Associated Company (Primary)',
+    'Associated Form submission', 'Associated Cart', 'Associated Listing', 'Associated Abandoned Cart',
+    'Associated Task', 'Associated Appointment', 'Associated Deal', 'Associated Email IDs',
+    'Associated Feedback submission IDs', 'Associated Postal Mail IDs', 'Associated Contact IDs',
+    'Associated Company IDs', 'Associated Invoice IDs', 'Associated Meeting IDs', 'Associated Communication IDs',
+    'Associated Order IDs', 'Associated Conversation session IDs', 'Affected Medspa IDs', 'Associated Note IDs',
+    'Associated Course IDs', 'Associated Service IDs', 'Associated Ticket IDs', 'Associated Conversation IDs',
+    'Associated Call IDs', 'Reporter IDs', 'Associated Company IDs (Primary)', 'Associated Form submission IDs',
+    'Associated Cart IDs', 'Associated Listing IDs', 'Associated Abandoned Cart IDs', 'Associated Task IDs',
+    'Associated Appointment IDs', 'Associated Deal IDs',
+)
+
+
+def weighted_choice(rng, table, size):
+    keys = list(table)
+    weights = np.array([table[key] for key in keys], dtype=float)
+    return np.array(keys, dtype=object)[rng.choice(len(keys), size=size, p=weights / weights.sum())]
+
+# "YYYY-MM-DD HH:MM" strings for datetime64[m] values
+def format_minutes(values):
+    return np.char.replace(np.datetime_as_string(values, unit="m"), "T", " ").astype(object)
+
+# Newest first, as the exports are sorted: row i of `total` falls in the i-th slice of the span, going back in time
+def descending_dates(rng, span, positions, total):
+    start, end = span
+    minutes = (end - start).astype("timedelta64[m]").astype(np.int64)
+    offsets = ((positions + rng.random_sample(len(positions))) / max(total, 1) * minutes).astype(np.int64)
+    return end - offsets.astype("timedelta64[m]")
+
+# Unique MD names (first x last combinations, then numbered duplicates) with the export's quirks
+def md_identities(rng, count):
+    combos = len(FIRST_NAMES) * len(LAST_NAMES)
+    picks = np.concatenate([rng.permutation(combos) for _ in range(-(-count // combos))])[:count]
+    rounds = np.arange(count) // combos
+    first = [FIRST_NAMES[pick // len(LAST_NAMES)] for pick in picks]
+    last = [
+        LAST_NAMES[pick % len(LAST_NAMES)] + (f"-{turn + 1}" if turn else "") for pick, turn in zip(picks, rounds)
+    ]
+    domains = weighted_choice(rng, EMAIL_DOMAINS, count)
+    patterns = rng.randint(4, size=count)
+    emails, seen = [], set()
+    for i, (first_name, last_name, domain, pattern) in enumerate(zip(first, last, domains, patterns)):
+        first_lower, last_lower = first_name.lower(), last_name.lower().replace("-", "")
+        local = (
+            f"{first_lower}.{last_lower}", f"{first_lower}{last_lower}{rng.randint(10, 999)}",
+            f"{first_lower[0]}{last_lower}", f"dr{last_lower}",
+        )[pattern]
+        if local in seen:
+            local = f"{local}{i}"
+        seen.add(local)
+        emails.append(f"{local}@{domain}")
+    states = weighted_choice(rng, MD_STATES, count)
+    state_lists = []
+    for state in states:
+        listed = [state]
+        if rng.random_sample() < MULTI_STATE_SHARE:
+            listed += [extra for extra in weighted_choice(rng, MD_STATES, rng.randint(1, 3)) if extra != state]
+        names = [name + " " if name in TRAILING_SPACE_STATES else name for name in listed]
+        state_lists.append(("; " if rng.random_sample() < 0.8 else " ; ").join(names))
+    return pd.DataFrame({
+        "first": first,
+        "last": last,
+        "display_first": [("Dr. " if prefixed else "") + name for name, prefixed in zip(first, rng.random_sample(count) < DR_PREFIX_SHARE)],
+        "display_last": [name + suffix for name, suffix in zip(last, weighted_choice(rng, LAST_NAME_SUFFIXES, count))],
+        "email": emails,
+        "states": state_lists,
+        "state": states,
+    })
+
+def md_preferences(rng, states):
+    return [
+        rng.choice(MD_PREFERENCES).format(code=US_STATE_CODES[state.lower()]) if rng.random_sample() < MD_PREFERENCES_SHARE else None
+        for state in states
+    ]
+
+def personality_traits(rng, count):
+    traits = []
+    for _ in range(count):
+        if rng.random_sample() >= PERSONALITY_TRAITS_SHARE:
+            traits.append(None)
+            continue
+        picked = rng.choice(len(PERSONALITY_TRAITS), size=rng.randint(2, 6), replace=False)
+        text = ", ".join(PERSONALITY_TRAITS[i] for i in picked)
+        traits.append(text + " " if rng.random_sample() < 0.2 else text)
+    return traits
+
+def write_md_exports(out_dir, rng, mds):
+    identities = md_identities(rng, mds)
+    created = descending_dates(rng, MD_CREATED, np.arange(mds), mds)
+    record_ids = 221351 + np.cumsum(rng.randint(1, 2 * 10**9, size=mds, dtype=np.int64))[::-1]
+    pd.DataFrame({
+        "Record ID": record_ids,
+        "First Name": identities["display_first"],
+        "Last Name": identities["display_last"],
+        "Lifecycle Stage": "Medical Director Onboarded",
+        "Email": identities["email"],
+        "Residing State  (Lives In)": identities["states"],
+        "Create Date": format_minutes(created),
+    }).to_csv(os.path.join(out_dir, "Medical_List.csv"), index=False)
+    pd.DataFrame({
+        "First Name": identities["display_first"],
+        "Last Name": identities["display_last"],
+        "Email": identities["email"],
+        "Residing State  (Lives In)": identities["states"],
+        "MD Preferences": md_preferences(rng, identities["state"]),
+        "Personality Traits": personality_traits(rng, mds),
+    }).to_csv(os.path.join(out_dir, "md_metadata.csv"), index=False)
+    return identities
+
+def nurse_ticket_names(rng, count, licenses):
+    rolls = rng.random_sample(count)
+    vip = rng.random_sample(count) < 0.2
+    firsts = np.array(FIRST_NAMES, dtype=object)[rng.randint(len(FIRST_NAMES), size=(count, 2))]
+    lasts = np.array(LAST_NAMES, dtype=object)[rng.randint(len(LAST_NAMES), size=(count, 2))]
+    names = []
+    for i, license_type in enumerate(licenses):
+        if rolls[i] < SPA_TICKET_SHARE:
+            names.append(f"{lasts[i, 0]} Aesthetics" + ("- VIP" if vip[i] else ""))
+        elif rolls[i] < SPA_TICKET_SHARE + TEAM_TICKET_SHARE:
+            names.append(f"{firsts[i, 0]} {lasts[i, 0]}, {license_type} & {firsts[i, 1]} {lasts[i, 1]}, {license_type}")
+        else:
+            names.append(f"{firsts[i, 0]} {lasts[i, 0]}, {license_type}")
+    return names
+
+def nurse_emails(rng, ticket_ids, names):
+    count = len(names)
+    has_email = rng.random_sample(count) < BUG_EMAIL_SHARE
+    domains = weighted_choice(rng, EMAIL_DOMAINS, count)
+    shared = rng.random_sample(count) < SHARED_EMAIL_SHARE
+    ampersand = rng.random_sample(count) < 0.5
+    emails = []
+    for i, (ticket_id, name) in enumerate(zip(ticket_ids, names)):
+        if not has_email[i]:
+            emails.append(None)
+            continue
+        person = name.split(",")[0].split(" & ")[0].lower().replace(" ", "")
+        email = f"{person}{ticket_id % 10000}@{domains[i]}"
+        if shared[i]:
+            email += (" & " if ampersand[i] else ", ") + f"info{ticket_id % 10000}@{person}spa.com"
+        emails.append(email)
+    return emails
+
+def services_provided(rng, count):
+    names = list(SERVICES)
+    included = rng.random_sample((count, len(names))) < np.array([SERVICES[name] for name in names])
+    included[:, 0] |= ~included.any(axis=1)
+    return ["; ".join(name for name, keep in zip(names, row) if keep) for row in included]
+
+# MD option names for one chunk of tickets: mostly MDs living in the ticket's state, weighted by a long-tailed
+# popularity so a few MDs get most offers, each written in one of the export's naming styles
+def md_options(rng, premise_states, mds, popularity, by_state):
+    count = len(premise_states)
+    counts = weighted_choice(rng, MD_OPTION_COUNTS, count).astype(int)
+    widest = int(counts.max()) * 2
+    # Draw twice the options needed (with replacement) and keep the first distinct ones per ticket
+    picks = np.searchsorted(np.cumsum(popularity) / popularity.sum(), rng.random_sample((count, widest)))
+    picks = np.minimum(picks, len(mds) - 1)
+    same_state = rng.random_sample(count) < SAME_STATE_OPTION_SHARE
+    premise_states = np.asarray(premise_states, dtype=object)
+    for state, pool in by_state.items():
+        rows = np.flatnonzero(same_state & (premise_states == state))
+        if not len(rows):
+            continue
+        cdf = np.cumsum(popularity[pool]) / popularity[pool].sum()
+        picks[rows] = pool[np.minimum(np.searchsorted(cdf, rng.random_sample((len(rows), widest))), len(pool) - 1)]
+    styles = list(MD_OPTION_STYLES)
+    style_picks = weighted_choice(rng, {i: MD_OPTION_STYLES[style] for i, style in enumerate(styles)}, picks.size)
+    labels = np.array(
+        [[style.format(first=first, last=last) for style in styles] for first, last in zip(mds["first"], mds["last"])],
+        dtype=object,
+    )[picks, style_picks.astype(int).reshape(picks.shape)]
+    options = []
+    for row_picks, row_labels, wanted in zip(picks, labels, counts):
+        seen = {}
+        for md, label in zip(row_picks, row_labels):
+            if md not in seen:
+                seen[md] = label
+                if len(seen) == wanted:
+                    break
+        options.append(list(seen.values()))
+    return options
+
+# California tickets are often tagged for the CA migration; about two thirds of tags are "High Priority"
+def ticket_tags(rng, states):
+    count = len(states)
+    california = (np.asarray(states, dtype=object) == "California") & (rng.random_sample(count) < 0.3)
+    both = rng.random_sample(count) < 0.15
+    high = rng.random_sample(count) < TICKET_TAGS_SHARE * 0.66
+    return np.where(
+        california, np.where(both, "High Priority; CA Migration", "CA Migration"), np.where(high, "High Priority", None)
+    ).tolist()
+
+def ticket_chunk(rng, start, count, total, mds, popularity, by_state):
+    data = {}
+    positions = np.arange(start, start + count)
+    ticket_ids = 20_000_000_000 + (total - positions) * 97 + rng.randint(0, 97, size=count)
+    created = descending_dates(rng, TICKET_CREATED, positions, total)
+    statuses = weighted_choice(rng, TICKET_STATUSES, count)
+    licenses = weighted_choice(rng, LICENSE_TYPES, count)
+    premise = weighted_choice(rng, TICKET_STATES, count)
+    names = nurse_ticket_names(rng, count, [license_type.split(";")[0] for license_type in licenses])
+
+    data["Ticket ID"] = ticket_ids
+    data["Ticket ID.1"] = ticket_ids
+    data["ticket id support"] = np.where(rng.random_sample(count) < 0.92, ticket_ids.astype(object), None)
+    data["Ticket name"] = names
+    data["Pipeline"] = "MD Matching"
+    data["Ticket status"] = statuses
+    data["Create date"] = format_minutes(created)
+    data["Kick-Off Date"] = np.datetime_as_string(created, unit="D")
+    data["Last modified date"] = format_minutes(
+        np.minimum(created + rng.randint(0, 60 * 24 * 60, size=count).astype("timedelta64[m]"), TICKET_CREATED[1])
+    )
+    data["Provider License Type"] = licenses
+    data["Experience Level  "] = weighted_choice(rng, EXPERIENCE_LEVELS, count)
+    data["State (MedSpa Premise)"] = premise
+    data["Services Provided"] = services_provided(rng, count)
+    data["Addt'l Service Notes"] = np.where(
+        rng.random_sample(count) < SERVICE_NOTES_SHARE,
+        np.array(SERVICE_NOTES, dtype=object)[rng.randint(len(SERVICE_NOTES), size=count)], None,
+    )
+    data["Bird Eats Bug Email"] = nurse_emails(rng, ticket_ids, names)
+    data["FUTURE Services (if known)"] = np.where(
+        rng.random_sample(count) < FUTURE_SERVICES_SHARE, weighted_choice(rng, FUTURE_SERVICES, count), None
+    )
+    data["MD Location Preference (state)"] = np.where(rng.random_sample(count) < LOCATION_PREFERENCE_SHARE, premise, None)
+    data["Record source"] = weighted_choice(rng, RECORD_SOURCES, count)
+    data["Priority"] = np.where(rng.random_sample(count) < PRIORITY_SHARE, weighted_choice(rng, PRIORITIES, count), None)
+    data["Ticket Tags"] = ticket_tags(rng, premise)
+
+    options = md_options(rng, premise, mds, popularity, by_state)
+    option_columns = ("MD #1 Option", "MD #2 Option ", "MD #3 Option", "MD #4 Option ", "MD #5 Option")
+    approval_columns = ("MD #1 Approval Sent", "MD #2 Approval Sent ", "MD #3 Approval Sent", "MD #4 Approval Sent", "MD #5 Approval Sent")
+    cancel_columns = (None, "MD #2 Cancelation", "MD #3 Cancelation", "MD #4 Cancelation", None)
+    reasons = weighted_choice(rng, CANCELATION_REASONS, count)
+    days = np.datetime_as_string(created + rng.randint(1, 30 * 24 * 60, size=count).astype("timedelta64[m]"), unit="D")
+    offered_counts = np.array([len(offered) for offered in options])
+    sent = rng.random_sample((count, len(option_columns))) < 0.7
+    canceled = rng.random_sample((count, len(option_columns))) < 0.3
+    for slot, column in enumerate(option_columns):
+        data[column] = [offered[slot] if slot < len(offered) else None for offered in options]
+        data[approval_columns[slot]] = np.where((offered_counts > slot) & sent[:, slot], days, None)
+        if cancel_columns[slot]:
+            data[cancel_columns[slot]] = np.where((offered_counts > slot) & canceled[:, slot], reasons, None)
+    signed = (statuses == "Signed") & (offered_counts > 0)
+    first_signed = (offered_counts == 1) | (rng.random_sample(count) < SIGNED_WITH_FIRST_OPTION_SHARE)
+    data["Signed With"] = [
+        (offered[0] if first else offered[1]) if is_signed else None
+        for is_signed, first, offered in zip(signed, first_signed, options)
+    ]
+    data["Signing Date"] = np.where(
+        signed, np.datetime_as_string(created + rng.randint(3, 40, size=count).astype("timedelta64[D]"), unit="D"), None
+    )
+    data["Match Cancelation Reason"] = np.where(np.isin(statuses, ["Rejected", "Cancelled"]), reasons, None)
+    return pd.DataFrame(data, columns=HUBSPOT_COLUMNS)
+
+# Write the three roster exports to out_dir; the same seed always writes the same files
+def generate_roster(out_dir, nurses=900, mds=90, seed=0):
+    # Every ticket is matched against the MD identities, and the exports are useless without rows
+    if nurses < 1 or mds < 1:
+        raise ValueError(f"A synthetic roster needs at least 1 nurse and 1 MD (got nurses={nurses}, mds={mds}).")
+    rng = np.random.RandomState(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    identities = write_md_exports(out_dir, rng, mds)
+    popularity = rng.pareto(1.5, size=mds) + 0.1
+    by_state = {state: np.flatnonzero(identities["state"].to_numpy() == state) for state in MD_STATES}
+    by_state = {state: labels for state, labels in by_state.items() if len(labels)}
+    path = os.path.join(out_dir, "hubspot_moxie.csv")
+    for start in range(0, nurses, ROWS_PER_WRITE):
+        count = min(ROWS_PER_WRITE, nurses - start)
+        chunk = ticket_chunk(rng, start, count, nurses, identities, popularity, by_state)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return {
+        "Medical_List.csv": mds,
+        "md_metadata.csv": mds,
+        "hubspot_moxie.csv": nurses,
+    }
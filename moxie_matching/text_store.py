@@ -0,0 +1,79 @@
+"""Side store for long free-text roster fields, kept out of the DataFrames and fetched by row label."""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Free text only needed for prompts, detail panels and keyword scoring, never for filtering
+DOCTOR_TEXT_FIELDS = ("MD Preferences", "Personality Traits", "Ranking Text")
+NURSE_TEXT_FIELDS = ("Addt'l Service Notes", "Ranking Text")
+# Derived from the text and unused elsewhere, so it is dropped along with it
+DROPPED_WITH_TEXT = ("Traits List",)
+
+class TextTable:
+    # One UTF-8 blob per field with NUL-terminated rows plus row offsets, so a lookup is a slice,
+    # a substring search is one scan of the blob, and the table pickles as a few buffers
+    def __init__(self, df, fields):
+        self.fields = tuple(field for field in fields if field in df.columns)
+        self._index = pd.Index(df.index)
+        self._blobs = {}
+        self._offsets = {}
+        for field in self.fields:
+            encoded = [(value.encode() if isinstance(value, str) else b"") + b"\0" for value in df[field]]
+            self._offsets[field] = np.concatenate(([0], np.cumsum([len(value) for value in encoded]))).astype(np.int64)
+            self._blobs[field] = b"".join(encoded)
+
+    def get(self, label, field):
+        position = self._index.get_indexer([label])[0]
+        if position < 0 or field not in self._blobs:
+            return ""
+        offsets = self._offsets[field]
+        return self._blobs[field][offsets[position]:offsets[position + 1] - 1].decode()
+
+    def row(self, label):
+        return {field: self.get(label, field) for field in self.fields}
+
+    def column(self, labels, field):
+        return pd.Series([self.get(label, field) for label in labels], index=labels, dtype=object)
+
+    # Whether each labelled row contains `needle`; NUL terminators keep a match from spanning two rows
+    def contains(self, labels, field, needle):
+        offsets = self._offsets[field]
+        starts = [match.start() for match in re.finditer(re.escape(needle.encode()), self._blobs[field])]
+        found = np.zeros(len(offsets) - 1, dtype=bool)
+        found[np.searchsorted(offsets, starts, side='right') - 1] = True
+        positions = self._index.get_indexer(labels)
+        return np.where(positions >= 0, found[positions], False)
+
+    @property
+    def nbytes(self):
+        return sum(len(blob) for blob in self._blobs.values()) + sum(offsets.nbytes for offsets in self._offsets.values())
+
+# Move the heavy text columns of a roster into a TextTable; returns the slim frame and the table
+def split_text_fields(df, fields):
+    table = TextTable(df, fields)
+    dropped = [column for column in table.fields + DROPPED_WITH_TEXT if column in df.columns]
+    return df.drop(columns=dropped), table
+
+# One text field of one row: from the side store when the roster was split, else from the row itself
+def row_text(row, field, table=None):
+    if table is not None and field in table.fields:
+        return table.get(row.name, field)
+    value = row.get(field, '')
+    return value if isinstance(value, str) else ''
+
+# A text field for every row of a (filtered) frame, aligned to its index
+def text_column(df, field, table=None):
+    if table is not None and field in table.fields:
+        return table.column(df.index, field)
+    if field in df.columns:
+        return df[field].fillna('').astype(str)
+    return pd.Series('', index=df.index, dtype=object)
+
+# Plain substring test of a text field for every row of a frame, scanning the side store when there is one
+def text_contains(df, field, needle, table=None):
+    if table is not None and field in table.fields:
+        return table.contains(df.index, field, needle)
+    return text_column(df, field).str.contains(needle, regex=False).to_numpy(dtype=bool)
@@ -0,0 +1,150 @@
+"""Per-request span tracing: a trace ID per match request, timed spans around each pipeline stage, and one JSON
+line per finished trace. With tracing off a span costs one context-variable lookup."""
+
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+
+
+TRACE_LOG = os.getenv("MOXIE_TRACE_LOG", "match_traces.jsonl")
+# Off unless enabled here; the app can also turn it on per session from its debug panel
+TRACING_ENABLED = os.getenv("MOXIE_TRACING", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Shared no-op span; yields None, so callers check before adding attributes
+NO_SPAN = contextlib.nullcontext()
+# The trace spans are recorded into on this thread (or job); None when tracing is off
+current_trace = contextvars.ContextVar("moxie_current_trace", default=None)
+trace_log_lock = threading.Lock()
+
+class Trace:
+    enabled = True
+
+    def __init__(self, name, start=None, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        # Spans keep perf_counter times; offsets are taken against `start` when the trace is written out
+        self.start = time.perf_counter() if start is None else start
+        self.started_at = time.time() - (time.perf_counter() - self.start)
+        self.spans = []
+        self.linked = []
+        self.finished = False
+        self._depth = threading.local()
+
+    # Time the enclosed block; the yielded dict takes attributes known only inside it (tokens, row counts)
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        depth = getattr(self._depth, "value", 0)
+        self._depth.value = depth + 1
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self._depth.value = depth
+            self.record(name, start, time.perf_counter(), depth=depth, error=error, **attrs)
+
+    # A span timed elsewhere (perf_counter start and end), e.g. work done before the trace existed
+    def record(self, name, start, end, depth=0, error=None, **attrs):
+        self.spans.append({
+            "name": name, "start": start, "end": end, "depth": depth, "thread": threading.current_thread().name,
+            "trace_id": self.trace_id, "error": error, "attrs": attrs,
+        })
+
+    # Include another trace's spans (a background job this request waited on) when this one is written out
+    def link(self, other):
+        if other is not None and other.enabled and other is not self and other not in self.linked:
+            self.linked.append(other)
+
+    def to_dict(self):
+        spans = list(self.spans)
+        for other in self.linked:
+            spans.extend(other.spans)
+        spans.sort(key=lambda span: span["start"])
+        end = max([span["end"] for span in spans] + [self.start])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": datetime.datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "attrs": self.attrs,
+            "linked_traces": [other.trace_id for other in self.linked],
+            "spans": [
+                {
+                    "name": span["name"],
+                    "start_ms": round((span["start"] - self.start) * 1000, 3),
+                    "duration_ms": round((span["end"] - span["start"]) * 1000, 3),
+                    "depth": span["depth"],
+                    "thread": span["thread"],
+                    "trace_id": span["trace_id"],
+                    "error": span["error"],
+                    "attrs": span["attrs"],
+                }
+                for span in spans
+            ],
+        }
+
+    # Write the trace to the JSON log once; returns its dict. Raises OSError when the log cannot be written
+    def finish(self, log_path=None):
+        if self.finished:
+            return None
+        self.finished = True
+        record = self.to_dict()
+        write_trace(record, log_path)
+        return record
+
+class NullTrace:
+    enabled = False
+    trace_id = None
+
+    def span(self, name, **attrs):
+        return NO_SPAN
+
+    def record(self, name, start, end, depth=0, error=None, **attrs):
+        pass
+
+    def link(self, other):
+        pass
+
+    def finish(self, log_path=None):
+        return None
+
+NULL_TRACE = NullTrace()
+
+# A new trace, or the shared no-op trace when tracing is off
+def start_trace(name, enabled=None, start=None, **attrs):
+    if not (TRACING_ENABLED if enabled is None else enabled):
+        return NULL_TRACE
+    return Trace(name, start=start, **attrs)
+
+# Record spans from library code (filtering, scoring, prompt, API call) into `trace` for the enclosed block
+@contextlib.contextmanager
+def use_trace(trace):
+    token = current_trace.set(trace if trace is not None and trace.enabled else None)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+
+# Span in whatever trace is active; the shared no-op span when none is
+def trace_span(name, **attrs):
+    trace = current_trace.get()
+    if trace is None:
+        return NO_SPAN
+    return trace.span(name, **attrs)
+
+# Append one trace as a JSON line
+def write_trace(record, log_path=None):
+    line = json.dumps(record, default=str) + "\n"
+    with trace_log_lock:
+        with open(log_path or TRACE_LOG, "a", encoding="utf-8") as f:
+            f.write(line)
+
@@ -0,0 +1,164 @@
+"""Offline fit of the ranker's feature weights from rated matches, published as versioned weight files."""
+
+import datetime
+import json
+import os
+
+import numpy as np
+
+from .candidates import find_nurse, resolve_match_doctor
+from .feedback import load_feedback_entries
+from .ranking import (
+    DEFAULT_RANKING_WEIGHTS,
+    RANKING_SEARCH_TYPES,
+    RANKING_WEIGHTS_DIR,
+    load_ranking_weights,
+    pair_features,
+    ranking_weight_files,
+)
+from .roster import load_roster
+from .runs import get_match_run
+
+
+# Too few ratings and the fit mostly reflects noise; the job refuses to publish below this
+MIN_TRAINING_SAMPLES = 30
+# Ridge pull toward the current default weights, in pseudo-ratings: with little feedback the learned
+# weights stay close to the hand-tuned ones and drift further as ratings accumulate
+WEIGHT_PRIOR_STRENGTH = 20.0
+
+# Search type and features of one rated match, or None when it cannot be scored. A match the ranker produced
+# carries the breakdown it was scored with (capacity as it stood then); other rated runs are re-scored with
+# their own search type's formulas, and feedback typed in without a run as the nurse search scores the pair
+def rated_match_features(entry, run, doctors_df, nurses_df, indexes):
+    search_type = run["search_type"] if run else "nurse"
+    if search_type not in RANKING_SEARCH_TYPES:
+        return None
+    matches = run["matches"] if run else []
+    match_rank = entry["match_rank"]
+    if match_rank is not None and 0 <= match_rank < len(matches):
+        breakdown = matches[match_rank].get("score_breakdown") if isinstance(matches[match_rank], dict) else None
+        if isinstance(breakdown, dict) and breakdown:
+            return search_type, {name: float(value) for name, value in breakdown.items()}
+
+    doctor = resolve_match_doctor({"name": entry["md_name"]}, doctors_df, indexes)
+    if search_type == "manual":
+        nurse = run["search_value"]
+    else:
+        nurse = find_nurse(nurses_df, entry["nurse_name"], indexes) if str(entry["nurse_name"]).strip() else None
+    if doctor is None or nurse is None:
+        return None
+    return search_type, pair_features(search_type, doctor, nurse, doctors_df, nurses_df, indexes)
+
+# Feature rows per search type for the rated pairs that can be scored; returns
+# ({search type: (names, X, y)}, skipped). A weight set only learns features every one of its rows has
+def rated_pair_features(entries, doctors_df, nurses_df, indexes, feedback_db=None):
+    rows = {search_type: [] for search_type in RANKING_SEARCH_TYPES}
+    ratings = {search_type: [] for search_type in RANKING_SEARCH_TYPES}
+    runs, skipped = {}, 0
+    for entry in entries:
+        run_id = entry["run_id"]
+        if run_id and run_id not in runs:
+            runs[run_id] = get_match_run(run_id, feedback_db)
+        scored = rated_match_features(entry, runs.get(run_id), doctors_df, nurses_df, indexes) if entry["user_rating"] else None
+        if scored is None:
+            skipped += 1
+            continue
+        search_type, features = scored
+        rows[search_type].append(features)
+        ratings[search_type].append(float(entry["user_rating"]) / 10.0)
+
+    samples = {}
+    for search_type in RANKING_SEARCH_TYPES:
+        type_rows = rows[search_type]
+        names = [name for name in DEFAULT_RANKING_WEIGHTS if type_rows and all(name in row for row in type_rows)]
+        features = np.array([[row[name] for name in names] for row in type_rows], dtype=float)
+        samples[search_type] = (names, features.reshape(len(type_rows), len(names)), np.array(ratings[search_type], dtype=float))
+    return samples, skipped
+
+# Best affine fit of `scores` to `ratings`; its RMSE is how well a weighting orders the pairs
+def affine_rmse(scores, ratings):
+    design = np.column_stack([np.ones_like(scores), scores])
+    coefficients = np.linalg.lstsq(design, ratings, rcond=None)[0]
+    return float(np.sqrt(np.mean((design @ coefficients - ratings) ** 2)))
+
+# Ridge least squares of rating on the features, shrunk toward the default weights. The ranker normalizes
+# by the weight total, so only the direction matters: negatives are clipped and the learned weights are
+# rescaled to the defaults' total for those features
+def fit_ranking_weights(names, features, ratings, prior_strength=WEIGHT_PRIOR_STRENGTH):
+    prior = np.array([DEFAULT_RANKING_WEIGHTS[name] for name in names], dtype=float)
+    prior_direction = prior / prior.sum()
+
+    # Unpenalized intercept, so an overall offset in the ratings does not distort the feature weights
+    design = np.column_stack([np.ones(len(ratings)), features])
+    penalty = np.diag([0.0] + [prior_strength] * len(names))
+    target = np.concatenate(([0.0], prior_direction))
+    coefficients = np.linalg.solve(design.T @ design + penalty, design.T @ ratings + penalty @ target)
+
+    direction = np.clip(coefficients[1:], 0.0, None)
+    if direction.sum() <= 0:
+        return None, "Every fitted weight was negative; keeping the current weights."
+    learned = direction / direction.sum() * prior.sum()
+    weights = dict(DEFAULT_RANKING_WEIGHTS)
+    weights.update({name: round(float(weight), 4) for name, weight in zip(names, learned)})
+    stats = {
+        "rmse_default": affine_rmse(features @ prior, ratings),
+        "rmse_learned": affine_rmse(features @ learned, ratings),
+    }
+    return {"weights": weights, "stats": stats}, None
+
+# Write the next version atomically (temp file + rename) so a loading ranker never sees a partial file
+def publish_ranking_weights(weights, metadata, weights_dir=None):
+    weights_dir = weights_dir or RANKING_WEIGHTS_DIR
+    files = ranking_weight_files(weights_dir)
+    version = files[0][0] + 1 if files else 1
+    os.makedirs(weights_dir, exist_ok=True)
+    path = os.path.join(weights_dir, f"ranking_weights_v{version}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "weights": weights, **metadata}, f, indent=2)
+    os.replace(tmp_path, path)
+    return version, path
+
+# Join the feedback log to its runs and the roster, fit one weight set per search type, and publish unless
+# dry_run; returns a summary dict. A search type with too few ratings (or no usable fit) keeps its current
+# weights; nothing is published when no search type could be fitted
+def train_ranking_weights(feedback_db=None, data_dir=".", weights_dir=None, min_samples=MIN_TRAINING_SAMPLES,
+                          prior_strength=WEIGHT_PRIOR_STRENGTH, dry_run=False):
+    doctors_df, nurses_df, indexes = load_roster(data_dir)
+    entries = load_feedback_entries(feedback_db)
+    samples, skipped = rated_pair_features(entries, doctors_df, nurses_df, indexes, feedback_db)
+    summary = {
+        "entries": len(entries),
+        "samples": {search_type: len(ratings) for search_type, (_, _, ratings) in samples.items()},
+        "skipped": skipped,
+        "fits": {},
+        "errors": {},
+        "version": None,
+        "path": None,
+    }
+    for search_type, (names, features, ratings) in samples.items():
+        if len(ratings) < min_samples:
+            summary["errors"][search_type] = (
+                f"Only {len(ratings)} rated {search_type}-search pairs can be scored; at least {min_samples} are needed."
+            )
+            continue
+        fit, error = fit_ranking_weights(names, features, ratings, prior_strength)
+        if error:
+            summary["errors"][search_type] = error
+        else:
+            summary["fits"][search_type] = fit
+    if not summary["fits"]:
+        summary["error"] = "No search type could be fitted; keeping the current weights."
+        return summary
+
+    summary["error"] = None
+    if not dry_run:
+        weights = load_ranking_weights(weights_dir)[1]
+        weights.update({search_type: fit["weights"] for search_type, fit in summary["fits"].items()})
+        summary["version"], summary["path"] = publish_ranking_weights(weights, {
+            "trained_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "samples": {search_type: summary["samples"][search_type] for search_type in summary["fits"]},
+            "prior_strength": prior_strength,
+            "stats": {search_type: fit["stats"] for search_type, fit in summary["fits"].items()},
+        }, weights_dir)
+    return summary
@@ -1,8 +1,24 @@
 import streamlit as st
 import pandas as pd
-import datetime
-import json
+import math
 import os
+import sqlite3
+import tempfile
+
+from moxie_matching.feedback import (
+    FEEDBACK_PAGE_SIZE,
+    LEGACY_FEEDBACK_FILE,
+    add_feedback_entry,
+    count_feedback,
+    feedback_summary,
+    feedback_version,
+    migrate_legacy_feedback,
+    query_feedback,
+)
+from moxie_matching.calibration import CALIBRATION_TOLERANCE, MIN_BAND_ENTRIES, calibration_report
+from moxie_matching.export import export_table, parquet_available
+from moxie_matching.render import render_feedback_cards
+from app_data import load_data
 
 # Page configuration
 st.set_page_config(page_title="Moxie Matching Feedback Log", layout="wide")
@@ -138,7 +154,7 @@ if not st.session_state['password_correct']:
         # Hard-code the password check for simplicity
         if password == "MoxieAI2025":
             st.session_state['password_correct'] = True
-            st.experimental_rerun()
+            st.rerun()
         else:
             st.error("Incorrect password. Please try again.")
     
@@ -148,55 +164,69 @@ if not st.session_state['password_correct']:
 # Main application content
 st.markdown("<h1 class='main-header'>Moxie Matching Feedback Log</h1>", unsafe_allow_html=True)
 
-# Feedback data file path
-FEEDBACK_FILE = "matching_feedback.json"
+# Import the legacy JSON log into the feedback store once per process (a no-op once it has been imported)
+@st.cache_resource
+def migrate_feedback_store():
+    try:
+        return migrate_legacy_feedback(LEGACY_FEEDBACK_FILE)
+    except (sqlite3.Error, OSError, ValueError) as e:
+        st.error(f"Error migrating {LEGACY_FEEDBACK_FILE}: {e}")
+        return 0
+
+migrate_feedback_store()
 
-# Function to load feedback data
-def load_feedback_data():
-    if os.path.exists(FEEDBACK_FILE):
-        try:
-            with open(FEEDBACK_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            st.error(f"Error loading feedback data: {e}")
-            return []
-    return []
+# User rating filter buckets (inclusive bounds)
+RATING_BUCKETS = {"High (8-10)": (8, 10), "Medium (5-7)": (5, 7), "Low (1-4)": (1, 4)}
 
-# Function to save feedback data
-def save_feedback_data(feedback_data):
+# Stat cards, filter options and date range from the running aggregates; the store version is the
+# cache key, so a new entry (from any session or process) invalidates it and nothing else does
+@st.cache_data(max_entries=8)
+def load_feedback_summary(version):
+    return feedback_summary()
+
+def get_feedback_summary():
     try:
-        with open(FEEDBACK_FILE, 'w') as f:
-            json.dump(feedback_data, f, indent=2)
+        return load_feedback_summary(feedback_version())
+    except sqlite3.Error as e:
+        st.error(f"Error loading feedback statistics: {e}")
+        return None
+
+# Calibration from the calibration aggregates, recomputed only when the store version moves
+@st.cache_data(max_entries=8)
+def load_calibration_report(version, band_width, with_states):
+    doctors_df, _, indexes = load_data() if with_states else (None, None, None)
+    return calibration_report(band_width=band_width, doctors_df=doctors_df, indexes=indexes)
+
+# Function to add new feedback; a single-row insert, so concurrent submitters never lose entries
+def add_feedback(md_name, nurse_name, match_score, user_rating, comments, match_reasoning):
+    try:
+        add_feedback_entry(md_name, nurse_name, match_score, user_rating, comments, match_reasoning)
         return True
-    except Exception as e:
+    except sqlite3.Error as e:
         st.error(f"Error saving feedback data: {e}")
         return False
 
-# Function to add new feedback
-def add_feedback(md_name, nurse_name, match_score, user_rating, comments, match_reasoning):
-    feedback_data = load_feedback_data()
-    
-    # Create new feedback entry
-    new_feedback = {
-        "id": len(feedback_data) + 1,
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "md_name": md_name,
-        "nurse_name": nurse_name,
-        "match_score": float(match_score),
-        "user_rating": int(user_rating),
-        "accuracy": int(user_rating) / 10.0,  # Calculate accuracy as a percentage of max rating
-        "comments": comments,
-        "match_reasoning": match_reasoning
-    }
-    
-    # Add to existing data
-    feedback_data.append(new_feedback)
-    
-    # Save updated data
-    return save_feedback_data(feedback_data)
+# Stream one export to a temporary file and offer it for download; the file is read once into the download
+def download_export(table, export_format, file_stem, label, filters=None):
+    file_name = f"{file_stem}.{export_format}"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, file_name)
+        try:
+            with st.spinner("Preparing export..."):
+                count = export_table(path, export_format, table, **(filters or {}))
+        except (sqlite3.Error, OSError, RuntimeError) as e:
+            st.error(f"Error exporting data: {e}")
+            return
+        with open(path, "rb") as f:
+            st.download_button(
+                label=f"{label} ({count} rows)",
+                data=f,
+                file_name=file_name,
+                mime="text/csv" if export_format == "csv" else "application/vnd.apache.parquet"
+            )
 
 # Main app sections using tabs
-tab1, tab2 = st.tabs(["Add Feedback", "View Feedback"])
+tab1, tab2, tab3 = st.tabs(["Add Feedback", "View Feedback", "Calibration"])
 
 # Tab 1: Add Feedback
 with tab1:
@@ -205,6 +235,9 @@ with tab1:
     st.markdown("""
     Use this form to provide feedback on the quality and accuracy of the matching algorithm.
     This helps us improve future matches and track performance over time.
+    
+    Matches found in the matching system can be rated straight from their result cards ("Rate these matches"),
+    which records the exact run they came from. Use this form for matches made elsewhere.
     """)
     
     # Feedback form
@@ -249,20 +282,16 @@ with tab1:
 with tab2:
     st.markdown("<h2 class='subheader'>Feedback History & Analytics</h2>", unsafe_allow_html=True)
     
-    # Load feedback data
-    feedback_data = load_feedback_data()
+    summary = get_feedback_summary()
     
-    if not feedback_data:
+    if not summary or not summary["entries"]:
         st.info("No feedback data available yet. Submit feedback in the 'Add Feedback' tab.")
     else:
-        # Convert to DataFrame for easier analysis
-        df = pd.DataFrame(feedback_data)
-        
-        # Calculate statistics
-        avg_algorithm_score = df['match_score'].mean()
-        avg_user_rating = df['user_rating'].mean()
-        avg_accuracy = (df['user_rating'] / 10.0).mean() * 100  # as percentage
-        total_entries = len(df)
+        # Statistics come from the aggregates, so they cost the same however long the history is
+        avg_algorithm_score = summary["avg_match_score"]
+        avg_user_rating = summary["avg_user_rating"]
+        avg_accuracy = summary["accuracy"] * 100  # as percentage
+        total_entries = summary["entries"]
         
         # Display statistics
         st.markdown("<div class='feedback-stats'>", unsafe_allow_html=True)
@@ -273,7 +302,7 @@ with tab2:
             st.markdown(f"""
             <div class='stat-card'>
                 <div class='stat-label'>Average Algorithm Score</div>
-                <div class='stat-value'>{avg_algorithm_score:.1f}/10</div>
+                <div class='stat-value'>{f"{avg_algorithm_score:.1f}/10" if avg_algorithm_score is not None else "n/a"}</div>
             </div>
             """, unsafe_allow_html=True)
             
@@ -311,128 +340,178 @@ with tab2:
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            # Get unique MDs
-            md_options = ["All"] + sorted(df["md_name"].unique().tolist())
+            md_options = ["All"] + summary["md_names"]
             selected_md = st.selectbox("Filter by Medical Director:", md_options)
             
         with col2:
-            # Get unique nurses
-            nurse_options = ["All"] + sorted(df["nurse_name"].unique().tolist())
+            nurse_options = ["All"] + summary["nurse_names"]
             selected_nurse = st.selectbox("Filter by Nurse:", nurse_options)
             
         with col3:
             # Rating filter
-            rating_options = ["All", "High (8-10)", "Medium (5-7)", "Low (1-4)"]
-            selected_rating = st.selectbox("Filter by User Rating:", rating_options)
+            selected_rating = st.selectbox("Filter by User Rating:", ["All"] + list(RATING_BUCKETS))
         
         # Date range filter
-        if 'timestamp' in df.columns:
-            df['date'] = pd.to_datetime(df['timestamp']).dt.date
-            min_date = df['date'].min()
-            max_date = df['date'].max()
-            
-            date_col1, date_col2 = st.columns(2)
-            with date_col1:
-                start_date = st.date_input("From Date:", min_date)
-            with date_col2:
-                end_date = st.date_input("To Date:", max_date)
+        min_date = pd.Timestamp(summary["first_day"]).date()
+        max_date = pd.Timestamp(summary["last_day"]).date()
+        
+        date_col1, date_col2 = st.columns(2)
+        with date_col1:
+            start_date = st.date_input("From Date:", min_date)
+        with date_col2:
+            end_date = st.date_input("To Date:", max_date)
+        
+        search = st.text_input("Search comments and reasoning:", placeholder="e.g., capacity hands-on")
         
         st.markdown("</div>", unsafe_allow_html=True)
         
-        # Apply filters
-        filtered_df = df.copy()
+        # Filters run in the store against its indexes; only one page of entries is fetched
+        min_rating, max_rating = RATING_BUCKETS.get(selected_rating, (None, None))
+        filters = {
+            "md_name": None if selected_md == "All" else selected_md,
+            "nurse_name": None if selected_nurse == "All" else selected_nurse,
+            "min_rating": min_rating,
+            "max_rating": max_rating,
+            "start_date": start_date,
+            "end_date": end_date,
+            "search": search.strip() or None,
+        }
         
-        if selected_md != "All":
-            filtered_df = filtered_df[filtered_df["md_name"] == selected_md]
-            
-        if selected_nurse != "All":
-            filtered_df = filtered_df[filtered_df["nurse_name"] == selected_nurse]
-            
-        if selected_rating != "All":
-            if selected_rating == "High (8-10)":
-                filtered_df = filtered_df[filtered_df["user_rating"] >= 8]
-            elif selected_rating == "Medium (5-7)":
-                filtered_df = filtered_df[(filtered_df["user_rating"] >= 5) & (filtered_df["user_rating"] < 8)]
-            elif selected_rating == "Low (1-4)":
-                filtered_df = filtered_df[filtered_df["user_rating"] < 5]
+        # Start from the newest page whenever the filters change; each later page is keyed by the id it starts before
+        query_key = tuple(sorted(filters.items()))
+        if st.session_state.get('feedback_query') != query_key:
+            st.session_state['feedback_query'] = query_key
+            st.session_state['feedback_cursors'] = [None]
+        cursors = st.session_state['feedback_cursors']
         
-        if 'date' in filtered_df.columns:
-            filtered_df = filtered_df[(filtered_df['date'] >= start_date) & (filtered_df['date'] <= end_date)]
+        try:
+            total_matches = count_feedback(**filters)
+            page_entries, next_cursor = query_feedback(before_id=cursors[-1], **filters)
+        except sqlite3.Error as e:
+            st.error(f"Error querying feedback data: {e}")
+            total_matches, page_entries, next_cursor = 0, [], None
         
         # Display filtered feedback
-        st.markdown(f"<h3>Showing {len(filtered_df)} Feedback Entries</h3>", unsafe_allow_html=True)
+        st.markdown(f"<h3>Showing {total_matches} Feedback Entries</h3>", unsafe_allow_html=True)
+        
+        def older_page(cursor):
+            st.session_state['feedback_cursors'].append(cursor)
         
-        # Sort by timestamp (newest first)
-        if not filtered_df.empty and 'timestamp' in filtered_df.columns:
-            filtered_df = filtered_df.sort_values(by='timestamp', ascending=False)
+        def newer_page():
+            st.session_state['feedback_cursors'].pop()
+        
+        newer_col, page_col, older_col = st.columns([1, 2, 1])
+        with newer_col:
+            st.button("Newer", disabled=len(cursors) <= 1, on_click=newer_page)
+        with older_col:
+            st.button("Older", disabled=next_cursor is None, on_click=older_page, args=(next_cursor,))
+        with page_col:
+            st.markdown(f"Page **{len(cursors)}** of **{max(math.ceil(total_matches / FEEDBACK_PAGE_SIZE), 1)}**")
         
         # Display feedback cards
-        for idx, row in filtered_df.iterrows():
-            # Determine card style based on rating
-            card_class = "feedback-card"
-            rating_class = "rating-badge "
-            
-            if row['user_rating'] >= 8:
-                card_class += " positive-feedback"
-                rating_class += "rating-high"
-            elif row['user_rating'] >= 5:
-                card_class += " neutral-feedback"
-                rating_class += "rating-medium"
-            else:
-                card_class += " negative-feedback"
-                rating_class += "rating-low"
-            
-            st.markdown(f"""
-            <div class='{card_class}'>
-                <div class='feedback-header'>
-                    <h4>{row['md_name']} + {row['nurse_name']}</h4>
-                    <span class='{rating_class}'>{row['user_rating']}/10</span>
-                </div>
-                <p class='timestamp'>{row['timestamp']}</p>
-                
-                <div class='match-details'>
-                    <p><strong>Algorithm Score:</strong> {row['match_score']}/10</p>
-                    <p><strong>Match Reasoning:</strong> {row['match_reasoning']}</p>
-                </div>
-                
-                <p><strong>User Comments:</strong> {row['comments'] if row['comments'] else "No comments provided."}</p>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(render_feedback_cards(page_entries), unsafe_allow_html=True)
         
         # Export section
         st.markdown("<div class='export-section'>", unsafe_allow_html=True)
         st.markdown("<h3>Export Feedback Data</h3>", unsafe_allow_html=True)
         
-        col1, col2 = st.columns(2)
+        # Exports stream from the store in chunks to a temporary file, so no DataFrame or CSV string is built
+        format_options = ["CSV", "Parquet"] if parquet_available() else ["CSV"]
+        export_format = st.radio("Format:", format_options, horizontal=True).lower()
+        if len(format_options) == 1:
+            st.caption("Install pyarrow to enable Parquet exports.")
+        
+        col1, col2, col3 = st.columns(3)
         
         with col1:
-            if st.button("Export All Feedback as CSV"):
-                # Convert dataframe to CSV
-                csv = df.to_csv(index=False)
-                
-                # Create download link
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="moxie_matching_feedback.csv",
-                    mime="text/csv"
-                )
+            if st.button("Export All Feedback"):
+                download_export("feedback", export_format, "moxie_matching_feedback", "Download")
         
         with col2:
-            if st.button("Export Filtered Feedback as CSV"):
-                # Convert filtered dataframe to CSV
-                csv = filtered_df.to_csv(index=False)
-                
-                # Create download link
-                st.download_button(
-                    label="Download Filtered CSV",
-                    data=csv,
-                    file_name="moxie_matching_feedback_filtered.csv",
-                    mime="text/csv"
-                )
+            if st.button("Export Filtered Feedback"):
+                download_export("feedback", export_format, "moxie_matching_feedback_filtered", "Download Filtered", filters)
+        
+        with col3:
+            if st.button("Export Match Run History"):
+                download_export("runs", export_format, "moxie_match_runs", "Download Run History")
         
         st.markdown("</div>", unsafe_allow_html=True)
 
+# Tab 3: Calibration
+with tab3:
+    st.markdown("<h2 class='subheader'>Score Calibration</h2>", unsafe_allow_html=True)
+    
+    st.markdown(f"""
+    How the score shown with a match compares with the rating it was given. A band is flagged when its scores
+    run at least {CALIBRATION_TOLERANCE:.0f} point above ("over") or below ("under") the ratings, on at least
+    {MIN_BAND_ENTRIES} ratings and beyond its noise.
+    """)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        band_width = st.select_slider("Score band width", options=[0.5, 1.0, 2.0], value=1.0)
+    with col2:
+        with_states = st.checkbox("Per-state error (loads the roster)")
+    
+    try:
+        report = load_calibration_report(feedback_version(), band_width, with_states)
+    except (sqlite3.Error, OSError) as e:
+        st.error(f"Error loading calibration data: {e}")
+        report = None
+    
+    if not report or not report["sources"]:
+        st.info("No feedback data available yet. Submit feedback in the 'Add Feedback' tab.")
+    else:
+        source_labels = {"llm": "AI refined", "ranker": "Ranker", "manual": "Logged by hand"}
+        
+        # Overall error and agreement per score source
+        st.dataframe(pd.DataFrame([
+            {
+                "Score source": source_labels[source],
+                "Ratings": stats["entries"],
+                "Bias (score - rating)": stats["bias"],
+                "MAE": stats["mae"],
+                "RMSE": stats["rmse"],
+                "Spearman": stats["spearman"],
+                "Pearson": stats["pearson"],
+            }
+            for source, stats in report["sources"].items()
+        ]), hide_index=True, use_container_width=True)
+        
+        # Reliability curves: mean rating per score band (at the band's midpoint); a calibrated score sits on the diagonal
+        curves = pd.DataFrame({
+            source_labels[source]: stats["curve"].set_index((stats["curve"]["score_low"] + stats["curve"]["score_high"]) / 2)["mean_rating"]
+            for source, stats in report["sources"].items()
+        }).sort_index()
+        curves["Perfect calibration"] = curves.index
+        st.markdown("<h3>Reliability Curves</h3>", unsafe_allow_html=True)
+        st.line_chart(curves)
+        
+        for source, stats in report["sources"].items():
+            for band in stats["curve"][stats["curve"]["flag"] != ""].itertuples():
+                st.warning(
+                    f"{source_labels[source]} scores of {band.score_low:.1f}-{band.score_high:.1f} are "
+                    f"{band.flag}-confident: {band.mean_error:+.1f} points against {band.entries} ratings."
+                )
+        
+        if report["trusted_ranker_bands"]:
+            bands = ", ".join(f"{low:.1f}-{high:.1f}" for low, high in report["trusted_ranker_bands"])
+            st.success(f"The ranker's score agrees with the ratings in bands {bands}; an AI refinement adds little there.")
+        elif "ranker" in report["sources"]:
+            st.info("No ranker score band is calibrated well enough yet to skip the AI refinement.")
+        
+        with st.expander("Bands by score source"):
+            for source, stats in report["sources"].items():
+                st.markdown(f"**{source_labels[source]}**")
+                st.dataframe(stats["curve"], hide_index=True, use_container_width=True)
+        
+        st.markdown("<h3>Error by Medical Director</h3>", unsafe_allow_html=True)
+        st.dataframe(report["md"], hide_index=True, use_container_width=True)
+        
+        if report["state"] is not None:
+            st.markdown("<h3>Error by State</h3>", unsafe_allow_html=True)
+            st.dataframe(report["state"], hide_index=True, use_container_width=True)
+
 # Optional: Add link to go back to main matching page
 st.markdown("---")
 st.markdown("Return to [Matching System](#) (link will need to be updated based on your deployment)")
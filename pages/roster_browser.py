@@ -0,0 +1,168 @@
+import streamlit as st
+import sqlite3
+
+from app_data import get_capacity_cache, load_data
+from moxie_matching import apply_live_capacity, get_available_capacity
+from moxie_matching.browse import (
+    BROWSE_PAGE_SIZE,
+    browse_filter_options,
+    filter_roster,
+    page_count,
+    roster_page,
+    sort_roster,
+)
+
+# Page configuration
+st.set_page_config(page_title="Moxie Roster Browser", layout="wide")
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        color: #2c3e50;
+        text-align: center;
+        margin-bottom: 20px;
+    }
+    .subheader {
+        color: #34495e;
+        border-bottom: 1px solid #eee;
+        padding-bottom: 10px;
+    }
+    .filter-section {
+        background-color: #f5f9ff;
+        padding: 15px;
+        border-radius: 5px;
+        margin-bottom: 20px;
+        border: 1px solid #d1e1ff;
+    }
+    .password-container {
+        max-width: 500px;
+        margin: 0 auto;
+        padding: 20px;
+        background-color: #f8f9fa;
+        border-radius: 10px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    .password-header {
+        text-align: center;
+        color: #2c3e50;
+        margin-bottom: 20px;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# Initialize session state for password
+if 'password_correct' not in st.session_state:
+    st.session_state['password_correct'] = False
+
+# Simple password screen
+if not st.session_state['password_correct']:
+    st.markdown("""
+    <div class="password-container">
+        <h2 class="password-header">Moxie Roster Browser</h2>
+        <p>Please enter the password to access the system:</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    password = st.text_input("Password", type="password", key="password_input")
+
+    if st.button("Login"):
+        # Hard-code the password check for simplicity
+        if password == "MoxieAI2025":
+            st.session_state['password_correct'] = True
+            st.rerun()
+        else:
+            st.error("Incorrect password. Please try again.")
+
+    # Stop execution here if password is incorrect
+    st.stop()
+
+st.markdown("<h1 class='main-header'>Moxie Roster Browser</h1>", unsafe_allow_html=True)
+
+# Ordered row labels for one query; paging through the same query reuses them instead of re-filtering
+@st.cache_data(max_entries=64)
+def query_roster(side, filters, sort_by, descending, ledger_version):
+    doctors_df, nurses_df, indexes = load_data()
+    if side == "md":
+        doctors_df = apply_live_capacity(doctors_df, get_capacity_cache()["available"])
+    df = nurses_df if side == "nurse" else doctors_df
+    labels = filter_roster(side, df, indexes, **dict(filters))
+    return sort_roster(df, labels, sort_by, descending)
+
+# The roster shared with the matching page (one copy per process)
+doctors_df, nurses_df, indexes = load_data()
+if doctors_df is None or nurses_df is None:
+    st.error("Failed to load data. Please check the data files.")
+    st.stop()
+
+# Keep MD capacity in step with the ledger
+ledger_version = None
+try:
+    get_available_capacity(get_capacity_cache())
+    ledger_version = get_capacity_cache()["version"]
+    doctors_df = apply_live_capacity(doctors_df, get_capacity_cache()["available"])
+except sqlite3.Error as e:
+    st.warning(f"Capacity ledger unavailable, showing static capacity: {e}")
+
+side = {"Nurses": "nurse", "Medical Directors": "md"}[st.radio("Roster:", ["Nurses", "Medical Directors"], horizontal=True)]
+df = nurses_df if side == "nurse" else doctors_df
+options = browse_filter_options(side, df, indexes)
+
+# Filters and sort order
+st.markdown('<div class="filter-section">', unsafe_allow_html=True)
+filters = {}
+if side == "nurse":
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        filters["state"] = st.selectbox("State:", ["Any"] + options["states"])
+    with col2:
+        filters["license_type"] = st.selectbox("License:", ["Any"] + options["licenses"])
+    with col3:
+        filters["experience"] = st.selectbox("Experience:", ["Any"] + options["experience"])
+    with col4:
+        filters["service"] = st.selectbox("Service:", ["Any"] + options["services"])
+    sort_options = {"Email": "Bird Eats Bug Email", "State": "State (MedSpa Premise)", "License": "Provider License Type", "Experience": "Experience Rank"}
+else:
+    col1, col2 = st.columns(2)
+    with col1:
+        filters["state"] = st.selectbox("State:", ["Any"] + options["states"])
+    with col2:
+        filters["capacity"] = {"Any": None, "NP": "NP", "RN": "RN", "NP or RN": "Either"}[
+            st.selectbox("Open capacity:", ["Any", "NP", "RN", "NP or RN"])
+        ]
+    sort_options = {"Last Name": "Last Name", "State": "Residing State  (Lives In)", "NP Capacity": "NP Capacity", "RN Capacity": "RN Capacity"}
+
+sort_col, order_col = st.columns(2)
+with sort_col:
+    sort_label = st.selectbox("Sort by:", list(sort_options))
+with order_col:
+    descending = st.radio("Order:", ["Ascending", "Descending"], horizontal=True) == "Descending"
+st.markdown('</div>', unsafe_allow_html=True)
+
+filters = tuple(sorted((key, None if value == "Any" else value) for key, value in filters.items()))
+labels = query_roster(side, filters, sort_options[sort_label], descending, ledger_version)
+
+# Start from the first page whenever the query changes
+query_key = (side, filters, sort_label, descending)
+if st.session_state.get('browser_query') != query_key:
+    st.session_state['browser_query'] = query_key
+    st.session_state['browser_page'] = 1
+
+# Page buttons move the page in a callback, before the rerun draws them again
+def change_page(step):
+    st.session_state['browser_page'] += step
+
+total_pages = page_count(len(labels))
+page = min(max(st.session_state['browser_page'], 1), total_pages)
+st.session_state['browser_page'] = page
+prev_col, page_col, next_col = st.columns([1, 2, 1])
+with prev_col:
+    st.button("Previous", disabled=page <= 1, on_click=change_page, args=(-1,))
+with next_col:
+    st.button("Next", disabled=page >= total_pages, on_click=change_page, args=(1,))
+with page_col:
+    st.markdown(f"Page **{page}** of **{total_pages}** · {len(labels)} matching rows")
+
+# Only this page's rows are sent to the browser
+st.dataframe(roster_page(side, df, labels, page), hide_index=True, use_container_width=True)
+st.caption(f"{BROWSE_PAGE_SIZE} rows per page. Filtering, sorting and paging run on the server.")
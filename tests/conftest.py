@@ -0,0 +1,15 @@
+import warnings
+
+import pytest
+
+from moxie_matching import generate_roster, load_roster
+
+
+# A small seeded synthetic roster with the real export layouts, parsed once for the whole run
+@pytest.fixture(scope="session")
+def roster(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("roster")
+    generate_roster(str(data_dir), nurses=150, mds=40, seed=7)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return load_roster(str(data_dir))
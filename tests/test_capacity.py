@@ -0,0 +1,83 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from moxie_matching.capacity import (
+    confirm_reservation,
+    get_available_capacity,
+    list_active_reservations,
+    release_reservation,
+    reserve_capacity,
+    seed_capacity_ledger,
+)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    db_path = str(tmp_path / "capacity.db")
+    doctors = pd.DataFrame({"Email": ["a@x.com", "B@X.com "], "NP Capacity": [3, 0], "RN Capacity": [1, 2]})
+    seed_capacity_ledger(doctors, db_path=db_path)
+    return db_path
+
+
+def new_cache():
+    return {"version": None, "available": {}, "lock": threading.Lock()}
+
+
+def test_concurrent_reservations_never_overbook(ledger):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def reserve(nurse):
+        barrier.wait()
+        results.append(reserve_capacity("a@x.com", "NP", nurse, db_path=ledger))
+
+    threads = [threading.Thread(target=reserve, args=(f"nurse{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    granted = [reservation_id for reservation_id, error in results if error is None]
+    refused = [error for reservation_id, error in results if error is not None]
+    assert len(granted) == 3 and len(set(granted)) == 3
+    assert refused == ["This medical director is at capacity for NPs."] * 5
+    assert get_available_capacity(new_cache(), db_path=ledger)[("a@x.com", "NP")] == 0
+
+
+def test_confirm_and_release_move_capacity(ledger):
+    reservation_id, error = reserve_capacity(" B@x.com", "rn", db_path=ledger)
+    assert error is None
+    assert confirm_reservation(reservation_id, db_path=ledger)
+    assert not confirm_reservation(reservation_id, db_path=ledger)
+    assert get_available_capacity(new_cache(), db_path=ledger)[("b@x.com", "RN")] == 1
+
+    assert release_reservation(reservation_id, db_path=ledger)
+    assert not release_reservation(reservation_id, db_path=ledger)
+    assert not confirm_reservation(reservation_id, db_path=ledger)
+    assert get_available_capacity(new_cache(), db_path=ledger)[("b@x.com", "RN")] == 2
+    assert list_active_reservations(db_path=ledger) == []
+
+
+def test_reservations_are_refused_without_tracked_capacity(ledger):
+    assert reserve_capacity("b@x.com", "NP", db_path=ledger) == (None, "This medical director is at capacity for NPs.")
+    assert reserve_capacity("c@x.com", "NP", db_path=ledger) == (None, "This medical director is not in the capacity ledger.")
+    assert reserve_capacity("a@x.com", "PA", db_path=ledger)[0] is None
+
+
+def test_capacity_snapshot_refreshes_when_the_ledger_changes(ledger):
+    cache = new_cache()
+    first = get_available_capacity(cache, db_path=ledger)
+    assert get_available_capacity(cache, db_path=ledger) is first
+    reserve_capacity("a@x.com", "RN", db_path=ledger)
+    second = get_available_capacity(cache, db_path=ledger)
+    assert second is not first
+    assert second[("a@x.com", "RN")] == 0
+
+
+def test_reseeding_keeps_recorded_reservations(ledger):
+    reserve_capacity("a@x.com", "NP", db_path=ledger)
+    doctors = pd.DataFrame({"Email": ["a@x.com"], "NP Capacity": [2], "RN Capacity": [1]})
+    seed_capacity_ledger(doctors, db_path=ledger)
+    assert get_available_capacity(new_cache(), db_path=ledger)[("a@x.com", "NP")] == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from moxie_matching.extract import extract_manual_profile
+
+
+@pytest.mark.parametrize("text, states", [
+    ("Texas NP and MD pairing wanted", ["TX"]),
+    ("Licensed in TX and CA", ["TX", "CA"]),
+    ("licensed in MD", ["MD"]),
+    ("RN in Texas and FL", ["TX", "FL"]),
+    ("Austin, TX 78701 and MD oversight", ["TX"]),
+])
+def test_credentials_after_and_are_not_states(text, states):
+    assert extract_manual_profile(text)["states"] == states
+
+
+@pytest.mark.parametrize("text, states", [
+    ("Austin, TX", ["TX"]),
+    ("Jane Doe, MD", []),
+    ("Jane Doe, MD 20814", ["MD"]),
+    ("TX, MD supervision needed", []),
+    ("Washington D.C.", ["DC"]),
+    ("West Virginia and Virginia", ["WV", "VA"]),
+])
+def test_state_codes_need_a_location_context(text, states):
+    assert extract_manual_profile(text)["states"] == states
+
+
+def test_manual_profile_fields():
+    profile = extract_manual_profile("RN in Texas, 2 years, botox and filler")
+    assert profile["license_type"] == "RN"
+    assert profile["experience"] == "Experienced"
+    assert profile["years"] == 2.0
+    assert profile["services"] == ["Botox", "Filler"]
+
+
+@pytest.mark.parametrize("text, license_type, experience", [
+    ("new grad NP from CA", "NP", "Brand new"),
+    ("Physician assistant, 6 years", "PA", "Advanced"),
+    ("PA nurse, 8 months", None, "Brand new"),
+])
+def test_license_and_experience(text, license_type, experience):
+    profile = extract_manual_profile(text)
+    assert profile["license_type"] == license_type
+    assert profile["experience"] == experience
+
+
+def test_empty_text_gives_an_empty_profile():
+    assert extract_manual_profile("   ") == {"states": [], "license_type": None, "experience": None, "years": None, "services": []}
@@ -0,0 +1,112 @@
+import json
+import sqlite3
+
+import pytest
+
+from moxie_matching.feedback import (
+    FEEDBACK_SCHEMA_VERSION,
+    add_feedback_entry,
+    connect_feedback_store,
+    count_feedback,
+    feedback_fts_enabled,
+    feedback_summary,
+    migrate_legacy_feedback,
+    query_feedback,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "feedback.db")
+
+
+def add_entries(store, count, **fields):
+    entry = {"md_name": "Dr. A", "nurse_name": "n@x.com", "match_score": 7.0, "user_rating": 8, "comments": "",
+             "match_reasoning": ""}
+    entry.update(fields)
+    return [add_feedback_entry(db_path=store, **entry) for _ in range(count)]
+
+
+def test_schema_is_set_up_once(store):
+    connect_feedback_store(store).close()
+    conn = sqlite3.connect(store)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == FEEDBACK_SCHEMA_VERSION
+    conn.execute("DROP INDEX feedback_by_md")
+    conn.close()
+    # An up-to-date store is not touched again
+    connect_feedback_store(store).close()
+    assert sqlite3.connect(store).execute("SELECT 1 FROM sqlite_master WHERE name = 'feedback_by_md'").fetchone() is None
+
+
+def test_legacy_json_is_imported_once(store, tmp_path):
+    legacy = tmp_path / "matching_feedback.json"
+    legacy.write_text(json.dumps([
+        {"id": 1, "md_name": "Dr. A", "nurse_name": "n1", "match_score": 8.0, "user_rating": 9, "comments": "great"},
+        {"id": 1, "md_name": "Dr. B", "nurse_name": "n2", "match_score": None, "user_rating": 4},
+        {"id": 2, "md_name": "Dr. B", "nurse_name": "n3", "user_rating": 6},
+    ]))
+    assert migrate_legacy_feedback(str(legacy), db_path=store) == 3
+    assert migrate_legacy_feedback(str(legacy), db_path=store) == 0
+    assert count_feedback(db_path=store) == 3
+
+    entries, _ = query_feedback(db_path=store)
+    assert [entry["id"] for entry in entries] == [3, 2, 1]
+    assert [entry["match_score"] for entry in entries] == [None, None, 8.0]
+    # Entries without a score count toward the ratings but not the score average
+    summary = feedback_summary(db_path=store)
+    assert summary["entries"] == 3
+    assert summary["avg_match_score"] == pytest.approx(8.0)
+    assert summary["avg_user_rating"] == pytest.approx(19 / 3)
+
+
+def test_missing_legacy_file_imports_nothing(store, tmp_path):
+    assert migrate_legacy_feedback(str(tmp_path / "missing.json"), db_path=store) == 0
+
+
+@pytest.mark.parametrize("search", ['say "hi"', "NEAR(", "a AND OR", "col:value", "*", "-x"])
+def test_search_text_is_never_read_as_fts_syntax(store, search):
+    add_entries(store, 1, comments='she said "hi" to the NEAR( team, col:value a AND OR -x *')
+    add_entries(store, 1, comments="unrelated")
+    entries, _ = query_feedback(db_path=store, search=search)
+    assert count_feedback(db_path=store, search=search) == len(entries)
+
+
+def test_search_matches_word_prefixes_and_needs_every_word(store):
+    conn = connect_feedback_store(store)
+    try:
+        if not feedback_fts_enabled(conn):
+            pytest.skip("sqlite built without FTS5; search falls back to LIKE")
+    finally:
+        conn.close()
+    add_entries(store, 1, comments="Great communicator", match_reasoning="Botox specialist")
+    add_entries(store, 1, comments="great fit")
+    assert count_feedback(db_path=store, search="commun") == 1
+    assert count_feedback(db_path=store, search="great botox") == 1
+    assert count_feedback(db_path=store, search="GREAT") == 2
+    assert count_feedback(db_path=store, search="ommunicator") == 0
+
+
+@pytest.mark.parametrize("total", [24, 25, 26, 50, 51])
+def test_keyset_pages_cover_every_entry_once(store, total):
+    ids = add_entries(store, total)
+    seen, before_id, pages = [], None, 0
+    while True:
+        entries, before_id = query_feedback(before_id=before_id, limit=25, db_path=store)
+        pages += 1
+        assert 0 < len(entries) <= 25
+        seen.extend(entry["id"] for entry in entries)
+        if before_id is None:
+            break
+        assert before_id == entries[-1]["id"]
+    assert seen == sorted(ids, reverse=True)
+    assert pages == -(-total // 25)
+
+
+def test_keyset_pages_respect_filters(store):
+    add_entries(store, 3, md_name="Dr. A", user_rating=9)
+    add_entries(store, 3, md_name="Dr. B", user_rating=2)
+    add_entries(store, 3, md_name="Dr. A", user_rating=3)
+    first, before_id = query_feedback(limit=2, db_path=store, md_name="Dr. A", min_rating=8)
+    second, last = query_feedback(before_id=before_id, limit=2, db_path=store, md_name="Dr. A", min_rating=8)
+    assert len(first) == 2 and len(second) == 1 and last is None
+    assert all(entry["md_name"] == "Dr. A" and entry["user_rating"] == 9 for entry in first + second)
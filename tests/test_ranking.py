@@ -0,0 +1,99 @@
+import pytest
+
+from moxie_matching import DEFAULT_RANKING_WEIGHTS, rank_candidates
+from moxie_matching.candidates import candidate_distances, select_doctor_candidates
+from moxie_matching.ranking import nurse_ranking_profile
+
+
+def roster_nurse(nurses_df, state, license_type):
+    rows = nurses_df[(nurses_df['State Code'] == state) & (nurses_df['Provider License Type'] == license_type)]
+    return rows.iloc[0]
+
+
+def doctor_candidates(roster, nurse, location, doctors_df=None):
+    doctors, _, indexes = roster
+    nurse_license, nurse_state_code, nurse_state_codes, _, _ = nurse_ranking_profile(nurse)
+    return select_doctor_candidates(
+        doctors if doctors_df is None else doctors_df, indexes, nurse_license, nurse_state_codes,
+        nurse_state_code == "CA", {"location": location}, limit=None
+    )
+
+
+def test_california_nurses_only_get_california_mds(roster):
+    _, nurses, indexes = roster
+    candidates, error = doctor_candidates(roster, roster_nurse(nurses, "CA", "RN"), "Any Location")
+    assert error is None
+    assert len(candidates)
+    assert candidates.index.isin(indexes["doctors_by_state"]["CA"]).all()
+
+
+@pytest.mark.parametrize("location, max_hops", [("Same State Only", 0), ("Nearby States Acceptable", 1)])
+def test_candidates_stay_in_range_closest_first(roster, location, max_hops):
+    _, nurses, indexes = roster
+    nurse = roster_nurse(nurses, "TX", "RN")
+    candidates, error = doctor_candidates(roster, nurse, location)
+    if error:
+        pytest.skip(error)
+    distances = candidate_distances(indexes["doctors_by_state"], ["TX"]).reindex(candidates.index)
+    assert distances.notna().all()
+    assert distances.max() <= max_hops
+    assert distances.is_monotonic_increasing
+
+
+def test_mds_without_capacity_for_the_license_are_excluded(roster):
+    doctors, nurses, _ = roster
+    nurse = roster_nurse(nurses, "TX", "RN")
+    candidates, _ = doctor_candidates(roster, nurse, "Any Location")
+    full = doctors.copy()
+    full.loc[candidates.index[0], 'RN Capacity'] = 0
+    remaining, _ = doctor_candidates(roster, nurse, "Any Location", doctors_df=full)
+    assert candidates.index[0] not in remaining.index
+    assert len(remaining) == len(candidates) - 1
+
+
+@pytest.mark.parametrize("search_type", ["nurse", "md", "manual"])
+def test_ranking_is_sorted_unique_and_repeatable(roster, search_type):
+    doctors, nurses, indexes = roster
+    search_value = {
+        "nurse": roster_nurse(nurses, "TX", "RN")['Bird Eats Bug Email'],
+        "md": f"{doctors['First Name'].iloc[0]} {doctors['Last Name'].iloc[0]}",
+        "manual": "RN in Texas, 2 years, botox",
+    }[search_type]
+    filters = {"location": "Any Location"}
+    matches, error = rank_candidates(search_type, search_value, doctors, nurses, filters, k=5, indexes=indexes)
+    assert error is None
+    assert 0 < len(matches) <= 5
+    scores = [match["match_score"] for match in matches]
+    assert scores == sorted(scores, reverse=True)
+    emails = [match["email"].strip().lower() for match in matches]
+    assert len(set(emails)) == len(emails)
+    assert rank_candidates(search_type, search_value, doctors, nurses, filters, k=5, indexes=indexes)[0] == matches
+
+
+def test_matches_come_from_the_eligible_candidates(roster):
+    doctors, nurses, indexes = roster
+    nurse = roster_nurse(nurses, "TX", "RN")
+    candidates, _ = doctor_candidates(roster, nurse, "Nearby States Acceptable")
+    matches, _ = rank_candidates(
+        "nurse", nurse['Bird Eats Bug Email'], doctors, nurses, {"location": "Nearby States Acceptable"}, k=10, indexes=indexes
+    )
+    eligible = set(candidates['Email'].str.strip().str.lower())
+    assert {match["email"].strip().lower() for match in matches} <= eligible
+
+
+def test_weights_decide_the_order(roster):
+    doctors, nurses, indexes = roster
+    email = roster_nurse(nurses, "TX", "RN")['Bird Eats Bug Email']
+    weights = {name: 0.0 for name in DEFAULT_RANKING_WEIGHTS}
+    weights["capacity"] = 1.0
+    matches, _ = rank_candidates("nurse", email, doctors, nurses, {"location": "Any Location"}, k=5, indexes=indexes,
+                                 weights=weights)
+    for match in matches:
+        assert match["match_score"] == pytest.approx(match["score_breakdown"]["capacity"] * 10, abs=0.06)
+
+
+def test_unknown_searches_report_an_error(roster):
+    doctors, nurses, indexes = roster
+    assert rank_candidates("nurse", "nobody@example.com", doctors, nurses, indexes=indexes) == ([], "Nurse not found in database.")
+    assert rank_candidates("md", "Dr. Nobody", doctors, nurses, indexes=indexes) == ([], "Doctor not found in database.")
+    assert rank_candidates("other", "x", doctors, nurses, indexes=indexes) == ([], "Invalid search type specified.")
@@ -0,0 +1,30 @@
+import pytest
+
+from moxie_matching.states import enumerate_state_tiers, normalize_state, parse_state_codes
+
+
+@pytest.mark.parametrize("value, code", [
+    ("California ", "CA"),
+    ("ca", "CA"),
+    ("New  Jersey", "NJ"),
+    ("", None),
+    ("Atlantis", None),
+    (None, None),
+])
+def test_normalize_state(value, code):
+    assert normalize_state(value) == code
+
+
+def test_parse_state_codes_dedupes_in_order():
+    assert parse_state_codes("Colorado; New Jersey , CO") == ["CO", "NJ"]
+    assert parse_state_codes("TX/OK") == ["TX", "OK"]
+    assert parse_state_codes(["tx", "Texas"]) == ["TX"]
+    assert parse_state_codes(None) == []
+
+
+def test_state_tiers_are_ordered_by_border_crossings():
+    assert enumerate_state_tiers(["CA"], max_hops=0) == [(0, "CA")]
+    assert enumerate_state_tiers(["CA"], max_hops=1) == [(0, "CA"), (1, "AZ"), (1, "NV"), (1, "OR")]
+    tiers = enumerate_state_tiers(["CA", "NY"])
+    assert [hops for hops, _ in tiers] == sorted(hops for hops, _ in tiers)
+    assert (0, "NY") in tiers